@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'user_control',
     'incident',
+    'notifications',
 ]
 
 REST_FRAMEWORK = {
@@ -198,6 +199,76 @@ STATICFILES_DIRS = (
 MEDIA_URL = '/uploads/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
 
+# Segundos que authenticate_user mantiene en memoria un usuario y sus permisos
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 30))
+
+# Cantidad máxima de tokens JWT ya verificados que se guardan en memoria (LRU)
+JWT_CACHE_MAX_SIZE = int(os.getenv('JWT_CACHE_MAX_SIZE', 1024))
+
+# Paginación por cursor del listado de incidentes
+INCIDENT_PAGE_SIZE = int(os.getenv('INCIDENT_PAGE_SIZE', 50))
+INCIDENT_MAX_PAGE_SIZE = int(os.getenv('INCIDENT_MAX_PAGE_SIZE', 200))
+# Incidentes por consulta al exportar (CSV/NDJSON); la memoria usada depende de este valor, no del total
+INCIDENT_EXPORT_CHUNK_SIZE = int(os.getenv('INCIDENT_EXPORT_CHUNK_SIZE', 1000))
+# Cantidad máxima de incidentes por operación masiva (incident/bulk)
+INCIDENT_BULK_MAX_IDS = int(os.getenv('INCIDENT_BULK_MAX_IDS', 500))
+
+# Caché en disco de imágenes (ya reducidas) para los reportes PDF
+REPORT_IMAGE_CACHE_DIR = os.path.join(MEDIA_ROOT, 'incident_images', 'report_cache')
+REPORT_IMAGE_CACHE_MAX_BYTES = int(os.getenv('REPORT_IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+REPORT_IMAGE_MAX_PIXELS = 1200
+
+# Caché en disco de reportes PDF de un incidente (clave: tipo, ID y updated_at)
+REPORT_PDF_CACHE_DIR = os.path.join(MEDIA_ROOT, 'report_cache')
+REPORT_PDF_CACHE_MAX_BYTES = int(os.getenv('REPORT_PDF_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+# Generación en paralelo (por bloques, en un pool de procesos) del reporte de incidentes activos.
+# Solo la usa el worker de reportes en segundo plano (process_report_jobs); las vistas siempre
+# generan el reporte en un solo proceso. Con 0 o 1 procesos (por defecto) no se usa.
+REPORT_PARALLEL_WORKERS = int(os.getenv('REPORT_PARALLEL_WORKERS', 0))
+REPORT_PARALLEL_MIN_INCIDENTS = int(os.getenv('REPORT_PARALLEL_MIN_INCIDENTS', 200))
+REPORT_PARALLEL_CHUNK_SIZE = int(os.getenv('REPORT_PARALLEL_CHUNK_SIZE', 100))
+
+# Incidentes por bloque al generar el reporte de activos en un solo proceso (vista y worker sin pool):
+# solo los incidentes e imágenes de un bloque están en memoria a la vez.
+REPORT_ACTIVE_CHUNK_SIZE = int(os.getenv('REPORT_ACTIVE_CHUNK_SIZE', 50))
+
+# Bytes de un reporte PDF que se mantienen en memoria antes de pasar a un archivo temporal
+REPORT_SPOOL_MAX_MEMORY = int(os.getenv('REPORT_SPOOL_MAX_MEMORY', 2 * 1024 * 1024))
+
+# Reportes PDF generados en segundo plano (manage.py process_report_jobs). El PDF se guarda en
+# la base de datos (report_job.content), la única que comparten el proceso web y el worker.
+REPORT_JOBS_TTL_HOURS = int(os.getenv('REPORT_JOBS_TTL_HOURS', 24))
+REPORT_JOBS_WORKERS = int(os.getenv('REPORT_JOBS_WORKERS', 2))
+
+# Almacenamiento de las imágenes de incidentes: 'cloudinary' (CLOUDINARY_URL) o 'local' (disco del servidor)
+INCIDENT_IMAGE_STORAGE = os.getenv('INCIDENT_IMAGE_STORAGE', 'cloudinary')
+INCIDENT_IMAGE_LOCAL_ROOT = MEDIA_ROOT
+# URL base con la que se arman las URLs de las imágenes locales (BASE_URL y BASE_URL_BACKEND_PORT, como get_base_url_with_port)
+INCIDENT_IMAGE_BASE_URL = os.getenv('BASE_URL', 'http://localhost') + (f":{os.getenv('BASE_URL_BACKEND_PORT')}" if os.getenv('BASE_URL_BACKEND_PORT') else '')
+# Si se define (p. ej. '/protected-uploads/', una location 'internal' de nginx que apunta a MEDIA_ROOT),
+# las imágenes locales las envía nginx con X-Accel-Redirect en lugar de Django.
+INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX = os.getenv('INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX', '')
+
+# Subidas y eliminaciones de imágenes en el almacenamiento fuera de la transacción de la solicitud
+# (manage.py process_image_operations). La imagen a subir viaja en la base de datos, no en disco.
+IMAGE_OPERATIONS_MAX_ATTEMPTS = int(os.getenv('IMAGE_OPERATIONS_MAX_ATTEMPTS', 5))
+# Si es verdadero, cada operación se intenta apenas se confirma la transacción, en un hilo del proceso web.
+IMAGE_OPERATIONS_DISPATCH_ON_COMMIT = os.getenv('IMAGE_OPERATIONS_DISPATCH_ON_COMMIT', 'True') == 'True'
+IMAGE_OPERATIONS_DISPATCH_THREADS = int(os.getenv('IMAGE_OPERATIONS_DISPATCH_THREADS', 2))
+
+# Filas en las que se reparte cada contador de estadísticas de incidentes (incident/stats.py),
+# para que las solicitudes concurrentes no esperen todas por la misma fila.
+INCIDENT_STATS_COUNTER_SLOTS = int(os.getenv('INCIDENT_STATS_COUNTER_SLOTS', 8))
+
+# Importación masiva de usuarios (user-control/import y manage.py import_users).
+# Los hashes de las contraseñas se calculan en un pool de USER_IMPORT_HASH_WORKERS procesos que solo
+# crean los comandos (process_user_import_jobs e import_users); el proceso web solo valida y encola.
+USER_IMPORT_MAX_ROWS = int(os.getenv('USER_IMPORT_MAX_ROWS', 5000))
+USER_IMPORT_HASH_WORKERS = int(os.getenv('USER_IMPORT_HASH_WORKERS', min(os.cpu_count() or 1, 4)))
+# Horas que una importación puede esperar al worker antes de descartarse (fallida y sin las contraseñas cifradas).
+USER_IMPORT_PENDING_MAX_HOURS = int(os.getenv('USER_IMPORT_PENDING_MAX_HOURS', 24))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -24,6 +24,9 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from incident.views import IncidentImageFile
+from utilities.image_storage import INCIDENT_IMAGE_FOLDER
+
 schema_view=get_schema_view(
     openapi.Info(
         title="K-loque Report",
@@ -44,6 +47,8 @@ urlpatterns = [
     path('documentation<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('documentation/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Imágenes de incidentes en disco (INCIDENT_IMAGE_STORAGE = 'local'), también con DEBUG desactivado
+    re_path(rf"^{settings.MEDIA_URL.strip('/')}/{INCIDENT_IMAGE_FOLDER}/(?P<name>[^/]+)$", IncidentImageFile.as_view()),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IncidentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'incident'
+
+    def ready(self):
+        import incident.signals  # noqa: F401
@@ -0,0 +1,77 @@
+import csv
+import json
+
+from django.utils import timezone
+
+from .user_names import get_user_names_for_incidents
+
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_NDJSON = 'ndjson'
+
+EXPORT_CONTENT_TYPES = {
+    EXPORT_FORMAT_CSV: 'text/csv; charset=utf-8',
+    EXPORT_FORMAT_NDJSON: 'application/x-ndjson; charset=utf-8',
+}
+
+
+class EchoBuffer:
+    """
+    "Archivo" para csv.writer que devuelve lo escrito en lugar de guardarlo.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_incident_chunks(queryset, chunk_size: int):
+    """
+    Recorre el QuerySet en bloques de 'chunk_size' incidentes ordenados por ID (keyset sobre
+    la clave primaria): cada bloque es una consulta corta que sigue desde el último ID, sin
+    importar qué filtros tenga el QuerySet.
+    (QuerySet.iterator() no sirve para esto en MySQL: mysqlclient descarga el resultado
+    completo en memoria antes de entregar la primera fila.)
+    """
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        incidents = list(chunk.order_by('id')[:chunk_size])
+        if incidents:
+            yield incidents
+        if len(incidents) < chunk_size:
+            break
+        last_id = incidents[-1].id
+
+
+def iter_serialized_incidents(queryset, chunk_size: int, serialize):
+    """
+    Recorre los incidentes por bloques y devuelve, por bloque, la lista de diccionarios
+    generados por 'serialize(incident, user_names)'. Los nombres de usuario se buscan en
+    una sola consulta por bloque.
+    """
+    for incidents in iter_incident_chunks(queryset, chunk_size):
+        user_names = get_user_names_for_incidents(incidents)
+        yield [serialize(incident, user_names) for incident in incidents]
+
+
+def iter_csv_export(serialized_chunks, columns: list):
+    """
+    Genera el CSV bloque a bloque. El encabezado ('columns') se envía siempre, aunque no
+    haya incidentes.
+    """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(columns)
+    for rows in serialized_chunks:
+        yield ''.join(writer.writerow([row.get(column) for column in columns]) for row in rows)
+
+
+def iter_ndjson_export(serialized_chunks):
+    """
+    Genera NDJSON (un objeto JSON por línea) bloque a bloque.
+    """
+    for rows in serialized_chunks:
+        yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+
+def get_export_filename(export_format: str) -> str:
+    return f"incidentes_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{export_format}"
@@ -0,0 +1,288 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from incident.models import Incident, ImageOperation
+from notifications.outbox import get_retry_delay
+from utilities.image_storage import INCIDENT_IMAGE_FOLDER, get_image_storage
+from utilities.image_cache import invalidate_cached_image
+from utilities.image_pipeline import IMAGE_VARIANTS, InvalidImageError, upload_incident_image, destroy_incident_image
+
+
+# Una operación 'procesando' más antigua que esto se considera abandonada (proceso caído) y vuelve a la cola.
+STALE_OPERATION_MINUTES = 15
+
+_dispatch_executor = None
+
+
+def get_operation_public_id(operation: ImageOperation) -> str:
+    """
+    El public_id de una subida depende solo de la operación: si el proceso muere después
+    de subir la imagen, el reintento sobrescribe la misma imagen en vez de dejar una huérfana.
+    """
+    return f"{INCIDENT_IMAGE_FOLDER}/op{operation.id}"
+
+
+def read_image_file(image_file) -> bytes:
+    """
+    Contenido de la imagen recibida (hasta 5 MB, validado por la vista).
+    """
+    return b''.join(image_file.chunks())
+
+
+def clear_staged_content(operation: ImageOperation):
+    """
+    Libera los bytes de la imagen cuando la subida ya no los necesita (terminó o se descartó).
+    """
+    ImageOperation.objects.filter(pk=operation.pk).update(staged_content=None)
+
+
+def get_dispatch_executor() -> ThreadPoolExecutor:
+    global _dispatch_executor
+    if _dispatch_executor is None:
+        _dispatch_executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_OPERATIONS_DISPATCH_THREADS,
+            thread_name_prefix='image-operation'
+        )
+    return _dispatch_executor
+
+
+def dispatch_image_operation(operation_id: int):
+    """
+    Se ejecuta después del commit: intenta la operación en un hilo aparte para que la
+    imagen esté disponible en segundos. Si el proceso web se reinicia antes, el worker
+    la toma igual porque la operación ya quedó guardada como 'pendiente'.
+    """
+    if not settings.IMAGE_OPERATIONS_DISPATCH_ON_COMMIT:
+        return
+
+    def run():
+        try:
+            if claim_image_operation(operation_id):
+                run_image_operation(operation_id)
+        finally:
+            # Cada hilo tiene su propia conexión a la base de datos.
+            connections.close_all()
+
+    get_dispatch_executor().submit(run)
+
+
+def queue_image_operation(operation: str, incident_id: int = None, public_id: str = None, staged_content: bytes = None) -> ImageOperation:
+    """
+    Registra la operación dentro de la transacción actual (si se revierte, la operación
+    y la imagen que lleva desaparecen) y programa su ejecución para después del commit.
+    """
+    image_operation = ImageOperation.objects.create(
+        operation=operation,
+        incident_id=incident_id,
+        public_id=public_id,
+        staged_content=staged_content,
+    )
+    transaction.on_commit(lambda: dispatch_image_operation(image_operation.id))
+    return image_operation
+
+
+def queue_image_upload(incident_id: int, image_file) -> ImageOperation:
+    """
+    Guarda la imagen en la operación y programa su subida. Quien llama debe dejar el
+    incidente con image_status 'pendiente' en la misma transacción.
+    """
+    return queue_image_operation(ImageOperation.OPERATION_UPLOAD, incident_id=incident_id, staged_content=read_image_file(image_file))
+
+
+def queue_image_destroy(public_id: str, incident_id: int = None) -> ImageOperation:
+    return queue_image_operation(ImageOperation.OPERATION_DESTROY, incident_id=incident_id, public_id=public_id)
+
+
+def claim_image_operation(operation_id: int) -> bool:
+    """
+    Marca una operación como 'procesando' solo si sigue pendiente, para que el hilo
+    posterior al commit y el worker no la ejecuten dos veces.
+    """
+    return ImageOperation.objects.filter(pk=operation_id, status=ImageOperation.STATUS_PENDING).update(
+        status=ImageOperation.STATUS_PROCESSING, started_at=timezone.now()
+    ) == 1
+
+
+def claim_image_operations(limit: int) -> list:
+    """
+    Marca como 'procesando' hasta 'limit' operaciones pendientes cuyo próximo intento ya
+    venció y devuelve sus IDs (SELECT ... FOR UPDATE con SKIP LOCKED si el motor lo soporta).
+    """
+    with transaction.atomic():
+        pending = ImageOperation.objects.filter(
+            status=ImageOperation.STATUS_PENDING,
+            next_attempt_at__lte=timezone.now()
+        ).order_by('next_attempt_at', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        elif connection.features.has_select_for_update:
+            pending = pending.select_for_update()
+
+        operation_ids = list(pending.values_list('id', flat=True)[:limit])
+        if operation_ids:
+            ImageOperation.objects.filter(id__in=operation_ids).update(status=ImageOperation.STATUS_PROCESSING, started_at=timezone.now())
+
+    return operation_ids
+
+
+def is_current_upload(operation: ImageOperation, incident: Incident) -> bool:
+    """
+    La subida todavía corresponde al incidente si este sigue esperando una imagen y no
+    se pidió otra más reciente (ni se asoció una subida directa) después de esta.
+    """
+    if incident is None or incident.image_status != Incident.IMAGE_STATUS_PENDING:
+        return False
+    return not ImageOperation.objects.filter(
+        incident_id=operation.incident_id,
+        operation=ImageOperation.OPERATION_UPLOAD,
+        id__gt=operation.id
+    ).exists()
+
+
+def execute_image_upload(operation: ImageOperation):
+    """
+    Sube la imagen guardada en la operación y la asocia al incidente. Si mientras tanto el
+    incidente se eliminó o cambió de imagen, la subida se descarta (o se elimina si ya se hizo).
+    La imagen anterior del incidente se elimina con otra operación.
+    """
+    incident = Incident.objects.filter(pk=operation.incident_id).first()
+    if not is_current_upload(operation, incident):
+        clear_staged_content(operation)
+        return
+
+    if operation.staged_content is None:
+        raise InvalidImageError("La operación no tiene la imagen a subir.")
+
+    public_id = get_operation_public_id(operation)
+    upload_result = upload_incident_image(bytes(operation.staged_content), public_id=public_id)
+
+    with transaction.atomic():
+        incident = Incident.objects.select_for_update().filter(pk=operation.incident_id).first()
+        applied = is_current_upload(operation, incident)
+        if applied:
+            old_public_id = incident.image_public_id
+            incident.image_url = upload_result.get('secure_url')
+            incident.image_public_id = upload_result.get('public_id')
+            incident.image_thumbnail_url = upload_result.get('thumbnail_url')
+            incident.image_medium_url = upload_result.get('medium_url')
+            incident.image_status = Incident.IMAGE_STATUS_READY
+            incident.save(update_fields=['image_url', 'image_public_id', 'image_thumbnail_url', 'image_medium_url', 'image_status', 'updated_at'])
+            if old_public_id and old_public_id != incident.image_public_id:
+                queue_image_destroy(old_public_id, incident_id=incident.id)
+
+    if not applied:
+        destroy_incident_image(public_id)
+    clear_staged_content(operation)
+
+
+def execute_image_destroy(operation: ImageOperation):
+    invalidate_cached_image(operation.public_id)
+    destroy_incident_image(operation.public_id)
+
+
+def finish_image_operation(operation: ImageOperation, error: str = None, retry: bool = True):
+    """
+    Registra el resultado de un intento. Los errores se reintentan con espera exponencial
+    hasta IMAGE_OPERATIONS_MAX_ATTEMPTS; una subida que falla definitivamente deja la
+    imagen del incidente como 'fallida'.
+    """
+    now = timezone.now()
+    operation.attempts += 1
+    operation.last_error = error
+
+    if not error:
+        operation.status = ImageOperation.STATUS_COMPLETED
+        operation.finished_at = now
+    elif retry and operation.attempts < settings.IMAGE_OPERATIONS_MAX_ATTEMPTS:
+        operation.status = ImageOperation.STATUS_PENDING
+        operation.next_attempt_at = now + get_retry_delay(operation.attempts)
+    else:
+        operation.status = ImageOperation.STATUS_FAILED
+        operation.finished_at = now
+        if operation.operation == ImageOperation.OPERATION_UPLOAD:
+            clear_staged_content(operation)
+            with transaction.atomic():
+                incident = Incident.objects.select_for_update().filter(pk=operation.incident_id).first()
+                if is_current_upload(operation, incident):
+                    incident.image_status = Incident.IMAGE_STATUS_FAILED
+                    incident.save(update_fields=['image_status', 'updated_at'])
+
+    operation.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'finished_at'])
+
+
+def run_image_operation(operation_id: int) -> bool:
+    """
+    Ejecuta una operación ya marcada como 'procesando'. Devuelve True si terminó bien.
+    """
+    operation = ImageOperation.objects.get(pk=operation_id)
+    try:
+        if operation.operation == ImageOperation.OPERATION_UPLOAD:
+            execute_image_upload(operation)
+        else:
+            execute_image_destroy(operation)
+    except InvalidImageError as e:
+        # No tiene sentido reintentar: la imagen no es válida o ya no está en la operación.
+        finish_image_operation(operation, error=str(e), retry=False)
+        return False
+    except Exception as e:
+        finish_image_operation(operation, error=f"{type(e).__name__}: {e}")
+        return False
+
+    finish_image_operation(operation)
+    return True
+
+
+def process_image_operations(limit: int = 20) -> dict:
+    """
+    Ejecuta un lote de operaciones pendientes (las que el hilo posterior al commit no
+    alcanzó a hacer y los reintentos). Devuelve la cantidad de operaciones completadas y fallidas.
+    """
+    result = {"completed": 0, "failed": 0}
+    for operation_id in claim_image_operations(limit):
+        if run_image_operation(operation_id):
+            result["completed"] += 1
+        else:
+            result["failed"] += 1
+    return result
+
+
+def requeue_stale_image_operations() -> int:
+    limit = timezone.now() - timedelta(minutes=STALE_OPERATION_MINUTES)
+    return ImageOperation.objects.filter(status=ImageOperation.STATUS_PROCESSING, started_at__lt=limit).update(
+        status=ImageOperation.STATUS_PENDING, started_at=None
+    )
+
+
+def get_base_public_id(public_id: str) -> str:
+    for variant in IMAGE_VARIANTS:
+        suffix = f"_{variant}"
+        if public_id.endswith(suffix):
+            return public_id[:-len(suffix)]
+    return public_id
+
+
+def cleanup_orphaned_images(older_than_hours: int = 24) -> int:
+    """
+    Elimina del almacenamiento las imágenes de INCIDENT_IMAGE_FOLDER (y sus variantes) que
+    no pertenecen a ningún incidente: subidas directas nunca asociadas, imágenes de procesos
+    que murieron entre la subida y el guardado, etc. Solo considera imágenes más antiguas
+    que 'older_than_hours' para no tocar subidas en curso.
+    Devuelve la cantidad de imágenes eliminadas.
+    """
+    storage = get_image_storage()
+    removed = 0
+
+    for public_ids in storage.iter_image_pages(timezone.now() - timedelta(hours=older_than_hours)):
+        base_ids = {get_base_public_id(public_id) for public_id in public_ids}
+        referenced = set(Incident.objects.filter(image_public_id__in=base_ids).values_list('image_public_id', flat=True))
+        orphaned = [public_id for public_id in public_ids if get_base_public_id(public_id) not in referenced]
+        if orphaned:
+            storage.delete_many(orphaned)
+            removed += len(orphaned)
+
+    return removed
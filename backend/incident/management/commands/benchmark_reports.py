@@ -0,0 +1,81 @@
+import io
+import re
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from incident.models import Incident
+from incident.report_jobs import create_report_worker_pool
+from incident.reports import build_active_report, build_specific_report, build_archived_report
+
+
+PDF_PAGE_PATTERN = re.compile(rb'/Type /Page\b(?!s)')
+
+
+def build_sample_incidents(count):
+    """
+    Incidentes en memoria (sin guardar, sin imagen ni usuarios) para medir solo el costo de ReportLab.
+    """
+    now = timezone.make_aware(datetime(2025, 1, 1, 12, 0, 0))
+    description = "Descripción de prueba del incidente con texto suficiente para ocupar varias líneas en la tabla. " * 3
+    return [
+        Incident(
+            id=index + 1,
+            incident_type=f"Tipo {index % 7}",
+            description=description,
+            date=date(2025, 1, index % 28 + 1),
+            status=Incident.STATUS_RESOLVED if index % 2 else Incident.STATUS_ACTIVE,
+            comment="Resuelto en la prueba.",
+            active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def measure(build, repeat):
+    """
+    Ejecuta build(salida) 'repeat' veces y devuelve (páginas generadas, segundos totales).
+    """
+    pages = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        output = io.BytesIO()
+        build(output)
+        pages += len(PDF_PAGE_PATTERN.findall(output.getvalue()))
+    return pages, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Mide la velocidad de generación de los reportes PDF (páginas por segundo) con incidentes de prueba en memoria."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incidents', type=int, default=500, help="Cantidad de incidentes del reporte de activos.")
+        parser.add_argument('--repeat', type=int, default=3, help="Veces que se genera el reporte de activos.")
+        parser.add_argument('--detail-repeat', type=int, default=200, help="Veces que se generan los reportes de un incidente.")
+        parser.add_argument('--workers', type=int, default=None, help="Reemplaza REPORT_PARALLEL_WORKERS (1 = sin generación en paralelo).")
+
+    def handle(self, *args, **options):
+        workers = settings.REPORT_PARALLEL_WORKERS if options['workers'] is None else options['workers']
+        # Igual que en process_report_jobs: el pool solo existe si se piden 2 procesos o más.
+        render_executor = create_report_worker_pool(workers) if workers > 1 else None
+
+        incidents = build_sample_incidents(options['incidents'])
+        benchmarks = [
+            ("Activos", lambda output: build_active_report(output, incidents, render_executor), options['repeat']),
+            ("Específico", lambda output: build_specific_report(output, incidents[0]), options['detail_repeat']),
+            ("Archivado", lambda output: build_archived_report(output, incidents[1]), options['detail_repeat']),
+        ]
+
+        try:
+            self.stdout.write(f"Procesos para el reporte de activos: {workers}")
+            for name, build, repeat in benchmarks:
+                pages, seconds = measure(build, repeat)
+                self.stdout.write(f"{name}: {pages} páginas en {seconds:.2f} s -> {pages / seconds:.1f} páginas/s")
+        finally:
+            if render_executor is not None:
+                render_executor.shutdown(wait=True)
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from incident.models import Incident
+from incident.reports import get_active_report_queryset, get_active_report_chunk
+from incident.views import parse_incident_list_filters, get_visible_incidents
+from utilities.pagination import paginate_by_cursor, encode_cursor, CURSOR_NEXT
+
+
+def run_incident_list_page(user, params):
+    """
+    Ejecuta la consulta de una página del listado igual que IncidentRC.get.
+    """
+    def run():
+        filters, ordering, errors = parse_incident_list_filters(params)
+        if errors:
+            raise CommandError(f"Parámetros inválidos en la consulta de prueba: {errors}")
+        paginate_by_cursor(
+            get_visible_incidents(user, filters),
+            ordering=ordering,
+            cursor=params.get('cursor'),
+            page_size=settings.INCIDENT_PAGE_SIZE
+        )
+    return run
+
+
+def run_active_report_chunk(user, after=None):
+    """
+    Ejecuta la consulta de un bloque del reporte de activos igual que build_active_report_in_chunks.
+    """
+    return lambda: get_active_report_chunk(get_active_report_queryset(user), settings.REPORT_ACTIVE_CHUNK_SIZE, after=after)
+
+
+def get_hot_incident_queries():
+    """
+    Consultas más frecuentes sobre la tabla incident (listado, reportes), armadas con las
+    mismas funciones que usan las vistas. Cada valor es una función que ejecuta la consulta.
+    Cada una debe resolverse con un índice y nunca con un recorrido completo de la tabla.
+    """
+    # Usuarios sin guardar: solo se usan 'id' e 'is_superuser'.
+    superuser = User(id=1, is_superuser=True)
+    regular_user = User(id=2, is_superuser=False)
+    next_page_cursor = encode_cursor('-created_at', timezone.now(), 1, CURSOR_NEXT)
+
+    return {
+        "IncidentRC.get (superusuario)": run_incident_list_page(superuser, {}),
+        "IncidentRC.get (usuario)": run_incident_list_page(regular_user, {}),
+        "IncidentRC.get (página siguiente)": run_incident_list_page(superuser, {'cursor': next_page_cursor}),
+        "IncidentRC.get (filtro por tipo)": run_incident_list_page(superuser, {'incident_type': 'x'}),
+        "IncidentRC.get (filtro por estado)": run_incident_list_page(superuser, {'status': Incident.STATUS_ACTIVE, 'active': 'true'}),
+        "IncidentRC.get (filtro por creador)": run_incident_list_page(superuser, {'created_by': '1'}),
+        "ActiveReports.get (superusuario)": run_active_report_chunk(superuser),
+        "ActiveReports.get (usuario)": run_active_report_chunk(regular_user),
+        "ActiveReports.get (bloque siguiente)": run_active_report_chunk(superuser, after=Incident(id=1, created_at=timezone.now())),
+    }
+
+
+def capture_incident_queries(run) -> list:
+    """
+    Ejecuta 'run' y devuelve el SQL (con los parámetros ya incluidos) de las consultas
+    que hizo sobre la tabla incident.
+    """
+    with CaptureQueriesContext(connection) as captured:
+        run()
+    table = Incident._meta.db_table
+    return [query['sql'] for query in captured.captured_queries if f'"{table}"' in query['sql'] or f'`{table}`' in query['sql']]
+
+
+def explain_uses_full_scan(sql: str):
+    """
+    Ejecuta EXPLAIN sobre la consulta y devuelve (es_full_scan, plan_en_texto).
+    Soporta MySQL (columna 'type' = 'ALL') y SQLite ('SCAN incident' sin índice).
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f"EXPLAIN {sql}")
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            full_scan = any(row.get('type') == 'ALL' and row.get('table') == Incident._meta.db_table for row in rows)
+            plan = "\n".join(str(row) for row in rows)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [row[-1] for row in cursor.fetchall()]
+            full_scan = any(detail.startswith(f"SCAN {Incident._meta.db_table}") and "INDEX" not in detail for detail in details)
+            plan = "\n".join(details)
+        else:
+            raise CommandError(f"Motor de base de datos no soportado para EXPLAIN: {connection.vendor}")
+
+    return full_scan, plan
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN sobre las consultas principales de incidentes y falla si alguna recorre la tabla completa."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help="Muestra el plan de ejecución de cada consulta.")
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for name, run in get_hot_incident_queries().items():
+            for sql in capture_incident_queries(run):
+                full_scan, plan = explain_uses_full_scan(sql)
+                if full_scan:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"[FULL SCAN] {name}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"[OK] {name}"))
+
+                if options['verbose_plan'] or full_scan:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} consulta(s) recorren la tabla 'incident' completa: {', '.join(failures)}")
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from incident.image_operations import (
+    process_image_operations, requeue_stale_image_operations, cleanup_orphaned_images,
+)
+
+
+class Command(BaseCommand):
+    help = "Guarda y elimina en el almacenamiento (Cloudinary o disco local) las imágenes de incidentes pendientes (image_operation), con reintentos, y limpia las imágenes huérfanas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Se mantiene en ejecución procesando la cola continuamente.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Segundos de espera cuando la cola está vacía (solo con --loop).")
+        parser.add_argument('--batch-size', type=int, default=20, help="Cantidad máxima de operaciones por lote.")
+        parser.add_argument(
+            '--cleanup-orphans', action='store_true',
+            help="Además elimina del almacenamiento las imágenes que no pertenecen a ningún incidente (una vez al iniciar y luego cada 24 horas)."
+        )
+
+    def handle(self, *args, **options):
+        next_orphan_cleanup = time.monotonic() if options['cleanup_orphans'] else None
+
+        while True:
+            close_old_connections()
+            requeue_stale_image_operations()
+            result = process_image_operations(limit=options['batch_size'])
+
+            if any(result.values()):
+                self.stdout.write(f"Completadas: {result['completed']} | Fallidas o reprogramadas: {result['failed']}")
+
+            if next_orphan_cleanup is not None and time.monotonic() >= next_orphan_cleanup:
+                try:
+                    removed_images = cleanup_orphaned_images()
+                    self.stdout.write(f"Imágenes huérfanas eliminadas: {removed_images}")
+                except Exception as e:
+                    self.stderr.write(f"Error al limpiar imágenes huérfanas: {e}")
+                next_orphan_cleanup = time.monotonic() + 24 * 60 * 60
+
+            if not options['loop']:
+                break
+
+            # Si el lote vino lleno probablemente quedan más operaciones: no se espera.
+            if sum(result.values()) < options['batch_size']:
+                time.sleep(options['interval'])
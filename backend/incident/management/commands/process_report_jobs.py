@@ -0,0 +1,65 @@
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from incident.report_jobs import (
+    create_report_worker_pool, process_report_jobs, requeue_stale_report_jobs, cleanup_expired_report_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Genera los reportes PDF solicitados en segundo plano (report_job) usando un pool de procesos, y elimina los vencidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Se mantiene en ejecución procesando la cola continuamente.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía (solo con --loop).")
+        parser.add_argument('--workers', type=int, default=settings.REPORT_JOBS_WORKERS, help="Cantidad de procesos que generan reportes en paralelo.")
+        parser.add_argument(
+            '--render-workers', type=int, default=settings.REPORT_PARALLEL_WORKERS,
+            help="Procesos que generan por partes los reportes de activos grandes (0 o 1 = sin generación por partes)."
+        )
+
+    def create_render_pool(self, render_workers):
+        return create_report_worker_pool(render_workers) if render_workers > 1 else None
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        render_workers = options['render_workers']
+        executor = create_report_worker_pool(workers)
+        render_executor = self.create_render_pool(render_workers)
+
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_report_jobs()
+                expired = cleanup_expired_report_jobs()
+
+                try:
+                    result = process_report_jobs(executor, limit=workers, render_executor=render_executor)
+                except BrokenProcessPool as e:
+                    self.stderr.write(f"{e} Se crean pools nuevos.")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = create_report_worker_pool(workers)
+                    if render_executor is not None:
+                        render_executor.shutdown(wait=False, cancel_futures=True)
+                        render_executor = self.create_render_pool(render_workers)
+                    result = {"completed": 0, "failed": 0}
+
+                if any(result.values()) or expired:
+                    self.stdout.write(
+                        f"Completados: {result['completed']} | Fallidos: {result['failed']} | Expirados eliminados: {expired}"
+                    )
+
+                if not options['loop']:
+                    break
+
+                # Si se llenaron todos los procesos probablemente quedan más trabajos: no se espera.
+                if sum(result.values()) < workers:
+                    time.sleep(options['interval'])
+        finally:
+            executor.shutdown(wait=True)
+            if render_executor is not None:
+                render_executor.shutdown(wait=True)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from incident.stats import rebuild_incident_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los contadores de estadísticas de incidentes (incident_stat_counter) a partir de la tabla 'incident'."
+
+    def handle(self, *args, **options):
+        created = rebuild_incident_stats()
+        self.stdout.write(f"Contadores de estadísticas reconstruidos: {created}")
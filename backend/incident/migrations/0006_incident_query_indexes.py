@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0005_remove_incident_image_incident_image_public_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['created_at'], name='incident_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['created_by', 'created_at'], name='incident_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['status', 'active', 'created_at'], name='incident_status_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['incident_type', 'created_at'], name='incident_type_created_idx'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+# Formatos encontrados en datos existentes; el primero es el que valida la API.
+ACCEPTED_DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%m/%d/%Y']
+
+
+def parse_legacy_date(raw_value, fallback):
+    """
+    Convierte el texto guardado en la columna 'date' a un objeto date.
+    Si el valor no se puede interpretar se usa 'fallback' (fecha de creación del incidente).
+    """
+    value = (raw_value or '').strip()
+    # Valores tipo '2025-05-26 10:30:00' o '2025-05-26T10:30:00'
+    candidates = [value, value[:10]] if len(value) > 10 else [value]
+    for candidate in candidates:
+        for date_format in ACCEPTED_DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, date_format).date()
+            except ValueError:
+                continue
+    return fallback
+
+
+def copy_text_dates_forward(apps, schema_editor):
+    Incident = apps.get_model('incident', 'Incident')
+    last_id = 0
+    malformed = 0
+
+    while True:
+        batch = list(
+            Incident.objects.filter(id__gt=last_id).order_by('id').only('id', 'date', 'created_at')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for incident in batch:
+            fallback = timezone.localtime(incident.created_at).date() if incident.created_at else timezone.localdate()
+            incident.date_parsed = parse_legacy_date(incident.date, None)
+            if incident.date_parsed is None:
+                malformed += 1
+                incident.date_parsed = fallback
+
+        Incident.objects.bulk_update(batch, ['date_parsed'], batch_size=BATCH_SIZE)
+        last_id = batch[-1].id
+
+    if malformed:
+        print(f"\n  {malformed} incidente(s) con fecha inválida se migraron usando su fecha de creación.")
+
+
+def copy_dates_backward(apps, schema_editor):
+    Incident = apps.get_model('incident', 'Incident')
+    last_id = 0
+
+    while True:
+        batch = list(Incident.objects.filter(id__gt=last_id).order_by('id').only('id', 'date_parsed')[:BATCH_SIZE])
+        if not batch:
+            break
+
+        for incident in batch:
+            incident.date = incident.date_parsed.isoformat() if incident.date_parsed else ''
+
+        Incident.objects.bulk_update(batch, ['date'], batch_size=BATCH_SIZE)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    # Cada lote se confirma por separado; MySQL no permite DDL transaccional de todas formas.
+    atomic = False
+
+    dependencies = [
+        ('incident', '0006_incident_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='date_parsed',
+            field=models.DateField(null=True, blank=True, verbose_name='fecha del incidente'),
+        ),
+        # Permite recrear la columna de texto vacía al revertir, antes de copiar los valores de vuelta.
+        migrations.AlterField(
+            model_name='incident',
+            name='date',
+            field=models.CharField(max_length=50, null=True, verbose_name='fecha del incidente'),
+        ),
+        migrations.RunPython(copy_text_dates_forward, copy_dates_backward),
+        migrations.RemoveField(
+            model_name='incident',
+            name='date',
+        ),
+        migrations.RenameField(
+            model_name='incident',
+            old_name='date_parsed',
+            new_name='date',
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='date',
+            field=models.DateField(verbose_name='fecha del incidente'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['date'], name='incident_date_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0007_alter_incident_date_to_datefield'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('active', 'Reporte de incidentes activos'), ('specific', 'Reporte de incidente específico'), ('archived', 'Reporte de incidente archivado')], max_length=20, verbose_name='tipo de reporte')),
+                ('incident_id', models.IntegerField(blank=True, null=True, verbose_name='incidente')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido'), ('expirado', 'Expirado')], default='pendiente', max_length=20, verbose_name='estado del reporte')),
+                ('requested_by', models.IntegerField(verbose_name='solicitado por')),
+                ('file_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='archivo generado')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de solicitud')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='inicio del procesamiento')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='fin del procesamiento')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='fecha de expiración')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de reporte',
+                'verbose_name_plural': 'Trabajos de reporte',
+                'db_table': 'report_job',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_job_status_idx'), models.Index(fields=['status', 'expires_at'], name='report_job_expires_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0008_report_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='image_medium_url',
+            field=models.URLField(blank=True, max_length=255, null=True, verbose_name='URL de la imagen mediana'),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='image_thumbnail_url',
+            field=models.URLField(blank=True, max_length=255, null=True, verbose_name='URL de la miniatura'),
+        ),
+    ]
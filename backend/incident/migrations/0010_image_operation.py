@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0009_incident_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Imagen en proceso de subida'), ('lista', 'Imagen disponible'), ('fallida', 'No se pudo subir la imagen')], max_length=20, null=True, verbose_name='estado de la imagen'),
+        ),
+        migrations.CreateModel(
+            name='ImageOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('upload', 'Subir imagen'), ('destroy', 'Eliminar imagen')], max_length=20, verbose_name='operación')),
+                ('incident_id', models.IntegerField(blank=True, null=True, verbose_name='incidente')),
+                ('public_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Cloudinary Public ID')),
+                ('staged_file', models.CharField(blank=True, max_length=255, null=True, verbose_name='archivo temporal')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado de la operación')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='próximo intento')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='inicio del procesamiento')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='fin del procesamiento')),
+            ],
+            options={
+                'verbose_name': 'Operación de imagen',
+                'verbose_name_plural': 'Operaciones de imagen',
+                'db_table': 'image_operation',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='image_operation_pending_idx'), models.Index(fields=['incident_id', 'operation'], name='image_operation_incident_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+
+# MySQL: índice FULLTEXT (InnoDB) sobre los tres campos que se buscan.
+# Al ser el primer índice FULLTEXT de la tabla, InnoDB agrega la columna oculta FTS_DOC_ID y
+# reconstruye la tabla 'incident', y mientras se crea el índice no se permiten escrituras
+# (LOCK=SHARED): los INSERT/UPDATE de incidentes esperan hasta que termine. En una tabla grande
+# conviene aplicar esta migración en una ventana de mantenimiento.
+MYSQL_CREATE = [
+    "ALTER TABLE incident ADD FULLTEXT INDEX incident_fulltext_idx (incident_type, description, comment)",
+]
+MYSQL_DROP = [
+    "ALTER TABLE incident DROP INDEX incident_fulltext_idx",
+]
+
+# SQLite (desarrollo y pruebas): tabla virtual FTS5 con el contenido en la tabla 'incident',
+# sincronizada con triggers. Nota: si una migración futura reconstruye la tabla 'incident'
+# en SQLite, los triggers se pierden y hay que volver a crearlos.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE incident_fts USING fts5(
+        incident_type, description, comment,
+        content='incident', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER incident_fts_ai AFTER INSERT ON incident BEGIN
+        INSERT INTO incident_fts(rowid, incident_type, description, comment)
+        VALUES (new.id, new.incident_type, new.description, new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER incident_fts_ad AFTER DELETE ON incident BEGIN
+        INSERT INTO incident_fts(incident_fts, rowid, incident_type, description, comment)
+        VALUES ('delete', old.id, old.incident_type, old.description, old.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER incident_fts_au AFTER UPDATE OF incident_type, description, comment ON incident BEGIN
+        INSERT INTO incident_fts(incident_fts, rowid, incident_type, description, comment)
+        VALUES ('delete', old.id, old.incident_type, old.description, old.comment);
+        INSERT INTO incident_fts(rowid, incident_type, description, comment)
+        VALUES (new.id, new.incident_type, new.description, new.comment);
+    END
+    """,
+    "INSERT INTO incident_fts(incident_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS incident_fts_au",
+    "DROP TRIGGER IF EXISTS incident_fts_ad",
+    "DROP TRIGGER IF EXISTS incident_fts_ai",
+    "DROP TABLE IF EXISTS incident_fts",
+]
+
+
+def run_for_vendor(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0010_image_operation'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'mysql': MYSQL_CREATE, 'sqlite': SQLITE_CREATE}),
+            run_for_vendor({'mysql': MYSQL_DROP, 'sqlite': SQLITE_DROP}),
+        ),
+    ]
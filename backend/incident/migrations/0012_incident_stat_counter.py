@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+def build_initial_counters(apps, schema_editor):
+    from incident.stats import rebuild_incident_stats
+    rebuild_incident_stats(apps.get_model('incident', 'Incident'), apps.get_model('incident', 'IncidentStatCounter'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0011_incident_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentStatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('status', 'Estado'), ('active', 'Activo'), ('incident_type', 'Tipo de incidente'), ('created_by', 'Creador'), ('date', 'Fecha del incidente')], max_length=20, verbose_name='dimensión')),
+                ('value', models.CharField(blank=True, max_length=100, verbose_name='valor')),
+                ('slot', models.PositiveSmallIntegerField(default=0, verbose_name='fila del contador')),
+                ('count', models.BigIntegerField(default=0, verbose_name='cantidad')),
+            ],
+            options={
+                'verbose_name': 'Contador de incidentes',
+                'verbose_name_plural': 'Contadores de incidentes',
+                'db_table': 'incident_stat_counter',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value', 'slot'), name='incident_stat_counter_unique')],
+            },
+        ),
+        migrations.RunPython(build_initial_counters, migrations.RunPython.noop),
+    ]
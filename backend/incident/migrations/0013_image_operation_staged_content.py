@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0012_incident_stat_counter'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='imageoperation',
+            name='staged_file',
+        ),
+        migrations.AddField(
+            model_name='imageoperation',
+            name='staged_content',
+            field=models.BinaryField(blank=True, null=True, verbose_name='imagen pendiente de subir'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incident', '0013_image_operation_staged_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reportjob',
+            name='file_name',
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='content',
+            field=models.BinaryField(blank=True, null=True, verbose_name='PDF generado'),
+        ),
+    ]
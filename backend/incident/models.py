@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 
@@ -13,11 +14,25 @@ class Incident(models.Model):
         (STATUS_RESOLVED, 'Incidente Resuelto'),
     ]
 
+    IMAGE_STATUS_PENDING = 'pendiente'
+    IMAGE_STATUS_READY = 'lista'
+    IMAGE_STATUS_FAILED = 'fallida'
+
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_STATUS_PENDING, 'Imagen en proceso de subida'),
+        (IMAGE_STATUS_READY, 'Imagen disponible'),
+        (IMAGE_STATUS_FAILED, 'No se pudo subir la imagen'),
+    ]
+
     incident_type = models.CharField(max_length=100, null=False, blank=False, verbose_name="tipo de incidente")
     description = models.TextField(null=False, blank=False, verbose_name="descripción")
-    date = models.CharField(max_length=50, null=False, blank=False, verbose_name="fecha del incidente")
+    date = models.DateField(null=False, blank=False, verbose_name="fecha del incidente")
     image_url = models.URLField(max_length=255, null=True, blank=True, verbose_name="URL de la Imagen")
     image_public_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Cloudinary Public ID")
+    image_thumbnail_url = models.URLField(max_length=255, null=True, blank=True, verbose_name="URL de la miniatura")
+    image_medium_url = models.URLField(max_length=255, null=True, blank=True, verbose_name="URL de la imagen mediana")
+    # Nulo si el incidente nunca tuvo imagen (o si es anterior a la subida en segundo plano).
+    image_status = models.CharField(max_length=20, choices=IMAGE_STATUS_CHOICES, null=True, blank=True, verbose_name="estado de la imagen")
     comment = models.TextField(null=True, blank=True, verbose_name="comentario de solución")
 
     status = models.CharField(
@@ -41,4 +56,182 @@ class Incident(models.Model):
     class Meta:
         db_table = 'incident'
         verbose_name = "Incidente"
-        verbose_name_plural = "Incidentes"
\ No newline at end of file
+        verbose_name_plural = "Incidentes"
+        # InnoDB agrega la PK (id) al final de cada índice secundario, por lo que
+        # todos sirven también para el desempate por id de la paginación por cursor.
+        indexes = [
+            models.Index(fields=['created_at'], name='incident_created_at_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='incident_creator_created_idx'),
+            models.Index(fields=['status', 'active', 'created_at'], name='incident_status_active_idx'),
+            models.Index(fields=['incident_type', 'created_at'], name='incident_type_created_idx'),
+            models.Index(fields=['date'], name='incident_date_idx'),
+        ]
+
+class ReportJob(models.Model):
+    """
+    Reporte PDF solicitado para generarse en segundo plano ('manage.py process_report_jobs').
+    El PDF generado se guarda en la misma fila ('content'): el proceso web y el worker de
+    reportes no comparten disco, pero sí la base de datos.
+    """
+
+    TYPE_ACTIVE = 'active'
+    TYPE_SPECIFIC = 'specific'
+    TYPE_ARCHIVED = 'archived'
+
+    TYPE_CHOICES = [
+        (TYPE_ACTIVE, 'Reporte de incidentes activos'),
+        (TYPE_SPECIFIC, 'Reporte de incidente específico'),
+        (TYPE_ARCHIVED, 'Reporte de incidente archivado'),
+    ]
+
+    STATUS_PENDING = 'pendiente'
+    STATUS_PROCESSING = 'procesando'
+    STATUS_COMPLETED = 'completado'
+    STATUS_FAILED = 'fallido'
+    STATUS_EXPIRED = 'expirado'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_PROCESSING, 'En proceso'),
+        (STATUS_COMPLETED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_EXPIRED, 'Expirado'),
+    ]
+
+    report_type = models.CharField(max_length=20, choices=TYPE_CHOICES, null=False, blank=False, verbose_name="tipo de reporte")
+    incident_id = models.IntegerField(null=True, blank=True, verbose_name="incidente")
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        null=False,
+        blank=False,
+        verbose_name="estado del reporte"
+    )
+
+    requested_by = models.IntegerField(null=False, blank=False, verbose_name="solicitado por")
+    content = models.BinaryField(null=True, blank=True, editable=False, verbose_name="PDF generado")
+    error = models.TextField(null=True, blank=True, verbose_name="error")
+    created_at = models.DateTimeField(auto_now_add=True, editable=False, verbose_name="fecha de solicitud")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="inicio del procesamiento")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="fin del procesamiento")
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="fecha de expiración")
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} #{self.id} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'report_job'
+        verbose_name = "Trabajo de reporte"
+        verbose_name_plural = "Trabajos de reporte"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_status_idx'),
+            models.Index(fields=['status', 'expires_at'], name='report_job_expires_idx'),
+        ]
+
+class ImageOperation(models.Model):
+    """
+    Subida o eliminación de una imagen en el almacenamiento (Cloudinary o disco local)
+    pendiente de ejecutar.
+    Se registra dentro de la transacción de la solicitud y la ejecuta un hilo después
+    del commit o, si eso falla, el comando 'manage.py process_image_operations'.
+    Los bytes de una subida se guardan en la misma fila ('staged_content'): el proceso web y
+    el worker no comparten disco, pero sí la base de datos.
+    """
+
+    OPERATION_UPLOAD = 'upload'
+    OPERATION_DESTROY = 'destroy'
+
+    OPERATION_CHOICES = [
+        (OPERATION_UPLOAD, 'Subir imagen'),
+        (OPERATION_DESTROY, 'Eliminar imagen'),
+    ]
+
+    STATUS_PENDING = 'pendiente'
+    STATUS_PROCESSING = 'procesando'
+    STATUS_COMPLETED = 'completado'
+    STATUS_FAILED = 'fallido'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_PROCESSING, 'En proceso'),
+        (STATUS_COMPLETED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES, null=False, blank=False, verbose_name="operación")
+    incident_id = models.IntegerField(null=True, blank=True, verbose_name="incidente")
+    public_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Cloudinary Public ID")
+    staged_content = models.BinaryField(null=True, blank=True, editable=False, verbose_name="imagen pendiente de subir")
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        null=False,
+        blank=False,
+        verbose_name="estado de la operación"
+    )
+
+    attempts = models.PositiveIntegerField(default=0, verbose_name="intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="próximo intento")
+    last_error = models.TextField(null=True, blank=True, verbose_name="último error")
+    created_at = models.DateTimeField(auto_now_add=True, editable=False, verbose_name="fecha de creación")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="inicio del procesamiento")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="fin del procesamiento")
+
+    def __str__(self):
+        return f"{self.get_operation_display()} #{self.id} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'image_operation'
+        verbose_name = "Operación de imagen"
+        verbose_name_plural = "Operaciones de imagen"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='image_operation_pending_idx'),
+            models.Index(fields=['incident_id', 'operation'], name='image_operation_incident_idx'),
+        ]
+
+class IncidentStatCounter(models.Model):
+    """
+    Contador precalculado de incidentes por dimensión (estado, activo, tipo, creador, fecha),
+    que sirve al endpoint de estadísticas sin recorrer la tabla 'incident'.
+    Lo actualizan las vistas al crear, resolver, activar/desactivar y eliminar incidentes
+    (incident/stats.py) y lo recalcula por completo 'manage.py rebuild_incident_stats'.
+
+    Cada contador se reparte en varias filas ('slot'): así las transacciones concurrentes
+    que crean incidentes no se bloquean todas en la misma fila. El valor real es la suma.
+    """
+
+    DIMENSION_TOTAL = 'total'
+    DIMENSION_STATUS = 'status'
+    DIMENSION_ACTIVE = 'active'
+    DIMENSION_INCIDENT_TYPE = 'incident_type'
+    DIMENSION_CREATED_BY = 'created_by'
+    DIMENSION_DATE = 'date'
+
+    DIMENSION_CHOICES = [
+        (DIMENSION_TOTAL, 'Total'),
+        (DIMENSION_STATUS, 'Estado'),
+        (DIMENSION_ACTIVE, 'Activo'),
+        (DIMENSION_INCIDENT_TYPE, 'Tipo de incidente'),
+        (DIMENSION_CREATED_BY, 'Creador'),
+        (DIMENSION_DATE, 'Fecha del incidente'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, null=False, blank=False, verbose_name="dimensión")
+    value = models.CharField(max_length=100, null=False, blank=True, verbose_name="valor")
+    slot = models.PositiveSmallIntegerField(default=0, verbose_name="fila del contador")
+    count = models.BigIntegerField(default=0, verbose_name="cantidad")
+
+    def __str__(self):
+        return f"{self.dimension}={self.value} [{self.slot}]: {self.count}"
+
+    class Meta:
+        db_table = 'incident_stat_counter'
+        verbose_name = "Contador de incidentes"
+        verbose_name_plural = "Contadores de incidentes"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value', 'slot'], name='incident_stat_counter_unique'),
+        ]
@@ -0,0 +1,202 @@
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections, close_old_connections, transaction
+from django.utils import timezone
+
+from incident.models import Incident, ReportJob
+from incident.reports import (
+    get_active_report_queryset, get_specific_report_incident, get_archived_report_incident, should_render_in_parallel,
+    build_active_report, build_active_report_in_chunks, build_specific_report, build_archived_report, init_report_worker,
+)
+
+
+# Un trabajo 'procesando' más antiguo que esto se considera abandonado (worker caído) y vuelve a la cola.
+STALE_JOB_MINUTES = 30
+
+
+class ReportJobError(Exception):
+    """
+    Error esperado al generar un reporte (el incidente cambió de estado, no hay datos, etc.).
+    Su mensaje se guarda tal cual en el trabajo.
+    """
+
+
+def serialize_report_job(job: ReportJob) -> dict:
+    return {
+        "id": job.id,
+        "report_type": job.report_type,
+        "incident_id": job.incident_id,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "error": job.error,
+        "created_at": job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        "finished_at": job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None,
+        "expires_at": job.expires_at.strftime('%Y-%m-%d %H:%M:%S') if job.expires_at else None,
+    }
+
+
+def claim_report_jobs(limit: int) -> list:
+    """
+    Marca como 'procesando' hasta 'limit' trabajos pendientes y devuelve sus IDs.
+    Los registros se bloquean con SELECT ... FOR UPDATE (SKIP LOCKED si el motor lo
+    soporta) para que varios workers no tomen el mismo trabajo.
+    """
+    with transaction.atomic():
+        pending = ReportJob.objects.filter(status=ReportJob.STATUS_PENDING).order_by('created_at', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        elif connection.features.has_select_for_update:
+            pending = pending.select_for_update()
+
+        job_ids = list(pending.values_list('id', flat=True)[:limit])
+        if job_ids:
+            ReportJob.objects.filter(id__in=job_ids).update(status=ReportJob.STATUS_PROCESSING, started_at=timezone.now())
+
+    return job_ids
+
+
+def render_report_job(job_id: int, render_executor=None):
+    """
+    Genera el PDF de un trabajo y lo guarda en la fila ('content'). Se ejecuta dentro de un
+    proceso del pool, salvo los reportes de activos que process_report_jobs genera en el
+    proceso principal con 'render_executor'. El PDF se arma en un archivo temporal "spooled"
+    y se guarda completo, así que una descarga nunca lee un PDF a medio escribir.
+    Lanza ReportJobError si el reporte ya no se puede generar.
+    """
+    close_old_connections()
+    job = ReportJob.objects.defer('content').get(pk=job_id)
+
+    try:
+        user = User.objects.get(pk=job.requested_by)
+    except User.DoesNotExist:
+        raise ReportJobError("El usuario que solicitó el reporte ya no existe.")
+
+    if job.report_type == ReportJob.TYPE_ACTIVE:
+        report_data = get_active_report_queryset(user)
+        incident_count = report_data.count()
+        if not incident_count:
+            raise ReportJobError("No hay incidentes activos para mostrar en el reporte.")
+        if should_render_in_parallel(incident_count, render_executor):
+            build_report = lambda output, queryset: build_active_report(output, list(queryset), render_executor)
+        else:
+            build_report = build_active_report_in_chunks
+    else:
+        try:
+            if job.report_type == ReportJob.TYPE_SPECIFIC:
+                build_report, report_data = build_specific_report, get_specific_report_incident(job.incident_id)
+            else:
+                build_report, report_data = build_archived_report, get_archived_report_incident(job.incident_id)
+        except Incident.DoesNotExist:
+            raise ReportJobError("El incidente ya no existe o cambió de estado desde que se solicitó el reporte.")
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_MEMORY) as report_file:
+        build_report(report_file, report_data)
+        report_file.seek(0)
+        ReportJob.objects.filter(pk=job_id).update(content=report_file.read())
+
+
+def finish_report_job(job_id: int, error: str = None):
+    now = timezone.now()
+    if error:
+        ReportJob.objects.filter(pk=job_id).update(status=ReportJob.STATUS_FAILED, content=None, error=error, finished_at=now)
+    else:
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.STATUS_COMPLETED,
+            error=None,
+            finished_at=now,
+            expires_at=now + timedelta(hours=settings.REPORT_JOBS_TTL_HOURS),
+        )
+
+
+def requeue_stale_report_jobs() -> int:
+    """
+    Devuelve a la cola los trabajos que quedaron 'procesando' porque su worker se detuvo.
+    """
+    limit = timezone.now() - timedelta(minutes=STALE_JOB_MINUTES)
+    return ReportJob.objects.filter(status=ReportJob.STATUS_PROCESSING, started_at__lt=limit).update(
+        status=ReportJob.STATUS_PENDING, started_at=None
+    )
+
+
+def cleanup_expired_report_jobs() -> int:
+    """
+    Borra los PDF vencidos de la base de datos y marca sus trabajos como 'expirado'.
+    """
+    return ReportJob.objects.filter(status=ReportJob.STATUS_COMPLETED, expires_at__lte=timezone.now()).update(
+        status=ReportJob.STATUS_EXPIRED, content=None
+    )
+
+
+def create_report_worker_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_report_worker)
+
+
+def record_report_job_result(job_id: int, wait_for_report, result: dict) -> bool:
+    """
+    Registra el resultado de un trabajo. 'wait_for_report' termina cuando el PDF quedó
+    guardado o lanza el error con el que terminó. Devuelve True si el error fue que un
+    proceso del pool murió (BrokenProcessPool).
+    """
+    pool_broken = False
+    try:
+        wait_for_report()
+    except ReportJobError as e:
+        error = str(e)
+    except BrokenProcessPool:
+        pool_broken = True
+        error = "El proceso que generaba el reporte terminó inesperadamente."
+    except Exception as e:
+        error = f"Error al generar el reporte ({type(e).__name__}): {e}"
+    else:
+        finish_report_job(job_id)
+        result["completed"] += 1
+        return False
+
+    finish_report_job(job_id, error=error)
+    result["failed"] += 1
+    return pool_broken
+
+
+def process_report_jobs(executor: ProcessPoolExecutor, limit: int, render_executor: ProcessPoolExecutor = None) -> dict:
+    """
+    Toma un lote de trabajos pendientes, los genera en paralelo en el pool de procesos
+    y registra el resultado de cada uno.
+    Con 'render_executor' (REPORT_PARALLEL_WORKERS > 1) los reportes de activos se generan
+    en este proceso, repartiendo sus bloques en ese pool: un proceso del pool de trabajos no
+    crea pools propios.
+    Devuelve un diccionario con la cantidad de reportes completados y fallidos.
+    Si un proceso de cualquiera de los pools muere (p. ej. por falta de memoria) se relanza
+    BrokenProcessPool después de registrar los resultados, para que quien llama cree pools nuevos.
+    """
+    result = {"completed": 0, "failed": 0}
+    pool_broken = False
+
+    job_ids = claim_report_jobs(limit)
+    if not job_ids:
+        return result
+
+    local_job_ids = []
+    if render_executor is not None:
+        local_job_ids = list(ReportJob.objects.filter(id__in=job_ids, report_type=ReportJob.TYPE_ACTIVE).values_list('id', flat=True))
+
+    # Los procesos hijos pueden crearse con fork: no deben heredar sockets abiertos a la base de datos.
+    connections.close_all()
+    futures = {executor.submit(render_report_job, job_id): job_id for job_id in job_ids if job_id not in local_job_ids}
+
+    for job_id in local_job_ids:
+        if record_report_job_result(job_id, lambda: render_report_job(job_id, render_executor), result):
+            pool_broken = True
+
+    for future in as_completed(futures):
+        if record_report_job_result(futures[future], future.result, result):
+            pool_broken = True
+
+    if pool_broken:
+        raise BrokenProcessPool("El pool de procesos de reportes dejó de funcionar.")
+    return result
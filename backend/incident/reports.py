@@ -0,0 +1,407 @@
+import io
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+
+from incident.models import Incident, ReportJob
+from incident.user_names import get_user_names_for_incidents, resolve_user_name
+from utilities.report_images import fetch_report_image, fetch_report_image_sources
+
+
+# Estilos compartidos por todos los reportes. Se crean una sola vez por proceso:
+# ReportLab solo los lee al armar el documento, así que se pueden reutilizar.
+ACTIVE_REPORT_TITLE = "Reporte de Incidentes Activos"
+SPECIFIC_REPORT_TITLE = "Reporte de Incidente Específico"
+ARCHIVED_REPORT_TITLE = "Reporte de Incidente Archivado"
+
+ACTIVE_DETAILS_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+INCIDENT_DETAIL_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'), ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'), ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6), ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+@lru_cache(maxsize=None)
+def get_report_styles():
+    return getSampleStyleSheet()
+
+
+def draw_page_number(canvas, page_number):
+    canvas.setFont('Helvetica', 9)
+    canvas.drawString(inch, 0.75 * inch, f"Página {page_number}")
+
+
+@lru_cache(maxsize=None)
+def make_header(title, numbered=True):
+    """
+    Devuelve la función que dibuja el encabezado y el número de página de cada hoja.
+    Se crea una sola vez por título. Con numbered=False no dibuja el número de página
+    (las partes de un reporte generado en paralelo se numeran al unirlas).
+    """
+    def draw_header(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 16)
+        header_y_position = doc.pagesize[1] - 0.75 * inch
+        canvas.drawCentredString(letter[0] / 2.0, header_y_position, title)
+        if numbered:
+            draw_page_number(canvas, doc.page)
+        canvas.restoreState()
+    return draw_header
+
+
+def render_report(output, title, story, numbered=True):
+    """
+    Único punto donde se arma un documento: misma página, márgenes y encabezado para
+    todos los reportes. Escribe el PDF en 'output' y devuelve la cantidad de páginas.
+    """
+    doc = SimpleDocTemplate(output, pagesize=letter, topMargin=1.2 * inch, rightMargin=72, leftMargin=72, bottomMargin=72)
+    draw_header = make_header(title, numbered)
+    doc.build(story, onFirstPage=draw_header, onLaterPages=draw_header)
+    return doc.page
+
+
+def init_report_worker():
+    """
+    Inicializador de cada proceso de un pool de reportes: deja Django listo para usar el ORM.
+    Las conexiones a la base de datos se abren dentro del proceso hijo, nunca se heredan.
+    """
+    import django
+    django.setup()
+
+
+def get_active_report_queryset(user):
+    """
+    QuerySet (sin evaluar) de los incidentes activos que el usuario puede incluir en el
+    reporte general: todos para superusuarios, solo los propios para el resto.
+    """
+    base_query = Incident.objects.filter(
+        status=Incident.STATUS_ACTIVE,
+        active=True
+    )
+
+    if user.is_superuser:
+        return base_query.order_by('created_at')
+    return base_query.filter(created_by=user.id).order_by('created_at')
+
+
+def get_active_report_chunk(queryset, chunk_size, after=None):
+    """
+    Hasta 'chunk_size' incidentes del QuerySet en orden (created_at, id), a partir del
+    incidente 'after' (keyset: cada bloque es una consulta corta que usa el índice por
+    created_at, sin OFFSET).
+    """
+    if after is not None:
+        queryset = queryset.filter(created_at__gte=after.created_at).exclude(created_at=after.created_at, id__lte=after.id)
+    return list(queryset.order_by('created_at', 'id')[:chunk_size])
+
+
+def iter_active_report_chunks(queryset, chunk_size):
+    """
+    Recorre el QuerySet en bloques de 'chunk_size' incidentes (ver get_active_report_chunk).
+    """
+    incidents = get_active_report_chunk(queryset, chunk_size)
+    while incidents:
+        yield incidents
+        if len(incidents) < chunk_size:
+            break
+        incidents = get_active_report_chunk(queryset, chunk_size, after=incidents[-1])
+
+
+def get_specific_report_incident(incident_id):
+    """
+    Lanza Incident.DoesNotExist si el incidente no existe o no está activo.
+    """
+    return Incident.objects.get(pk=incident_id, status=Incident.STATUS_ACTIVE, active=True)
+
+
+def get_archived_report_incident(incident_id):
+    """
+    Lanza Incident.DoesNotExist si el incidente no existe o no está resuelto/inactivo.
+    """
+    return Incident.objects.get(Q(status=Incident.STATUS_RESOLVED) | Q(active=False), pk=incident_id)
+
+
+def can_generate_report(user, incident):
+    return user.is_superuser or incident.created_by == user.id
+
+
+def build_active_report(output, incidents, render_executor=None):
+    """
+    Genera el PDF con todos los incidentes activos indicados (una lista ya cargada) y lo
+    escribe en 'output'. Los nombres de usuario y las imágenes se obtienen aquí, una sola vez.
+    Si se pasa un pool de procesos ('render_executor') y el reporte es grande, se genera por
+    partes en ese pool (ver render_active_report_in_parallel); solo el worker de reportes en
+    segundo plano pasa un pool. Para no cargar todos los incidentes a la vez, usar
+    build_active_report_in_chunks. Devuelve la cantidad de páginas.
+    """
+    user_names = get_user_names_for_incidents(incidents)
+    image_sources = fetch_report_image_sources((incident.image_url, incident.image_public_id) for incident in incidents)
+
+    if should_render_in_parallel(len(incidents), render_executor):
+        return render_active_report_in_parallel(output, incidents, user_names, image_sources, render_executor)
+
+    return render_active_report(output, incidents, user_names, image_sources)
+
+
+def render_active_report(output, incidents, user_names, image_sources, numbered=True):
+    """
+    Arma y genera el reporte de activos con los datos ya obtenidos (sin consultas ni descargas).
+    Las imágenes en caché se pasan a ReportLab como ruta de archivo: cada una se lee
+    recién al dibujar su página, y ReportLab descarta los elementos de la historia a
+    medida que completa cada página. Devuelve la cantidad de páginas.
+    """
+    styles = get_report_styles()
+
+    story = []
+
+    for incident in incidents:
+        story.append(Paragraph(f"ID: {incident.id} - {incident.incident_type}", styles['h2']))
+        story.append(Spacer(1, 0.1 * inch))
+
+        created_by_name = resolve_user_name(user_names, incident.created_by) or "N/A"
+        details_data = [
+            ['Fecha:', str(incident.date)],
+            ['Reportado Por:', created_by_name],
+            ['Descripción:', Paragraph(incident.description, styles['BodyText'])]
+        ]
+
+        details_table = Table(details_data, colWidths=[1.2*inch, 5.3*inch])
+        details_table.setStyle(ACTIVE_DETAILS_TABLE_STYLE)
+        story.append(details_table)
+        story.append(Spacer(1, 0.2 * inch))
+
+        if incident.image_url:
+            try:
+                image_source = image_sources.get(incident.image_url)
+                if isinstance(image_source, Exception):
+                    raise image_source
+                if isinstance(image_source, bytes):
+                    image_source = io.BytesIO(image_source)
+
+                img = Image(image_source, width=3*inch, height=2.25*inch, kind='proportional')
+                story.append(img)
+            except Exception as e:
+                story.append(Paragraph(f"Error al cargar imagen: {e}", styles['Italic']))
+
+        story.append(Spacer(1, 0.5 * inch))
+
+    return render_report(output, ACTIVE_REPORT_TITLE, story, numbered)
+
+
+def should_render_in_parallel(incident_count, render_executor=None):
+    return render_executor is not None and incident_count >= settings.REPORT_PARALLEL_MIN_INCIDENTS
+
+
+def render_active_report_chunk(incidents, user_names, image_sources):
+    """
+    Genera una parte del reporte de activos sin número de página. Se ejecuta en un proceso del pool.
+    Devuelve (bytes del PDF, cantidad de páginas).
+    """
+    output = io.BytesIO()
+    page_count = render_active_report(output, incidents, user_names, image_sources, numbered=False)
+    return output.getvalue(), page_count
+
+
+def stamp_page_numbers(pdf_content, first_page_number):
+    """
+    Agrega "Página N" a cada página de una parte ya generada, empezando por 'first_page_number',
+    en la misma posición que usa draw_header. Se ejecuta en un proceso del pool.
+    """
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf_content)))
+
+    numbers_output = io.BytesIO()
+    canvas = Canvas(numbers_output, pagesize=letter)
+    for page_number in range(first_page_number, first_page_number + len(writer.pages)):
+        draw_page_number(canvas, page_number)
+        canvas.showPage()
+    canvas.save()
+
+    for page, number_page in zip(writer.pages, PdfReader(numbers_output).pages):
+        page.merge_page(number_page)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def render_active_report_in_parallel(output, incidents, user_names, image_sources, executor):
+    """
+    Divide los incidentes en bloques de REPORT_PARALLEL_CHUNK_SIZE y genera cada bloque como
+    un PDF independiente en el pool de procesos. Cada bloque empieza en una página nueva y
+    lleva el mismo encabezado. Con la cantidad de páginas de cada bloque se calcula dónde
+    empieza la numeración de cada uno; el número se estampa también en paralelo y al final
+    las partes se unen en orden. Devuelve la cantidad de páginas.
+    Si un proceso del pool muere se lanza BrokenProcessPool.
+    """
+    chunk_size = settings.REPORT_PARALLEL_CHUNK_SIZE
+    render_futures = []
+
+    # Los procesos del pool pueden crearse con fork: no deben heredar sockets abiertos a la base de datos.
+    connections.close_all()
+
+    for start in range(0, len(incidents), chunk_size):
+        chunk = incidents[start:start + chunk_size]
+        chunk_user_ids = {incident.created_by for incident in chunk}
+        chunk_user_names = {user_id: name for user_id, name in user_names.items() if user_id in chunk_user_ids}
+        # Solo se envía lo que el bloque usa; los errores viajan como texto (algunas excepciones no se pueden serializar).
+        chunk_image_sources = {
+            incident.image_url: Exception(str(image_sources[incident.image_url])) if isinstance(image_sources[incident.image_url], Exception) else image_sources[incident.image_url]
+            for incident in chunk if incident.image_url in image_sources
+        }
+        render_futures.append(executor.submit(render_active_report_chunk, chunk, chunk_user_names, chunk_image_sources))
+
+    stamp_futures = []
+    first_page_number = 1
+    for future in render_futures:
+        pdf_content, page_count = future.result()
+        stamp_futures.append(executor.submit(stamp_page_numbers, pdf_content, first_page_number))
+        first_page_number += page_count
+
+    writer = PdfWriter()
+    for future in stamp_futures:
+        writer.append(PdfReader(io.BytesIO(future.result())))
+
+    writer.write(output)
+    return len(writer.pages)
+
+
+def build_active_report_in_chunks(output, queryset, chunk_size=None):
+    """
+    Genera el reporte de activos del QuerySet en bloques de REPORT_ACTIVE_CHUNK_SIZE incidentes,
+    uno tras otro en este proceso: cada bloque carga sus incidentes, sus nombres de usuario y
+    sus imágenes, se genera como un PDF aparte (render_active_report_chunk), se numera
+    (stamp_page_numbers) y se guarda en un archivo temporal antes de pasar al siguiente, así
+    que en memoria solo hay un bloque a la vez. Al final las partes se unen en 'output'.
+    Si todo entra en un bloque se genera directamente, sin unir partes.
+    Devuelve la cantidad de páginas.
+    """
+    chunk_size = chunk_size or settings.REPORT_ACTIVE_CHUNK_SIZE
+    parts = []
+    first_page_number = 1
+
+    try:
+        for incidents in iter_active_report_chunks(queryset, chunk_size):
+            user_names = get_user_names_for_incidents(incidents)
+            image_sources = fetch_report_image_sources((incident.image_url, incident.image_public_id) for incident in incidents)
+
+            if not parts and len(incidents) < chunk_size:
+                return render_active_report(output, incidents, user_names, image_sources)
+
+            pdf_content, page_count = render_active_report_chunk(incidents, user_names, image_sources)
+            part = tempfile.TemporaryFile()
+            parts.append(part)
+            part.write(stamp_page_numbers(pdf_content, first_page_number))
+            first_page_number += page_count
+
+        if not parts:
+            return render_active_report(output, [], {}, {})
+
+        writer = PdfWriter()
+        for part in parts:
+            part.seek(0)
+            writer.append(PdfReader(part))
+        writer.write(output)
+        return len(writer.pages)
+    finally:
+        for part in parts:
+            part.close()
+
+
+def build_incident_detail_report(output, incident, title, heading, rows, label_width):
+    """
+    Código común de los reportes de un solo incidente: título, tabla de datos e imagen adjunta.
+    'rows' es la lista de filas [etiqueta, valor] de la tabla. Devuelve la cantidad de páginas.
+    """
+    styles = get_report_styles()
+    story = [
+        Paragraph(heading, styles['h1']),
+        Spacer(1, 0.2 * inch),
+    ]
+
+    table = Table(rows, colWidths=[label_width, 7 * inch - label_width])
+    table.setStyle(INCIDENT_DETAIL_TABLE_STYLE)
+    story.append(table)
+    story.append(Spacer(1, 0.2 * inch))
+
+    if incident.image_url:
+        story.append(Paragraph("Imagen Adjunta:", styles['h2']))
+        try:
+            img = Image(io.BytesIO(fetch_report_image(incident.image_url, incident.image_public_id)), width=4*inch, height=3*inch, kind='proportional')
+            story.append(img)
+        except Exception as e:
+            story.append(Paragraph(f"No se pudo cargar la imagen: {e}", styles['BodyText']))
+
+    return render_report(output, title, story)
+
+
+def build_specific_report(output, incident):
+    """
+    Genera el PDF de detalle de un incidente activo y lo escribe en 'output'.
+    """
+    styles = get_report_styles()
+    user_names = get_user_names_for_incidents([incident])
+
+    rows = [
+        ["ID Incidente:", Paragraph(str(incident.id), styles['BodyText'])],
+        ["Tipo de Incidente:", Paragraph(incident.incident_type, styles['BodyText'])],
+        ["Fecha del Incidente:", str(incident.date)],
+        ["Estado:", incident.get_status_display()],
+        ["Descripción:", Paragraph(incident.description, styles['BodyText'])],
+        ["Reportado por:", resolve_user_name(user_names, incident.created_by)],
+        ["Fecha de Creación:", incident.created_at.strftime('%Y-%m-%d %H:%M:%S')],
+    ]
+
+    return build_incident_detail_report(output, incident, SPECIFIC_REPORT_TITLE, "Detalle del Incidente", rows, 1.5 * inch)
+
+
+def build_archived_report(output, incident):
+    """
+    Genera el PDF de un incidente resuelto o inactivo y lo escribe en 'output'.
+    """
+    styles = get_report_styles()
+    user_names = get_user_names_for_incidents([incident])
+
+    rows = [
+        ["ID Incidente:", Paragraph(str(incident.id), styles['BodyText'])],
+        ["Tipo de Incidente:", Paragraph(incident.incident_type, styles['BodyText'])],
+        ["Fecha del Incidente:", str(incident.date)],
+        ["Descripción:", Paragraph(incident.description, styles['BodyText'])],
+        ["Reportado por:", resolve_user_name(user_names, incident.created_by)],
+        ["Fecha de Creación:", incident.created_at.strftime('%Y-%m-%d %H:%M:%S')],
+    ]
+
+    if incident.status == Incident.STATUS_RESOLVED:
+        rows.append(["Estado Final:", incident.get_status_display()])
+        rows.append(["Comentario de Solución:", Paragraph(incident.comment or "N/A", styles['BodyText'])])
+        rows.append(["Resuelto/Modificado por:", resolve_user_name(user_names, incident.modified_by)])
+        rows.append(["Fecha de Actualización:", incident.updated_at.strftime('%Y-%m-%d %H:%M:%S')])
+
+    if not incident.active:
+        rows.append(["Visibilidad:", Paragraph("Inactivo (Oculto en listados activos)", styles['BodyText'])])
+
+    return build_incident_detail_report(output, incident, ARCHIVED_REPORT_TITLE, "Detalle del Incidente Archivado", rows, 1.8 * inch)
+
+
+def get_report_filename(report_type, incident_id=None):
+    if report_type == ReportJob.TYPE_ACTIVE:
+        return "reporte_incidentes_activos.pdf"
+    if report_type == ReportJob.TYPE_SPECIFIC:
+        return f"reporte_incidente_{incident_id}.pdf"
+    return f"reporte_archivado_{incident_id}.pdf"
@@ -0,0 +1,71 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# MySQL ignora en el índice FULLTEXT las palabras más cortas que innodb_ft_min_token_size (3 por defecto).
+SEARCH_MIN_TERM_LENGTH = 3
+SEARCH_MAX_TERMS = 10
+
+
+class InvalidSearchError(ValueError):
+    pass
+
+
+def parse_search_terms(query: str) -> list:
+    """
+    Separa el texto buscado en palabras (sin operadores ni comillas del usuario).
+    Lanza InvalidSearchError si no queda ninguna palabra utilizable.
+    """
+    terms = [term for term in re.findall(r"\w+", query or '') if len(term) >= SEARCH_MIN_TERM_LENGTH]
+    if not terms:
+        raise InvalidSearchError(f"La búsqueda debe incluir al menos una palabra de {SEARCH_MIN_TERM_LENGTH} o más caracteres.")
+    return list(dict.fromkeys(term.lower() for term in terms))[:SEARCH_MAX_TERMS]
+
+
+def search_incidents(queryset, query: str):
+    """
+    Filtra el QuerySet de incidentes a los que contienen alguna de las palabras buscadas en
+    incident_type, description o comment, y lo anota con 'search_rank' (mayor = más relevante).
+
+    - MySQL: MATCH ... AGAINST en modo lenguaje natural sobre el índice FULLTEXT.
+    - SQLite: tabla FTS5 'incident_fts' con ranking bm25.
+    - Otros motores: icontains sin ranking (recorre la tabla).
+
+    Ambas variantes con índice se crean en la migración 0011_incident_fulltext_search.
+    Lanza InvalidSearchError si el texto no tiene palabras utilizables.
+
+    La relevancia no es un valor fijo del incidente: MySQL y bm25 la calculan con las
+    estadísticas de todo el índice, que cambian cuando se crean, modifican o eliminan
+    incidentes. Por eso la paginación por cursor sobre 'search_rank' es aproximada: si la
+    tabla cambia entre una página y la siguiente, un resultado puede repetirse u omitirse.
+    Para recorrer todos los incidentes de forma estable se usa el listado o la exportación.
+    """
+    terms = parse_search_terms(query)
+
+    if connection.vendor == 'mysql':
+        rank = RawSQL(
+            "MATCH (incident.incident_type, incident.description, incident.comment) AGAINST (%s IN NATURAL LANGUAGE MODE)",
+            [' '.join(terms)],
+            output_field=FloatField()
+        )
+        # 'search_rank > 0' en el WHERE lo resuelve el índice FULLTEXT.
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+    if connection.vendor == 'sqlite':
+        fts_query = ' OR '.join(f'"{term}"' for term in terms)
+        # bm25() es negativo y menor cuanto más relevante: se invierte el signo.
+        rank = RawSQL(
+            "SELECT -bm25(incident_fts) FROM incident_fts WHERE incident_fts MATCH %s AND incident_fts.rowid = incident.id",
+            [fts_query],
+            output_field=FloatField()
+        )
+        matching_ids = RawSQL("SELECT rowid FROM incident_fts WHERE incident_fts MATCH %s", [fts_query])
+        return queryset.filter(id__in=matching_ids).annotate(search_rank=rank)
+
+    condition = Q()
+    for term in terms:
+        condition |= Q(incident_type__icontains=term) | Q(description__icontains=term) | Q(comment__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
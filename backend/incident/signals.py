@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from incident.models import Incident
+from utilities.report_cache import invalidate_cached_reports
+
+
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=Incident)
+def invalidate_incident_reports(sender, instance, **kwargs):
+    """
+    Cualquier guardado o eliminación de un incidente descarta sus reportes PDF en caché.
+    (La clave ya incluye updated_at; esto además libera el espacio de la versión anterior.)
+    """
+    invalidate_cached_reports(instance.id)
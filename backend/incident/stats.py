@@ -0,0 +1,152 @@
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Incident, IncidentStatCounter
+from .user_names import resolve_user_name
+
+
+# Campo de Incident que corresponde a cada dimensión (la dimensión 'total' no tiene campo).
+STAT_DIMENSION_FIELDS = {
+    IncidentStatCounter.DIMENSION_STATUS: 'status',
+    IncidentStatCounter.DIMENSION_ACTIVE: 'active',
+    IncidentStatCounter.DIMENSION_INCIDENT_TYPE: 'incident_type',
+    IncidentStatCounter.DIMENSION_CREATED_BY: 'created_by',
+    IncidentStatCounter.DIMENSION_DATE: 'date',
+}
+
+
+def format_stat_value(field_name: str, value) -> str:
+    """
+    Valor de un campo de Incident tal como se guarda en IncidentStatCounter.value.
+    """
+    if value is None:
+        return ''
+    # Las vistas pueden asignar valores sin convertir (p. ej. active='false' desde un formulario).
+    value = Incident._meta.get_field(field_name).to_python(value)
+    if field_name == 'active':
+        return 'true' if value else 'false'
+    if field_name == 'date':
+        return value.isoformat()
+    return str(value)
+
+
+def get_incident_stat_keys(incident) -> list:
+    """
+    Contadores (dimensión, valor) en los que cuenta el incidente en su estado actual.
+    """
+    keys = [(IncidentStatCounter.DIMENSION_TOTAL, '')]
+    for dimension, field_name in STAT_DIMENSION_FIELDS.items():
+        keys.append((dimension, format_stat_value(field_name, getattr(incident, field_name))))
+    return keys
+
+
+def record_incident_stats(old_keys=(), new_keys=()):
+    """
+    Actualiza los contadores dentro de la transacción actual: resta 1 en 'old_keys' (estado
+    anterior del incidente) y suma 1 en 'new_keys' (estado nuevo). Las claves que no cambian
+    no se tocan. Para crear se pasa solo new_keys y para eliminar solo old_keys.
+
+    Cada llamada usa una de las INCIDENT_STATS_COUNTER_SLOTS filas del contador, elegida al
+    azar, y un único INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT en SQLite/PostgreSQL):
+    crea la fila si no existe y si existe la incrementa, sin lecturas previas.
+    """
+    deltas = Counter(new_keys)
+    deltas.subtract(old_keys)
+    slot = random.randrange(max(settings.INCIDENT_STATS_COUNTER_SLOTS, 1))
+
+    # Siempre en el mismo orden para que dos transacciones no se bloqueen mutuamente.
+    rows = [(dimension, value, slot, delta) for (dimension, value), delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(IncidentStatCounter._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in ('dimension', 'value', 'slot', 'count'))
+    count_column = connection.ops.quote_name('count')
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+
+    if connection.vendor == 'mysql':
+        conflict_clause = f"ON DUPLICATE KEY UPDATE {count_column} = {count_column} + VALUES({count_column})"
+    else:
+        conflict_clause = (
+            f"ON CONFLICT ({', '.join(connection.ops.quote_name(column) for column in ('dimension', 'value', 'slot'))}) "
+            f"DO UPDATE SET {count_column} = {table}.{count_column} + excluded.{count_column}"
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) VALUES {placeholders} {conflict_clause}",
+            [param for row in rows for param in row]
+        )
+
+
+def rebuild_incident_stats(incident_model=Incident, counter_model=IncidentStatCounter) -> int:
+    """
+    Recalcula todos los contadores a partir de la tabla 'incident' y devuelve la cantidad
+    de filas de contador creadas.
+
+    Los contadores se borran antes de contar: el borrado bloquea las filas, así que una
+    solicitud que esté actualizando contadores espera a que termine la reconstrucción y
+    su incidente (todavía sin confirmar) no se cuenta dos veces.
+    Los modelos se pueden pasar para usarla desde una migración.
+    """
+    with transaction.atomic():
+        counter_model.objects.all().delete()
+
+        counters = [counter_model(dimension=IncidentStatCounter.DIMENSION_TOTAL, value='', count=incident_model.objects.count())]
+        for dimension, field_name in STAT_DIMENSION_FIELDS.items():
+            for entry in incident_model.objects.values(field_name).annotate(total=Count('id')).order_by():
+                counters.append(counter_model(
+                    dimension=dimension,
+                    value=format_stat_value(field_name, entry[field_name]),
+                    count=entry['total']
+                ))
+
+        counter_model.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
+
+
+def get_incident_stats(days=None) -> dict:
+    """
+    Estadísticas de incidentes leídas de los contadores (sumando sus filas). Con 'days' la
+    cantidad por fecha se limita a los incidentes de los últimos 'days' días.
+    """
+    counters = IncidentStatCounter.objects.all()
+    if days is not None:
+        since = (timezone.localdate() - timedelta(days=days - 1)).isoformat()
+        # Las fechas se guardan en formato ISO, que se ordena igual como texto.
+        counters = counters.exclude(Q(dimension=IncidentStatCounter.DIMENSION_DATE) & Q(value__lt=since))
+
+    totals = {}
+    for entry in counters.values('dimension', 'value').annotate(total=Sum('count')).order_by():
+        if entry['total']:
+            totals.setdefault(entry['dimension'], {})[entry['value']] = entry['total']
+
+    by_status = {status: 0 for status, _ in Incident.STATUS_CHOICES}
+    by_status.update(totals.get(IncidentStatCounter.DIMENSION_STATUS, {}))
+    by_active = {'true': 0, 'false': 0}
+    by_active.update(totals.get(IncidentStatCounter.DIMENSION_ACTIVE, {}))
+
+    by_creator_counts = totals.get(IncidentStatCounter.DIMENSION_CREATED_BY, {})
+    creator_ids = [int(value) for value in by_creator_counts if value]
+    users = User.objects.filter(id__in=creator_ids).values_list('id', 'first_name', 'username')
+    user_names = {user_id: first_name if first_name else username for user_id, first_name, username in users}
+    by_creator = []
+    for value, count in sorted(by_creator_counts.items(), key=lambda item: -item[1]):
+        creator_id = int(value) if value else None
+        by_creator.append({"created_by": creator_id, "created_by_name": resolve_user_name(user_names, creator_id), "count": count})
+
+    return {
+        "total": totals.get(IncidentStatCounter.DIMENSION_TOTAL, {}).get('', 0),
+        "by_status": by_status,
+        "by_active": by_active,
+        "by_incident_type": dict(sorted(totals.get(IncidentStatCounter.DIMENSION_INCIDENT_TYPE, {}).items(), key=lambda item: -item[1])),
+        "by_creator": by_creator,
+        "by_date": dict(sorted(totals.get(IncidentStatCounter.DIMENSION_DATE, {}).items())),
+    }
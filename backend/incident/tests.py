@@ -1,3 +1,473 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+import cloudinary.utils
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from jose import jwt
+from PIL import Image as PILImage
+from pypdf import PdfReader
+
+from incident.exports import iter_csv_export, iter_incident_chunks
+from incident.image_operations import process_image_operations, queue_image_upload
+from incident.management.commands.explain_incident_queries import (
+    capture_incident_queries, explain_uses_full_scan, get_hot_incident_queries,
+)
+from incident.models import ImageOperation, Incident, ReportJob
+from incident.report_jobs import cleanup_expired_report_jobs, process_report_jobs
+from incident.stats import get_incident_stats, rebuild_incident_stats
+from incident.reports import build_active_report_in_chunks, get_active_report_queryset, iter_active_report_chunks
+from incident.views import IncidentImageFile
+from notifications.models import EmailOutbox
+from utilities.cloudinary_uploads import (
+    InvalidUploadError, generate_upload_params, get_user_public_id_prefix, verify_direct_upload,
+)
+from utilities.image_pipeline import IMAGE_VARIANTS
+from utilities.image_storage import INCIDENT_IMAGE_FOLDER, ImageStorage, LocalImageStorage
+from utilities.pagination import CURSOR_NEXT, InvalidCursorError, encode_cursor, paginate_by_cursor
+from utilities.token_cache import clear_token_cache
+from utilities.user_cache import clear_user_cache
+
+
+def get_auth_client(user) -> Client:
+    token = jwt.encode({"id": user.id, "exp": int(time.time()) + 3600}, settings.SECRET_KEY, algorithm='HS512')
+    return Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+class CloudinaryConfigStubMixin:
+    """
+    Configura Cloudinary con credenciales locales de prueba: la firma y su verificación
+    no hacen llamadas de red, así que no hace falta una cuenta real.
+    """
+
+    def setUp(self):
+        super().setUp()
+        config = cloudinary.config()
+        previous = {key: getattr(config, key, None) for key in ('cloud_name', 'api_key', 'api_secret')}
+        cloudinary.config(cloud_name='demo-local', api_key='123456', api_secret='secreto-de-prueba')
+        self.addCleanup(lambda: cloudinary.config(**previous))
+
+
+class DirectUploadVerificationTests(CloudinaryConfigStubMixin, SimpleTestCase):
+
+    def sign_response(self, public_id, version, api_secret='secreto-de-prueba'):
+        # Firma que Cloudinary devuelve en la respuesta de la subida.
+        return cloudinary.utils.api_sign_request({'public_id': public_id, 'version': version}, api_secret)
+
+    def test_valid_signature_returns_secure_url(self):
+        public_id = generate_upload_params(user_id=7)['public_id']
+
+        image_url = verify_direct_upload(7, public_id, 1700000000, self.sign_response(public_id, 1700000000))
+
+        self.assertTrue(image_url.startswith('https://'))
+        self.assertIn('demo-local', image_url)
+        self.assertIn(public_id, image_url)
+
+    def test_tampered_signature_is_rejected(self):
+        public_id = generate_upload_params(user_id=7)['public_id']
+        signature = self.sign_response(public_id, 1700000000)
+
+        with self.assertRaises(InvalidUploadError):
+            verify_direct_upload(7, public_id, 1700000001, signature)
+        with self.assertRaises(InvalidUploadError):
+            verify_direct_upload(7, public_id, 1700000000, self.sign_response(public_id, 1700000000, api_secret='otro'))
+
+    def test_public_id_from_another_folder_or_user_is_rejected(self):
+        other_folder_id = f"otra_carpeta/u7_{'a' * 32}"
+        other_user_id = f"{get_user_public_id_prefix(8)}{'a' * 32}"
+
+        for public_id in (other_folder_id, other_user_id):
+            with self.assertRaises(InvalidUploadError):
+                verify_direct_upload(7, public_id, 1700000000, self.sign_response(public_id, 1700000000))
+
+
+class CursorPaginationTests(TestCase):
+
+    def setUp(self):
+        for day in range(1, 6):
+            Incident.objects.create(incident_type='Falla', description='d', date=date(2025, 1, day))
+
+    def test_walks_every_page_once(self):
+        seen = []
+        cursor = None
+        while True:
+            items, cursor, _ = paginate_by_cursor(Incident.objects.all(), ordering='-date', cursor=cursor, page_size=2)
+            seen += [incident.id for incident in items]
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(Incident.objects.values_list('id', flat=True)))
+
+    def test_tampered_cursor_value_raises_invalid_cursor(self):
+        for ordering, value in (('-created_at', 'garbage'), ('-date', '2025-13-45'), ('-created_at', None), ('-created_at', {'x': 1})):
+            cursor = encode_cursor(ordering, value, 1, CURSOR_NEXT)
+            with self.assertRaises(InvalidCursorError):
+                paginate_by_cursor(Incident.objects.all(), ordering=ordering, cursor=cursor, page_size=2)
+
+
+class IncidentQueryPlanTests(TestCase):
+    """
+    Las consultas del listado y de los reportes, armadas con el código de las vistas,
+    deben usar un índice (ver 'manage.py explain_incident_queries').
+    """
+
+    def test_hot_queries_do_not_scan_the_incident_table(self):
+        if connection.vendor not in ('mysql', 'sqlite'):
+            self.skipTest(f"EXPLAIN no soportado para {connection.vendor}")
+
+        for name, run in get_hot_incident_queries().items():
+            queries = capture_incident_queries(run)
+            self.assertTrue(queries, name)
+            for sql in queries:
+                full_scan, plan = explain_uses_full_scan(sql)
+                self.assertFalse(full_scan, f"{name} recorre la tabla completa:\n{plan}")
+
+
+class IncidentListQueryCountTests(TestCase):
+    """
+    El listado hace la misma cantidad de consultas sin importar cuántos incidentes
+    (ni de cuántos usuarios distintos) devuelve la página.
+    """
+
+    def setUp(self):
+        clear_user_cache()
+        clear_token_cache()
+        self.addCleanup(clear_user_cache)
+        self.addCleanup(clear_token_cache)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        self.client = get_auth_client(self.admin)
+
+    def create_incidents(self, count, first_number=0):
+        for number in range(first_number, first_number + count):
+            user = User.objects.create_user(f"usuario{number}", f"usuario{number}@example.com", 'Passw0rd!', first_name=f"Nombre{number}")
+            Incident.objects.create(incident_type='Corte', description='d', date=date(2025, 1, 1), created_by=user.id, modified_by=self.admin.id)
+
+    def list_incidents(self):
+        response = self.client.get('/api/v1/incident')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_query_count_does_not_grow_with_the_rows(self):
+        self.create_incidents(1)
+        # La primera solicitud llena la caché de usuarios y de tokens.
+        self.list_incidents()
+        with CaptureQueriesContext(connection) as single_row_queries:
+            self.assertEqual(len(self.list_incidents()), 1)
+
+        self.create_incidents(15, first_number=1)
+        with self.assertNumQueries(len(single_row_queries)):
+            data = self.list_incidents()
+
+        self.assertEqual(len(data), 16)
+        self.assertEqual({row['created_by_name'] for row in data}, {f"Nombre{number}" for number in range(16)})
+
+
+class ActiveReportChunkTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        created_at = timezone.now()
+        for number in range(5):
+            incident = Incident.objects.create(
+                incident_type=f"Tipo {number}", description='d', date=date(2025, 1, 1), created_by=self.admin.id,
+                image_url=f"https://example.com/{number}.jpg"
+            )
+            # Tres incidentes con la misma fecha de creación: el desempate es por id.
+            Incident.objects.filter(pk=incident.pk).update(created_at=created_at + timedelta(seconds=min(number, 2)))
+        self.queryset = get_active_report_queryset(self.admin)
+
+    def test_chunks_walk_every_incident_in_report_order(self):
+        chunks = list(iter_active_report_chunks(self.queryset, 2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual([incident.id for chunk in chunks for incident in chunk], list(self.queryset.order_by('created_at', 'id').values_list('id', flat=True)))
+
+    def test_images_are_fetched_per_chunk_and_pages_numbered_in_order(self):
+        output = io.BytesIO()
+        with mock.patch('incident.reports.fetch_report_image_sources', return_value={}) as fetch_images:
+            page_count = build_active_report_in_chunks(output, self.queryset, chunk_size=2)
+
+        self.assertEqual([len(list(call.args[0])) for call in fetch_images.call_args_list], [2, 2, 1])
+        pages = PdfReader(io.BytesIO(output.getvalue())).pages
+        self.assertEqual(len(pages), page_count)
+        for number, page in enumerate(pages, start=1):
+            self.assertIn(f"Página {number}", page.extract_text())
+
+
+class IncidentBulkTests(TestCase):
+
+    def setUp(self):
+        clear_user_cache()
+        clear_token_cache()
+        self.addCleanup(clear_user_cache)
+        self.addCleanup(clear_token_cache)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        self.client = get_auth_client(self.admin)
+        self.ana = User.objects.create_user('ana', 'ana@example.com', 'Passw0rd!', first_name='Ana')
+        self.beto = User.objects.create_user('beto', 'beto@example.com', 'Passw0rd!', first_name='Beto')
+
+        self.ana_first = self.create_incident(self.ana)
+        self.ana_second = self.create_incident(self.ana)
+        self.beto_first = self.create_incident(self.beto)
+        self.resolved = self.create_incident(self.ana, status=Incident.STATUS_RESOLVED, comment='Listo')
+        rebuild_incident_stats()
+
+    def create_incident(self, creator, **fields):
+        return Incident.objects.create(incident_type='Corte', description='d', date=date(2025, 1, 1), created_by=creator.id, **fields)
+
+    def bulk(self, action, ids, **fields):
+        return self.client.post('/api/v1/incident/bulk', {'action': action, 'ids': ids, **fields}, content_type='application/json')
+
+    def test_each_id_gets_its_own_result(self):
+        missing_id = self.resolved.id + 100
+        response = self.bulk('resolve', [self.ana_first.id, missing_id, self.resolved.id, self.beto_first.id], comment='Reparado')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [(result['id'], result['status']) for result in response.json()['results']],
+            [(self.ana_first.id, 'ok'), (missing_id, 'error'), (self.resolved.id, 'info'), (self.beto_first.id, 'ok')]
+        )
+        self.assertEqual(response.json()['summary'], {"updated": 2, "unchanged": 1, "errors": 1})
+        self.assertEqual(
+            set(Incident.objects.filter(status=Incident.STATUS_RESOLVED, comment='Reparado', modified_by=self.admin.id).values_list('id', flat=True)),
+            {self.ana_first.id, self.beto_first.id}
+        )
+        self.assertEqual(Incident.objects.get(pk=self.resolved.id).comment, 'Listo')
+
+    def test_one_email_per_creator(self):
+        response = self.bulk('resolve', [self.ana_first.id, self.ana_second.id, self.beto_first.id], comment='Reparado')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        emails = dict(EmailOutbox.objects.values_list('recipient_email', 'subject'))
+        self.assertEqual(set(emails), {'ana@example.com', 'beto@example.com'})
+        self.assertEqual(emails['ana@example.com'], "RESOLUCIÓN: 2 incidentes resueltos")
+
+    def test_stat_counters_follow_resolve_and_deactivate(self):
+        self.assertEqual(self.bulk('resolve', [self.ana_first.id], comment='Reparado').status_code, 200)
+        self.assertEqual(self.bulk('deactivate', [self.beto_first.id, self.resolved.id]).status_code, 200)
+
+        stats = get_incident_stats()
+        self.assertEqual(stats['by_status'][Incident.STATUS_RESOLVED], 2)
+        self.assertEqual(stats['by_active'], {'true': 2, 'false': 2})
+        rebuild_incident_stats()
+        self.assertEqual(get_incident_stats(), stats)
+
+    def test_failure_after_the_update_rolls_everything_back(self):
+        with mock.patch('incident.views.record_incident_stats', side_effect=RuntimeError("falla")):
+            response = self.bulk('resolve', [self.ana_first.id, self.beto_first.id], comment='Reparado')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(Incident.objects.filter(status=Incident.STATUS_RESOLVED).count(), 1)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+
+class IncidentExportTests(TestCase):
+
+    def setUp(self):
+        for day in range(1, 6):
+            Incident.objects.create(incident_type='Falla', description='d', date=date(2025, 1, day))
+
+    def test_chunks_walk_every_incident_by_id(self):
+        chunks = list(iter_incident_chunks(Incident.objects.all(), chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        exported_ids = [incident.id for chunk in chunks for incident in chunk]
+        self.assertEqual(exported_ids, sorted(Incident.objects.values_list('id', flat=True)))
+
+    def test_csv_header_is_sent_without_incidents(self):
+        content = ''.join(iter_csv_export(iter([]), ['id', 'incident_type']))
+
+        self.assertEqual(content, 'id,incident_type\r\n')
+
+
+class LocalImageStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = LocalImageStorage(self.root, 'http://testserver')
+
+    def test_save_writes_the_file_and_returns_its_url(self):
+        url = self.storage.save(f"{INCIDENT_IMAGE_FOLDER}/op1", b'imagen', 'jpg')
+
+        self.assertEqual(url, f"http://testserver{settings.MEDIA_URL}{INCIDENT_IMAGE_FOLDER}/op1.jpg")
+        path = self.storage.get_local_path(url, f"{INCIDENT_IMAGE_FOLDER}/op1")
+        with open(path, 'rb') as image_file:
+            self.assertEqual(image_file.read(), b'imagen')
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['op1.jpg'])
+
+    def test_delete_removes_the_file_and_ignores_missing_images(self):
+        url = self.storage.save(f"{INCIDENT_IMAGE_FOLDER}/op2", b'imagen', 'png')
+
+        self.storage.delete(f"{INCIDENT_IMAGE_FOLDER}/op2")
+        self.storage.delete(f"{INCIDENT_IMAGE_FOLDER}/op2")
+
+        self.assertIsNone(self.storage.get_local_path(url, f"{INCIDENT_IMAGE_FOLDER}/op2"))
+
+    def test_iter_image_pages_lists_only_old_generated_images(self):
+        for public_id in ('op3', 'op4_thumb', 'foto_antigua'):
+            self.storage.save(f"{INCIDENT_IMAGE_FOLDER}/{public_id}", b'imagen', 'jpg')
+
+        later = timezone.now() + timedelta(minutes=1)
+        earlier = timezone.now() - timedelta(minutes=1)
+
+        listed = [public_id for page in self.storage.iter_image_pages(later) for public_id in page]
+        self.assertEqual(sorted(listed), [f"{INCIDENT_IMAGE_FOLDER}/op3", f"{INCIDENT_IMAGE_FOLDER}/op4_thumb"])
+        self.assertEqual(list(self.storage.iter_image_pages(earlier)), [])
+
+    def test_storage_requires_every_abstract_method(self):
+        class IncompleteStorage(ImageStorage):
+            def save(self, public_id, content, file_format):
+                return ''
+
+        with self.assertRaises(TypeError):
+            IncompleteStorage()
+
+
+class IncidentImageFileTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(INCIDENT_IMAGE_LOCAL_ROOT=self.root, INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX='')
+        override.enable()
+        self.addCleanup(override.disable)
+        LocalImageStorage(self.root, 'http://testserver').save(f"{INCIDENT_IMAGE_FOLDER}/op5", b'imagen', 'jpg')
+        self.url = f"{settings.MEDIA_URL}{INCIDENT_IMAGE_FOLDER}/op5.jpg"
+
+    def test_serves_the_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(b''.join(response.streaming_content), b'imagen')
+
+    def test_accel_redirect_header_replaces_the_body(self):
+        with override_settings(INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX='/protected/'):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected/{INCIDENT_IMAGE_FOLDER}/op5.jpg")
+        self.assertEqual(response.content, b'')
+
+    def test_names_outside_the_folder_are_not_found(self):
+        self.assertEqual(self.client.get(f"{settings.MEDIA_URL}{INCIDENT_IMAGE_FOLDER}/..").status_code, 404)
+        self.assertEqual(self.client.get(f"{settings.MEDIA_URL}{INCIDENT_IMAGE_FOLDER}/op6.jpg").status_code, 404)
+
+        with open(os.path.join(self.root, 'reporte.pdf'), 'wb') as private_file:
+            private_file.write(b'%PDF')
+        request = RequestFactory().get('/')
+        for name in ('..', '../reporte.pdf', '../../settings.py'):
+            self.assertEqual(IncidentImageFile.as_view()(request, name=name).status_code, 404, name)
+
+
+def build_test_image(color) -> SimpleUploadedFile:
+    content = io.BytesIO()
+    PILImage.new('RGB', (64, 48), color).save(content, format='PNG')
+    return SimpleUploadedFile('foto.png', content.getvalue(), content_type='image/png')
+
+
+class ImageOperationFlowTests(TestCase):
+    """
+    Subidas y eliminaciones en segundo plano (image_operations) contra el almacenamiento local.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(
+            INCIDENT_IMAGE_STORAGE='local',
+            INCIDENT_IMAGE_LOCAL_ROOT=self.root,
+            INCIDENT_IMAGE_BASE_URL='http://testserver',
+            IMAGE_OPERATIONS_DISPATCH_ON_COMMIT=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = LocalImageStorage(self.root, 'http://testserver')
+
+    def stored_public_ids(self):
+        folder = os.path.join(self.root, INCIDENT_IMAGE_FOLDER)
+        return sorted(f"{INCIDENT_IMAGE_FOLDER}/{os.path.splitext(name)[0]}" for name in os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def test_upload_is_applied_and_the_old_image_destroyed(self):
+        old_url = self.storage.save(f"{INCIDENT_IMAGE_FOLDER}/op0", b'anterior', 'webp')
+        incident = Incident.objects.create(
+            incident_type='Falla', description='d', date=date(2025, 1, 1),
+            image_url=old_url, image_public_id=f"{INCIDENT_IMAGE_FOLDER}/op0", image_status=Incident.IMAGE_STATUS_PENDING
+        )
+        operation = queue_image_upload(incident.id, build_test_image('red'))
+
+        self.assertEqual(process_image_operations(), {"completed": 1, "failed": 0})
+
+        incident.refresh_from_db()
+        new_public_id = f"{INCIDENT_IMAGE_FOLDER}/op{operation.id}"
+        self.assertEqual(incident.image_public_id, new_public_id)
+        self.assertEqual(incident.image_status, Incident.IMAGE_STATUS_READY)
+        self.assertIsNone(ImageOperation.objects.get(pk=operation.pk).staged_content)
+        destroy = ImageOperation.objects.get(operation=ImageOperation.OPERATION_DESTROY)
+        self.assertEqual((destroy.public_id, destroy.status), (f"{INCIDENT_IMAGE_FOLDER}/op0", ImageOperation.STATUS_PENDING))
+
+        self.assertEqual(process_image_operations(), {"completed": 1, "failed": 0})
+
+        self.assertEqual(self.stored_public_ids(), sorted([new_public_id] + [f"{new_public_id}_{variant}" for variant in IMAGE_VARIANTS]))
+
+    def test_replaced_upload_is_discarded(self):
+        incident = Incident.objects.create(
+            incident_type='Falla', description='d', date=date(2025, 1, 1), image_status=Incident.IMAGE_STATUS_PENDING
+        )
+        replaced = queue_image_upload(incident.id, build_test_image('red'))
+        current = queue_image_upload(incident.id, build_test_image('blue'))
+
+        self.assertEqual(process_image_operations(), {"completed": 2, "failed": 0})
+
+        incident.refresh_from_db()
+        self.assertEqual(incident.image_public_id, f"{INCIDENT_IMAGE_FOLDER}/op{current.id}")
+        self.assertFalse(any(public_id.startswith(f"{INCIDENT_IMAGE_FOLDER}/op{replaced.id}") for public_id in self.stored_public_ids()))
+        self.assertFalse(ImageOperation.objects.exclude(staged_content=None).exists())
+        self.assertFalse(ImageOperation.objects.filter(operation=ImageOperation.OPERATION_DESTROY).exists())
+
+
+class ReportJobStorageTests(TransactionTestCase):
+    """
+    El PDF de un trabajo se guarda en la base de datos: el proceso web lo descarga aunque
+    el worker de reportes corra en otra máquina.
+    """
+
+    def setUp(self):
+        clear_user_cache()
+        clear_token_cache()
+        self.addCleanup(clear_user_cache)
+        self.addCleanup(clear_token_cache)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        self.client = get_auth_client(self.admin)
+
+    def test_pdf_is_downloaded_from_the_database_until_it_expires(self):
+        incident = Incident.objects.create(incident_type='Corte', description='d', date=date(2025, 1, 1), created_by=self.admin.id)
+        job = ReportJob.objects.create(report_type=ReportJob.TYPE_SPECIFIC, incident_id=incident.id, requested_by=self.admin.id)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(process_report_jobs(executor, limit=1), {"completed": 1, "failed": 0})
+
+        response = self.client.get(f"/api/v1/incident/report-jobs/{job.id}/download")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        ReportJob.objects.filter(pk=job.id).update(expires_at=timezone.now())
+        self.assertEqual(cleanup_expired_report_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_EXPIRED)
+        self.assertIsNone(job.content)
+        self.assertEqual(self.client.get(f"/api/v1/incident/report-jobs/{job.id}/download").status_code, 410)
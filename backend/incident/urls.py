@@ -4,9 +4,17 @@ from .views import *
 urlpatterns = [
     path('incident', IncidentRC.as_view()),
     path('incident/<int:id>', IncidentRUD.as_view()),
+    path('incident/search', IncidentSearch.as_view()),
+    path('incident/stats', IncidentStats.as_view()),
+    path('incident/export/<str:export_format>', IncidentExport.as_view()),
     path('incident/sdelete/<int:id>', IncidentSD.as_view()),
+    path('incident/bulk', IncidentBulk.as_view()),
     path('incident/edit-image', EditImage.as_view()),
+    path('incident/upload-signature', UploadSignature.as_view()),
     path('incident/active-reports', ActiveReports.as_view()),
     path('incident/specific-report/<int:id>', SpecificReport.as_view()),
     path('incident/archive-report/<int:id>', ArchivedReport.as_view()),
+    path('incident/report-jobs', ReportJobC.as_view()),
+    path('incident/report-jobs/<int:id>', ReportJobR.as_view()),
+    path('incident/report-jobs/<int:id>/download', ReportJobDownload.as_view()),
 ]
\ No newline at end of file
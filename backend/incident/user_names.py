@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+
+
+def get_user_names_for_incidents(incidents):
+    """
+    Obtiene en una sola consulta los nombres de todos los usuarios referenciados
+    por 'created_by' y 'modified_by' de los incidentes dados.
+    Devuelve un diccionario {user_id: nombre} para usar con resolve_user_name.
+    """
+    user_ids = set()
+    for incident in incidents:
+        if incident.created_by is not None:
+            user_ids.add(incident.created_by)
+        if incident.modified_by is not None:
+            user_ids.add(incident.modified_by)
+
+    if not user_ids:
+        return {}
+
+    users = User.objects.filter(id__in=user_ids).values_list('id', 'first_name', 'username')
+    return {user_id: first_name if first_name else username for user_id, first_name, username in users}
+
+
+def resolve_user_name(user_names, user_id):
+    """
+    Nombre (first_name o, si está vacío, username) del usuario, tomado del diccionario
+    precargado por get_user_names_for_incidents (sin consultas adicionales).
+    Devuelve "Usuario Desconocido" si el usuario no existe.
+    """
+    if user_id is None:
+        return None
+    return user_names.get(user_id, "Usuario Desconocido")
@@ -7,15 +7,19 @@ from django.contrib.auth.models import User
 
 import os
 from django.conf import settings
-from django.core.files.storage import FileSystemStorage
 from datetime import datetime
-from incident.models import Incident
+from incident.models import Incident, ReportJob
+from incident.user_names import get_user_names_for_incidents, resolve_user_name
 from utilities.decorators import authenticate_user
 from utilities.incident_create_email import generate_incident_creation_email_html
-from utilities.send_email import send_email_notification
+from notifications.outbox import queue_email_notification
 from django.utils import timezone
 from datetime import timedelta
-from utilities.incident_resolved_email import generate_incident_resolved_email_html
+from utilities.incident_resolved_email import generate_incident_resolved_email_html, generate_incidents_resolved_summary_email_html
+from utilities.pagination import paginate_by_cursor, parse_page_size, InvalidCursorError
+from utilities.cloudinary_uploads import generate_upload_params, verify_direct_upload, InvalidUploadError
+from utilities.image_pipeline import verify_image_file, build_transformed_variant_urls, InvalidImageError
+from utilities.image_storage import INCIDENT_IMAGE_FOLDER, get_image_storage, get_local_image_storage
 
 # imports para drf-yasg
 from drf_yasg.utils import swagger_auto_schema
@@ -24,20 +28,28 @@ from rest_framework import permissions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from drf_yasg import utils
 
-from django.db.models import Q
-
-# ReportLab
-import io
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-import requests
+# Reportes PDF
+import tempfile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.core.exceptions import SuspiciousFileOperation
+import mimetypes
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+from django.utils._os import safe_join
+from utilities.report_cache import get_report_version, get_cached_report_path, store_report
+from incident.reports import (
+    get_active_report_queryset, get_specific_report_incident, get_archived_report_incident,
+    can_generate_report, build_active_report_in_chunks, build_specific_report, build_archived_report,
+    get_report_filename,
+)
+from incident.report_jobs import serialize_report_job
+from incident.image_operations import queue_image_upload, queue_image_destroy
+from incident.search import search_incidents, InvalidSearchError, SEARCH_MIN_TERM_LENGTH
+from incident.stats import get_incident_stat_keys, record_incident_stats, get_incident_stats
+from incident.exports import (
+    EXPORT_CONTENT_TYPES, EXPORT_FORMAT_CSV, iter_serialized_incidents, iter_csv_export, iter_ndjson_export,
+    get_export_filename,
+)
 
-import cloudinary
-import cloudinary.uploader
 
 bearer_security_definition = [{'Bearer': []}]
 
@@ -50,6 +62,17 @@ def get_base_url_with_port():
     return base_url
 
 
+def parse_incident_date(value):
+    """
+    Convierte una fecha en formato YYYY-MM-DD a un objeto date.
+    Devuelve None si el formato es inválido.
+    """
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
 def validate_incident_data(data):
     errors = {}
     required_fields = ['incident_type', 'description', 'date']
@@ -64,10 +87,7 @@ def validate_incident_data(data):
         errors['description'] = "La descripción es requerida."
 
     if 'date' in data:
-        try:
-            # Intenta parsear la fecha para validar su formato (YYYY-MM-DD)
-            datetime.strptime(str(data['date']), '%Y-%m-%d').date()
-        except ValueError:
+        if parse_incident_date(data['date']) is None:
             errors['date'] = "El formato de la fecha es inválido. Use YYYY-MM-DD."
     
     if 'status' in data and data['status'] not in [s[0] for s in Incident.STATUS_CHOICES]:
@@ -79,22 +99,115 @@ def validate_incident_data(data):
     return None
 
 
-def get_user_first_name_by_id(user_id):
+INCIDENT_LIST_ORDERING_FIELDS = ['created_at', 'date', 'updated_at', 'incident_type']
+
+
+def parse_incident_list_filters(params):
     """
-    Obtiene el first_name de un usuario dado su ID.
-    Devuelve None si el ID es None, el usuario no existe, o el ID no es válido.
+    Traduce los parámetros de consulta del listado de incidentes a filtros del ORM.
+    Devuelve una tupla (filtros, ordering, errores). Si hay errores, los filtros no deben usarse.
     """
-    if user_id is None:
-        return None
+    errors = {}
+    filters = {}
+
+    status_param = params.get('status')
+    if status_param:
+        if status_param not in [s[0] for s in Incident.STATUS_CHOICES]:
+            valid_statuses = ", ".join([s[0] for s in Incident.STATUS_CHOICES])
+            errors['status'] = f"El estado del incidente no es válido. Opciones válidas: {valid_statuses}."
+        else:
+            filters['status'] = status_param
+
+    active_param = params.get('active')
+    if active_param:
+        if active_param.lower() == 'true':
+            filters['active'] = True
+        elif active_param.lower() == 'false':
+            filters['active'] = False
+        else:
+            errors['active'] = "El valor de 'active' debe ser 'true' o 'false'."
+
+    incident_type_param = params.get('incident_type')
+    if incident_type_param and incident_type_param.strip():
+        filters['incident_type'] = incident_type_param.strip()
+
+    created_by_param = params.get('created_by')
+    if created_by_param:
+        try:
+            filters['created_by'] = int(created_by_param)
+        except ValueError:
+            errors['created_by'] = "El valor de 'created_by' debe ser un número entero."
+
+    parsed_dates = {}
+    for param_name in ['date_from', 'date_to', 'created_from', 'created_to']:
+        raw_value = params.get(param_name)
+        if not raw_value:
+            continue
+        parsed_date = parse_incident_date(raw_value)
+        if parsed_date is None:
+            errors[param_name] = f"El formato de '{param_name}' es inválido. Use YYYY-MM-DD."
+        else:
+            parsed_dates[param_name] = parsed_date
+
+    if 'date_from' in parsed_dates:
+        filters['date__gte'] = parsed_dates['date_from']
+    if 'date_to' in parsed_dates:
+        filters['date__lte'] = parsed_dates['date_to']
+
+    # Rango sobre created_at como límites de fecha/hora, para que el índice pueda usarse (sin DATE()).
+    if 'created_from' in parsed_dates:
+        filters['created_at__gte'] = timezone.make_aware(datetime.combine(parsed_dates['created_from'], datetime.min.time()))
+    if 'created_to' in parsed_dates:
+        filters['created_at__lt'] = timezone.make_aware(datetime.combine(parsed_dates['created_to'] + timedelta(days=1), datetime.min.time()))
+
+    ordering = params.get('ordering') or '-created_at'
+    if ordering.lstrip('-') not in INCIDENT_LIST_ORDERING_FIELDS or ordering.count('-') > 1:
+        valid_orderings = ", ".join(INCIDENT_LIST_ORDERING_FIELDS)
+        errors['ordering'] = f"El ordenamiento no es válido. Campos permitidos (con '-' opcional para descendente): {valid_orderings}."
+
+    return filters, ordering, errors
+
+
+def get_visible_incidents(user, filters):
+    """
+    Incidentes que el usuario puede ver en el listado, la búsqueda y la exportación, con los
+    filtros de parse_incident_list_filters: todos para superusuarios, solo los propios para
+    el resto (a quienes no se les aplica el filtro 'created_by').
+    """
+    if user.is_superuser:
+        return Incident.objects.filter(**filters)
+    filters = {key: value for key, value in filters.items() if key != 'created_by'}
+    return Incident.objects.filter(created_by=user.id, **filters)
+
+
+DIRECT_UPLOAD_UNAVAILABLE_MESSAGE = "La subida directa de imágenes solo está disponible con el almacenamiento Cloudinary; adjunte el archivo."
+
+
+def get_direct_upload_result(request, form_data):
+    """
+    Si la solicitud trae los datos de una imagen subida directamente a Cloudinary
+    (image_public_id, image_version, image_signature), los verifica sin descargar la imagen.
+    Devuelve (resultado, respuesta_de_error): el resultado tiene la misma forma que el de
+    Incident (secure_url, public_id y '<variante>_url'). Ambos son None si no se envió.
+    """
+    public_id = form_data.get('image_public_id')
+    if not public_id:
+        return None, None
+
+    if not get_image_storage().supports_direct_upload:
+        return None, JsonResponse({"status": "error", "message": DIRECT_UPLOAD_UNAVAILABLE_MESSAGE}, status=HTTPStatus.BAD_REQUEST)
+
     try:
-        user = User.objects.get(id=user_id)
-        return user.first_name if user.first_name else user.username
-    except User.DoesNotExist:
-        return "Usuario Desconocido"
-    except ValueError:
-        return "ID de Usuario Inválido"
-    except Exception:
-        return "Error al obtener nombre"
+        image_url = verify_direct_upload(request.user.id, public_id, form_data.get('image_version'), form_data.get('image_signature'))
+    except InvalidUploadError as e:
+        return None, JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return None, JsonResponse({"status": "error", "message": f"Error al verificar la imagen: {str(e)}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    if Incident.objects.filter(image_public_id=public_id).exists():
+        return None, JsonResponse({"status": "error", "message": "La imagen indicada ya está asociada a un incidente."}, status=HTTPStatus.BAD_REQUEST)
+
+    return {'secure_url': image_url, 'public_id': public_id, **build_transformed_variant_urls(public_id, form_data.get('image_version'))}, None
 
 
 incident_object_schema_detailed = openapi.Schema(
@@ -105,6 +218,9 @@ incident_object_schema_detailed = openapi.Schema(
         'description': openapi.Schema(type=openapi.TYPE_STRING, description="Descripción detallada del incidente."),
         'date': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description="Fecha del incidente (YYYY-MM-DD)."),
         'image_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, description="URL completa de la imagen adjunta, si existe.", nullable=True),
+        'thumbnail_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, description="URL de la miniatura (320 px) de la imagen, si existe. Para imágenes antiguas sin variantes es la URL original.", nullable=True),
+        'medium_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, description="URL de la versión mediana (1024 px) de la imagen, si existe. Para imágenes antiguas sin variantes es la URL original. Solo en el detalle (incident/{id}).", nullable=True),
+        'image_status': openapi.Schema(type=openapi.TYPE_STRING, enum=[choice[0] for choice in Incident.IMAGE_STATUS_CHOICES], description="Estado de la imagen: 'pendiente' mientras se sube en segundo plano (image_url sigue siendo la anterior o nula), 'lista' o 'fallida'. Nulo si nunca tuvo imagen.", nullable=True),
         'comment': openapi.Schema(type=openapi.TYPE_STRING, description="Comentario de resolución o seguimiento.", nullable=True),
         'status': openapi.Schema(type=openapi.TYPE_STRING, description="Código del estado actual del incidente (e.g., 'activo', 'resuelto')."),
         'status_display': openapi.Schema(type=openapi.TYPE_STRING, description="Descripción legible del estado actual del incidente."),
@@ -127,6 +243,8 @@ incident_object_schema_user = openapi.Schema(
         'description': openapi.Schema(type=openapi.TYPE_STRING, description="Descripción detallada del incidente."),
         'date': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description="Fecha del incidente (YYYY-MM-DD)."),
         'image_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, description="URL completa de la imagen adjunta, si existe.", nullable=True),
+        'thumbnail_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, description="URL de la miniatura (320 px) de la imagen, si existe. Para imágenes antiguas sin variantes es la URL original.", nullable=True),
+        'image_status': openapi.Schema(type=openapi.TYPE_STRING, enum=[choice[0] for choice in Incident.IMAGE_STATUS_CHOICES], description="Estado de la imagen: 'pendiente' mientras se sube en segundo plano (image_url sigue siendo la anterior o nula), 'lista' o 'fallida'. Nulo si nunca tuvo imagen.", nullable=True),
         'comment': openapi.Schema(type=openapi.TYPE_STRING, description="Comentario de resolución o seguimiento.", nullable=True),
         'status': openapi.Schema(type=openapi.TYPE_STRING, description="Código del estado actual del incidente."),
         'status_display': openapi.Schema(type=openapi.TYPE_STRING, description="Descripción legible del estado actual del incidente."),
@@ -158,6 +276,64 @@ error_response_with_dict_schema = openapi.Schema(
 )
 
 
+# Campos de serialize_incident_list_item, en el mismo orden (encabezado del CSV de exportación).
+INCIDENT_LIST_FIELDS = [
+    "id", "incident_type", "description", "date", "image_url", "thumbnail_url", "image_status", "comment", "status",
+    "status_display", "active", "created_by_id", "created_by_name", "created_at", "modified_by_id", "modified_by_name", "updated_at",
+]
+INCIDENT_LIST_LIMITED_FIELDS = [
+    "id", "incident_type", "description", "date", "image_url", "thumbnail_url", "image_status", "comment", "status",
+    "status_display", "created_by_name",
+]
+
+
+def serialize_incident_list_item(incident, user_names, is_superuser_requesting):
+    """
+    Datos de un incidente en el listado (y en la búsqueda). Los superusuarios reciben todos
+    los campos; los usuarios regulares, la versión limitada.
+    """
+    image_url = incident.image_url
+    created_by_name = resolve_user_name(user_names, incident.created_by)
+    modified_by_name = resolve_user_name(user_names, incident.modified_by)
+
+    incident_date_str = str(incident.date)
+
+    if is_superuser_requesting:
+        return {
+            "id": incident.id,
+            "incident_type": incident.incident_type,
+            "description": incident.description,
+            "date": incident_date_str,
+            "image_url": image_url,
+            "thumbnail_url": incident.image_thumbnail_url or image_url,
+            "image_status": incident.image_status,
+            "comment": incident.comment,
+            "status": incident.status,
+            "status_display": incident.get_status_display(),
+            "active": incident.active,
+            "created_by_id": incident.created_by,
+            "created_by_name": created_by_name,
+            "created_at": incident.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "modified_by_id": incident.modified_by,
+            "modified_by_name": modified_by_name,
+            "updated_at": incident.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    return {
+        "id": incident.id,
+        "incident_type": incident.incident_type,
+        "description": incident.description,
+        "date": incident_date_str,
+        "image_url": image_url,
+        "thumbnail_url": incident.image_thumbnail_url or image_url,
+        "image_status": incident.image_status,
+        "comment": incident.comment,
+        "status": incident.status,
+        "status_display": incident.get_status_display(),
+        "created_by_name": created_by_name,
+    }
+
+
 class IncidentRC(APIView):
 
 
@@ -167,8 +343,21 @@ class IncidentRC(APIView):
 
     @swagger_auto_schema(
         operation_id="api_incident_list",
-        operation_description="Obtiene una lista de incidentes. Los superusuarios ven todos los incidentes con detalles completos. Los usuarios regulares solo ven los incidentes creados por ellos con detalles limitados. Requiere autenticación.",
+        operation_description="Obtiene una lista paginada (por cursor) de incidentes, ordenada del más reciente al más antiguo. Los superusuarios ven todos los incidentes con detalles completos. Los usuarios regulares solo ven los incidentes creados por ellos con detalles limitados. Requiere autenticación.",
         security=bearer_security_definition, # @authenticate_user() implica que se requiere token
+        manual_parameters=[
+            openapi.Parameter('status', openapi.IN_QUERY, description="Filtra por estado ('activo' o 'resuelto').", required=False, type=openapi.TYPE_STRING, enum=[s[0] for s in Incident.STATUS_CHOICES]),
+            openapi.Parameter('active', openapi.IN_QUERY, description="Filtra por activación lógica ('true' o 'false').", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('incident_type', openapi.IN_QUERY, description="Filtra por tipo de incidente exacto.", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Fecha del incidente desde (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Fecha del incidente hasta (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_from', openapi.IN_QUERY, description="Fecha de creación desde (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_to', openapi.IN_QUERY, description="Fecha de creación hasta (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_by', openapi.IN_QUERY, description="ID del usuario creador (solo tiene efecto para superusuarios).", required=False, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('ordering', openapi.IN_QUERY, description="Campo de ordenamiento: created_at, date, updated_at o incident_type, con '-' para descendente. Por defecto '-created_at'.", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor opaco devuelto en 'next' o 'previous' de una respuesta anterior.", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Cantidad de incidentes por página (por defecto 50, máximo 200).", required=False, type=openapi.TYPE_INTEGER),
+        ],
         responses={
             HTTPStatus.OK: openapi.Response(
                 description="Lista de incidentes recuperada exitosamente.",
@@ -180,10 +369,13 @@ class IncidentRC(APIView):
                             type=openapi.TYPE_ARRAY,
                             items=incident_object_schema_detailed,
                             description="Array de incidentes. La estructura de cada incidente puede variar ligeramente si el solicitante es superusuario o no."
-                        )
+                        ),
+                        'next': openapi.Schema(type=openapi.TYPE_STRING, description="Cursor de la página siguiente, o null si no hay más.", nullable=True),
+                        'previous': openapi.Schema(type=openapi.TYPE_STRING, description="Cursor de la página anterior, o null si es la primera.", nullable=True),
                     }
                 )
             ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Filtros, ordenamiento, cursor o tamaño de página inválidos.", schema=error_response_with_dict_schema),
             HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
             HTTPStatus.INTERNAL_SERVER_ERROR: openapi.Response(description="Error interno del servidor.", schema=error_response_schema)
         },
@@ -191,55 +383,36 @@ class IncidentRC(APIView):
     @authenticate_user()
     def get(self, request):
         is_superuser_requesting = request.user.is_superuser
-        current_user_id = request.user.id
 
-        if is_superuser_requesting:
-            incidents = Incident.objects.all().order_by('-created_at', '-date')
-        else:
-            incidents = Incident.objects.filter(created_by=current_user_id).order_by('-created_at', '-date')
+        try:
+            page_size = parse_page_size(request.query_params.get('page_size'), settings.INCIDENT_PAGE_SIZE, settings.INCIDENT_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "El parámetro 'page_size' debe ser un número entero positivo."}, status=HTTPStatus.BAD_REQUEST)
 
-        data_list = []
-        for incident in incidents:
-            image_url = incident.image_url
-            created_by_name = get_user_first_name_by_id(incident.created_by)
-            modified_by_name = get_user_first_name_by_id(incident.modified_by)
-
-            incident_date_str = str(incident.date) 
-
-            incident_data_for_current_loop = {}
-            if is_superuser_requesting:
-                incident_data_for_current_loop = {
-                    "id": incident.id,
-                    "incident_type": incident.incident_type,
-                    "description": incident.description,
-                    "date": incident_date_str,
-                    "image_url": image_url,
-                    "comment": incident.comment,
-                    "status": incident.status,
-                    "status_display": incident.get_status_display(),
-                    "active": incident.active,
-                    "created_by_id": incident.created_by, 
-                    "created_by_name": created_by_name,
-                    "created_at": incident.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    "modified_by_id": incident.modified_by,
-                    "modified_by_name": modified_by_name,
-                    "updated_at": incident.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-                }
-            else:
-                incident_data_for_current_loop = {
-                    "id": incident.id,
-                    "incident_type": incident.incident_type,
-                    "description": incident.description,
-                    "date": incident_date_str,
-                    "image_url": image_url,
-                    "comment": incident.comment,
-                    "status": incident.status,
-                    "status_display": incident.get_status_display(),
-                    "created_by_name": created_by_name,
-                }
-            data_list.append(incident_data_for_current_loop)
-        
-        return JsonResponse({"status": "ok", "data": data_list}, status=HTTPStatus.OK)
+        filters, ordering, filter_errors = parse_incident_list_filters(request.query_params)
+        if filter_errors:
+            return JsonResponse({
+                "status": "error",
+                "message": "Parámetros de consulta inválidos.",
+                "errors": filter_errors
+            }, status=HTTPStatus.BAD_REQUEST)
+
+        incidents = get_visible_incidents(request.user, filters)
+
+        try:
+            incidents, next_cursor, previous_cursor = paginate_by_cursor(
+                incidents,
+                ordering=ordering,
+                cursor=request.query_params.get('cursor'),
+                page_size=page_size
+            )
+        except InvalidCursorError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+
+        user_names = get_user_names_for_incidents(incidents)
+        data_list = [serialize_incident_list_item(incident, user_names, is_superuser_requesting) for incident in incidents]
+
+        return JsonResponse({"status": "ok", "data": data_list, "next": next_cursor, "previous": previous_cursor}, status=HTTPStatus.OK)
 
 
     @swagger_auto_schema(
@@ -276,6 +449,27 @@ class IncidentRC(APIView):
                 description="Imagen adjunta (opcional, JPG, JPEG, PNG, máx 5MB).",
                 type=openapi.TYPE_FILE,
                 required=False
+            ),
+            openapi.Parameter(
+                name='image_public_id',
+                in_=openapi.IN_FORM,
+                description="Alternativa a subir el archivo: 'public_id' devuelto por Cloudinary tras subir la imagen con los parámetros de /incident/upload-signature.",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                name='image_version',
+                in_=openapi.IN_FORM,
+                description="'version' devuelta por Cloudinary (requerido junto con image_public_id).",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
+            openapi.Parameter(
+                name='image_signature',
+                in_=openapi.IN_FORM,
+                description="'signature' devuelta por Cloudinary (requerido junto con image_public_id).",
+                type=openapi.TYPE_STRING,
+                required=False
             )
         ],
         responses={
@@ -287,7 +481,8 @@ class IncidentRC(APIView):
                         'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
                         'message': openapi.Schema(type=openapi.TYPE_STRING, example="Incidente creado exitosamente."),
                         'incident_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del incidente recién creado."),
-                        'image_filename_saved': openapi.Schema(type=openapi.TYPE_STRING, description="Nombre del archivo de imagen guardado, si se subió alguno.", nullable=True)
+                        'image_filename_saved': openapi.Schema(type=openapi.TYPE_STRING, description="Nombre del archivo de imagen guardado, si se subió alguno.", nullable=True),
+                        'image_status': openapi.Schema(type=openapi.TYPE_STRING, description="'pendiente' si se adjuntó un archivo (se guarda en segundo plano), 'lista' para una subida directa, nulo sin imagen.", nullable=True)
                     }
                 )
             ),
@@ -313,8 +508,11 @@ class IncidentRC(APIView):
                 "errors": validation_errors
             }, status=HTTPStatus.BAD_REQUEST)
 
-        image_upload_result = None
-        if image_file:
+        image_upload_result, direct_upload_error = get_direct_upload_result(request, form_data)
+        if direct_upload_error:
+            return direct_upload_error
+
+        if image_file and not image_upload_result:
             allowed_extensions = ['.jpg', '.jpeg', '.png']
             ext = os.path.splitext(image_file.name)[1].lower()
             if ext not in allowed_extensions:
@@ -323,26 +521,38 @@ class IncidentRC(APIView):
                 return JsonResponse({"status": "error", "message": "La imagen excede el tamaño máximo (5MB)."}, status=HTTPStatus.BAD_REQUEST)
 
             try:
-                image_upload_result = cloudinary.uploader.upload(
-                    image_file,
-                    folder="incident_images"
-                )
-            except Exception as e:
-                return JsonResponse({"status": "error", "message": f"Error al subir la imagen: {str(e)}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
-        
+                verify_image_file(image_file)
+            except InvalidImageError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+
+        if image_upload_result:
+            image_status = Incident.IMAGE_STATUS_READY
+        elif image_file:
+            image_status = Incident.IMAGE_STATUS_PENDING
+        else:
+            image_status = None
+
         try:
             incident = Incident.objects.create(
                 incident_type=form_data.get('incident_type'),
                 description=form_data.get('description'),
-                date=form_data.get('date'),
+                date=parse_incident_date(form_data.get('date')),
                 status=form_data.get('status', Incident.STATUS_ACTIVE),
                 comment=form_data.get('comment', None),
                 image_url=image_upload_result.get('secure_url') if image_upload_result else None,
                 image_public_id=image_upload_result.get('public_id') if image_upload_result else None,
+                image_thumbnail_url=image_upload_result.get('thumbnail_url') if image_upload_result else None,
+                image_medium_url=image_upload_result.get('medium_url') if image_upload_result else None,
+                image_status=image_status,
                 active=form_data.get('active', True),
                 created_by=user_id_making_request,
                 modified_by=user_id_making_request
             )
+            record_incident_stats(new_keys=get_incident_stat_keys(incident))
+
+            # La imagen se guarda en el almacenamiento después del commit, fuera de la transacción.
+            if image_status == Incident.IMAGE_STATUS_PENDING:
+                queue_image_upload(incident.id, image_file)
 
             incident_email_data = {
                 'incident_type': incident.incident_type,
@@ -352,11 +562,11 @@ class IncidentRC(APIView):
                 'image_url': incident.image_url
             }
 
-            # Enviar correo de notificación
+            # Encolar correo de notificación (se envía fuera de la solicitud)
             admin_email_recipient = os.getenv("SMTP_BY")
             if admin_email_recipient:
                 html_email = generate_incident_creation_email_html(incident_email_data, request.user.username)
-                send_email_notification(
+                queue_email_notification(
                     html_content=html_email,
                     subject=f"Nuevo Incidente Reportado: {incident.incident_type}",
                     recipient_email=admin_email_recipient
@@ -368,15 +578,217 @@ class IncidentRC(APIView):
                 "status": "ok",
                 "message": "Incidente creado exitosamente.",
                 "incident_id": incident.id,
-                "image_url": incident.image_url
+                "image_url": incident.image_url,
+                "image_status": incident.image_status
             }, status=HTTPStatus.CREATED)
 
         except Exception as e:
-            if image_upload_result and image_upload_result.get('public_id'):
-                cloudinary.uploader.destroy(image_upload_result.get('public_id'))
             return JsonResponse({"status": "error", "message": f"No se pudo crear el incidente: {str(e)}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
+class IncidentSearch(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_search",
+        operation_description="Búsqueda de texto completo en el tipo, la descripción y el comentario de los incidentes, ordenada por relevancia y paginada por cursor. Usa el índice FULLTEXT de MySQL (SQLite FTS5 en desarrollo). La relevancia depende de todos los incidentes indexados: si se crean o modifican incidentes entre una página y la siguiente, un resultado puede repetirse u omitirse (para un recorrido estable use el listado o la exportación). Admite los mismos filtros que el listado y las mismas reglas de visibilidad: los superusuarios buscan en todos los incidentes, los usuarios regulares solo en los suyos. Requiere autenticación.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description=f"Texto a buscar. Se buscan las palabras de {SEARCH_MIN_TERM_LENGTH} o más caracteres (cualquiera de ellas; más coincidencias = más relevancia).", required=True, type=openapi.TYPE_STRING),
+            openapi.Parameter('status', openapi.IN_QUERY, description="Filtra por estado ('activo' o 'resuelto').", required=False, type=openapi.TYPE_STRING, enum=[s[0] for s in Incident.STATUS_CHOICES]),
+            openapi.Parameter('active', openapi.IN_QUERY, description="Filtra por activación lógica ('true' o 'false').", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('incident_type', openapi.IN_QUERY, description="Filtra por tipo de incidente exacto.", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Fecha del incidente desde (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Fecha del incidente hasta (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_by', openapi.IN_QUERY, description="ID del usuario creador (solo tiene efecto para superusuarios).", required=False, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor opaco devuelto en 'next' o 'previous' de una respuesta anterior (con el mismo 'q').", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Cantidad de incidentes por página (por defecto 50, máximo 200).", required=False, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Resultados de la búsqueda, del más relevante al menos relevante. Cada incidente incluye 'search_rank'.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': openapi.Schema(type=openapi.TYPE_ARRAY, items=incident_object_schema_detailed),
+                        'next': openapi.Schema(type=openapi.TYPE_STRING, description="Cursor de la página siguiente, o null si no hay más.", nullable=True),
+                        'previous': openapi.Schema(type=openapi.TYPE_STRING, description="Cursor de la página anterior, o null si es la primera.", nullable=True),
+                    }
+                )
+            ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Texto de búsqueda, filtros, cursor o tamaño de página inválidos.", schema=error_response_with_dict_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user()
+    def get(self, request):
+        is_superuser_requesting = request.user.is_superuser
+
+        try:
+            page_size = parse_page_size(request.query_params.get('page_size'), settings.INCIDENT_PAGE_SIZE, settings.INCIDENT_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "El parámetro 'page_size' debe ser un número entero positivo."}, status=HTTPStatus.BAD_REQUEST)
+
+        # El orden siempre es por relevancia: 'ordering' no se usa aquí.
+        filters, _, filter_errors = parse_incident_list_filters(request.query_params)
+        filter_errors.pop('ordering', None)
+        if filter_errors:
+            return JsonResponse({
+                "status": "error",
+                "message": "Parámetros de consulta inválidos.",
+                "errors": filter_errors
+            }, status=HTTPStatus.BAD_REQUEST)
+
+        incidents = get_visible_incidents(request.user, filters)
+
+        try:
+            incidents = search_incidents(incidents, request.query_params.get('q'))
+            incidents, next_cursor, previous_cursor = paginate_by_cursor(
+                incidents,
+                ordering='-search_rank',
+                cursor=request.query_params.get('cursor'),
+                page_size=page_size
+            )
+        except (InvalidSearchError, InvalidCursorError) as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+
+        user_names = get_user_names_for_incidents(incidents)
+        data_list = []
+        for incident in incidents:
+            incident_data = serialize_incident_list_item(incident, user_names, is_superuser_requesting)
+            incident_data["search_rank"] = incident.search_rank
+            data_list.append(incident_data)
+
+        return JsonResponse({"status": "ok", "data": data_list, "next": next_cursor, "previous": previous_cursor}, status=HTTPStatus.OK)
+
+
+class IncidentStats(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_stats",
+        operation_description="Cantidad de incidentes en total y por estado, activo/inactivo, tipo, creador y fecha del incidente. Se lee de contadores precalculados (tabla incident_stat_counter) que se actualizan al crear, resolver, activar/desactivar y eliminar incidentes, por lo que no recorre la tabla de incidentes. Los contadores se recalculan con 'manage.py rebuild_incident_stats'. Requiere permiso 'incident.view_incident'.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('days', openapi.IN_QUERY, description="Si se indica, 'by_date' solo incluye los últimos N días (contando hoy). Las demás cantidades siempre son sobre todos los incidentes.", type=openapi.TYPE_INTEGER, required=False),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Estadísticas de incidentes.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'total': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'by_status': openapi.Schema(type=openapi.TYPE_OBJECT, description="Cantidad por estado.", example={"activo": 12, "resuelto": 30}),
+                                'by_active': openapi.Schema(type=openapi.TYPE_OBJECT, description="Cantidad de incidentes activos ('true') e inactivos ('false').", example={"true": 40, "false": 2}),
+                                'by_incident_type': openapi.Schema(type=openapi.TYPE_OBJECT, description="Cantidad por tipo de incidente, de mayor a menor.", example={"Falla eléctrica": 8}),
+                                'by_creator': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    description="Cantidad por usuario creador, de mayor a menor.",
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'created_by': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True),
+                                            'created_by_name': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                            'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                        }
+                                    )
+                                ),
+                                'by_date': openapi.Schema(type=openapi.TYPE_OBJECT, description="Cantidad por fecha del incidente (YYYY-MM-DD), en orden cronológico.", example={"2025-06-01": 3}),
+                            }
+                        )
+                    }
+                )
+            ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Parámetro 'days' inválido.", schema=error_response_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.FORBIDDEN: openapi.Response(description="Permiso 'incident.view_incident' requerido.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user(required_permission='incident.view_incident')
+    def get(self, request):
+        days = request.query_params.get('days')
+        if days is not None:
+            try:
+                days = int(days)
+                if days < 1:
+                    raise ValueError
+            except ValueError:
+                return JsonResponse({"status": "error", "message": "El parámetro 'days' debe ser un número entero positivo."}, status=HTTPStatus.BAD_REQUEST)
+
+        return JsonResponse({"status": "ok", "data": get_incident_stats(days=days)}, status=HTTPStatus.OK)
+
+
+class IncidentExport(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_export",
+        operation_description="Exporta todos los incidentes que cumplen los filtros como CSV o NDJSON (un objeto JSON por línea), con los mismos campos que el listado, ordenados por ID. El CSV siempre incluye el encabezado, aunque no haya incidentes. La respuesta se genera y envía por bloques, sin cargar todos los incidentes en memoria. Mismas reglas de visibilidad que el listado: los superusuarios exportan todos los incidentes, los usuarios regulares solo los suyos. Requiere autenticación.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('export_format', openapi.IN_PATH, description="Formato de la exportación.", required=True, type=openapi.TYPE_STRING, enum=list(EXPORT_CONTENT_TYPES)),
+            openapi.Parameter('status', openapi.IN_QUERY, description="Filtra por estado ('activo' o 'resuelto').", required=False, type=openapi.TYPE_STRING, enum=[s[0] for s in Incident.STATUS_CHOICES]),
+            openapi.Parameter('active', openapi.IN_QUERY, description="Filtra por activación lógica ('true' o 'false').", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('incident_type', openapi.IN_QUERY, description="Filtra por tipo de incidente exacto.", required=False, type=openapi.TYPE_STRING),
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Fecha del incidente desde (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Fecha del incidente hasta (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_from', openapi.IN_QUERY, description="Fecha de creación desde (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_to', openapi.IN_QUERY, description="Fecha de creación hasta (YYYY-MM-DD, inclusive).", required=False, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('created_by', openapi.IN_QUERY, description="ID del usuario creador (solo tiene efecto para superusuarios).", required=False, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(description="Archivo CSV (text/csv) o NDJSON (application/x-ndjson) como adjunto."),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Formato o filtros inválidos, o se envió 'ordering' (la exportación siempre se ordena por ID).", schema=error_response_with_dict_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user()
+    def get(self, request, export_format):
+        is_superuser_requesting = request.user.is_superuser
+
+        if export_format not in EXPORT_CONTENT_TYPES:
+            valid_formats = ", ".join(EXPORT_CONTENT_TYPES)
+            return JsonResponse({"status": "error", "message": f"Formato de exportación no válido. Opciones válidas: {valid_formats}."}, status=HTTPStatus.BAD_REQUEST)
+
+        filters, _, filter_errors = parse_incident_list_filters(request.query_params)
+        if 'ordering' in request.query_params:
+            # Recorrer por otro campo con filtros arbitrarios puede no tener un índice que lo cubra.
+            filter_errors['ordering'] = "La exportación siempre se ordena por ID; no se admite 'ordering'."
+        if filter_errors:
+            return JsonResponse({
+                "status": "error",
+                "message": "Parámetros de consulta inválidos.",
+                "errors": filter_errors
+            }, status=HTTPStatus.BAD_REQUEST)
+
+        incidents = get_visible_incidents(request.user, filters)
+
+        # El contenido se genera mientras se envía, fuera de la transacción de la solicitud.
+        serialized_chunks = iter_serialized_incidents(
+            incidents,
+            chunk_size=settings.INCIDENT_EXPORT_CHUNK_SIZE,
+            serialize=lambda incident, user_names: serialize_incident_list_item(incident, user_names, is_superuser_requesting)
+        )
+        if export_format == EXPORT_FORMAT_CSV:
+            columns = INCIDENT_LIST_FIELDS if is_superuser_requesting else INCIDENT_LIST_LIMITED_FIELDS
+            content = iter_csv_export(serialized_chunks, columns)
+        else:
+            content = iter_ndjson_export(serialized_chunks)
+
+        response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{get_export_filename(export_format)}"'
+        return response
+
+
 class IncidentRUD(APIView):
 
 
@@ -427,8 +839,9 @@ class IncidentRUD(APIView):
             )
 
         image_url = incident.image_url
-        created_by_name = get_user_first_name_by_id(incident.created_by)
-        modified_by_name = get_user_first_name_by_id(incident.modified_by)
+        user_names = get_user_names_for_incidents([incident])
+        created_by_name = resolve_user_name(user_names, incident.created_by)
+        modified_by_name = resolve_user_name(user_names, incident.modified_by)
 
         incident_date_str = str(incident.date)
 
@@ -440,6 +853,9 @@ class IncidentRUD(APIView):
                 "description": incident.description,
                 "date": incident_date_str,
                 "image_url": image_url,
+                "thumbnail_url": incident.image_thumbnail_url or image_url,
+                "medium_url": incident.image_medium_url or image_url,
+                "image_status": incident.image_status,
                 "comment": incident.comment,
                 "status": incident.status,
                 "status_display": incident.get_status_display(),
@@ -458,6 +874,9 @@ class IncidentRUD(APIView):
                 "description": incident.description,
                 "date": incident_date_str,
                 "image_url": image_url,
+                "thumbnail_url": incident.image_thumbnail_url or image_url,
+                "medium_url": incident.image_medium_url or image_url,
+                "image_status": incident.image_status,
                 "comment": incident.comment,
                 "status": incident.status,
                 "status_display": incident.get_status_display(),
@@ -508,12 +927,15 @@ class IncidentRUD(APIView):
     def put(self, request, id):
         try:
             incident_id = int(id)
-            incident = Incident.objects.get(pk=incident_id)
+            # Bloqueado hasta el commit: dos resoluciones simultáneas no descuentan dos veces los contadores.
+            incident = Incident.objects.select_for_update().get(pk=incident_id)
         except Incident.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Incidente no encontrado."}, status=HTTPStatus.NOT_FOUND)
         except ValueError:
             return JsonResponse({"status": "error", "message": "ID de incidente inválido. Debe ser un número entero."}, status=HTTPStatus.BAD_REQUEST)
 
+        old_stat_keys = get_incident_stat_keys(incident)
+
         data = request.data
         if not isinstance(data, dict):
             return JsonResponse({"status": "error", "message": "Cuerpo de la solicitud inválido, se esperaba un objeto JSON."}, status=HTTPStatus.BAD_REQUEST)
@@ -579,6 +1001,7 @@ class IncidentRUD(APIView):
 
         try:
             incident.save(update_fields=fields_updated_in_db)
+            record_incident_stats(old_keys=old_stat_keys, new_keys=get_incident_stat_keys(incident))
 
             if email_notification_required:
                 creator_id = incident.created_by
@@ -589,7 +1012,7 @@ class IncidentRUD(APIView):
                     try:
                         creator_user = User.objects.get(id=creator_id)
                         creator_email_address = creator_user.email
-                        creator_display_name = get_user_first_name_by_id(creator_id) or "Usuario Creador"
+                        creator_display_name = creator_user.first_name or creator_user.username or "Usuario Creador"
                     except User.DoesNotExist:
                         print(f"El creador del incidente ID {incident.id} (Usuario ID: {creator_id}) no fue encontrado. No se puede enviar email.")
                 
@@ -603,7 +1026,7 @@ class IncidentRUD(APIView):
                         creator_display_name=creator_display_name,
                         image_url_if_any=image_url
                     )
-                    send_email_notification(
+                    queue_email_notification(
                         html_content=html_email_body,
                         subject=f"RESOLUCIÓN: Incidente '{incident.incident_type}'",
                         recipient_email=creator_email_address
@@ -623,7 +1046,7 @@ class IncidentRUD(APIView):
                 "status_display": incident.get_status_display(),
                 "active": incident.active,
                 "modified_by_id": incident.modified_by,
-                "modified_by_name": get_user_first_name_by_id(incident.modified_by),
+                "modified_by_name": request.user.first_name or request.user.username,
                 "updated_at": incident.updated_at.strftime('%Y-%m-%d %H:%M:%S')
             }
             return JsonResponse({
@@ -669,7 +1092,7 @@ class IncidentRUD(APIView):
     def delete(self, request, id):
         try:
             incident_id = int(id)
-            incident = Incident.objects.get(pk=incident_id)
+            incident = Incident.objects.select_for_update().get(pk=incident_id)
         except Incident.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Incidente no encontrado."}, status=HTTPStatus.NOT_FOUND)
         except ValueError:
@@ -682,13 +1105,14 @@ class IncidentRUD(APIView):
             incident_public_id = incident.image_public_id
             incident_name_for_message = incident.incident_type
 
+            old_stat_keys = get_incident_stat_keys(incident)
             incident.delete()
+            record_incident_stats(old_keys=old_stat_keys)
 
+            # Se elimina del almacenamiento después del commit. Una subida pendiente de este
+            # incidente se descarta sola al no encontrarlo.
             if incident_public_id:
-                try:
-                    cloudinary.uploader.destroy(incident_public_id)
-                except Exception as e:
-                    print(f"Error al eliminar imagen de Cloudinary ({incident_public_id}): {e}")
+                queue_image_destroy(incident_public_id, incident_id=incident_id)
             return JsonResponse(
                 {"status": "ok", "message": f"Incidente '{incident_name_for_message}' eliminado exitosamente."},
                 status=HTTPStatus.OK
@@ -747,7 +1171,7 @@ class IncidentSD(APIView): #Soft delete
     def patch(self, request, id): # El 'id' del incidente vendrá de la URL
         try:
             incident_id = int(id)
-            incident = Incident.objects.get(pk=incident_id)
+            incident = Incident.objects.select_for_update().get(pk=incident_id)
         except Incident.DoesNotExist:
             return JsonResponse(
                 {"status": "error", "message": "Incidente no encontrado."},
@@ -794,9 +1218,11 @@ class IncidentSD(APIView): #Soft delete
             )
 
         try:
+            old_stat_keys = get_incident_stat_keys(incident)
             incident.active = new_active_status
             incident.modified_by = request.user.id 
             incident.save(update_fields=['active', 'modified_by', 'updated_at'])
+            record_incident_stats(old_keys=old_stat_keys, new_keys=get_incident_stat_keys(incident))
             
             action_message_verb = "activado" if new_active_status else "desactivado"
             return JsonResponse(
@@ -814,6 +1240,227 @@ class IncidentSD(APIView): #Soft delete
             )
 
 
+BULK_ACTION_RESOLVE = 'resolve'
+BULK_ACTION_DEACTIVATE = 'deactivate'
+BULK_ACTION_REACTIVATE = 'reactivate'
+BULK_ACTIONS = [BULK_ACTION_RESOLVE, BULK_ACTION_DEACTIVATE, BULK_ACTION_REACTIVATE]
+
+
+def parse_bulk_incident_ids(raw_ids):
+    """
+    Valida la lista de IDs de una operación masiva y la devuelve sin repetidos (en el orden recibido).
+    Lanza ValueError con el mensaje para el cliente si la lista no es válida.
+    """
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError("El campo 'ids' debe ser una lista no vacía de IDs de incidentes.")
+    if any(isinstance(raw_id, bool) or not isinstance(raw_id, int) for raw_id in raw_ids):
+        raise ValueError("Todos los valores de 'ids' deben ser números enteros.")
+
+    incident_ids = list(dict.fromkeys(raw_ids))
+    if len(incident_ids) > settings.INCIDENT_BULK_MAX_IDS:
+        raise ValueError(f"Se pueden procesar como máximo {settings.INCIDENT_BULK_MAX_IDS} incidentes por solicitud.")
+    return incident_ids
+
+
+def get_bulk_action_result(incident, action, resolution_comment):
+    """
+    Verifica si la acción masiva se puede aplicar a un incidente, con las mismas reglas que
+    IncidentRUD.put (resolver) e IncidentSD.patch (activar/desactivar). Devuelve None si se
+    puede aplicar o el resultado (status y message) que se informa para ese ID.
+    """
+    if action == BULK_ACTION_RESOLVE:
+        if incident.status == Incident.STATUS_RESOLVED:
+            return {"status": "info", "message": "El incidente ya se encuentra resuelto. No se realizaron cambios."}
+        if not resolution_comment and not (incident.comment and incident.comment.strip()):
+            return {"status": "error", "message": "Se requiere un comentario de resolución (no vacío) para marcar el incidente como resuelto."}
+    elif action == BULK_ACTION_DEACTIVATE and not incident.active:
+        return {"status": "info", "message": "El incidente ya se encuentra inactivo. No se realizaron cambios."}
+    elif action == BULK_ACTION_REACTIVATE and incident.active:
+        return {"status": "info", "message": "El incidente ya se encuentra activo. No se realizaron cambios."}
+    return None
+
+
+def queue_bulk_resolution_emails(incidents, resolver_user):
+    """
+    Encola un solo correo por creador con todos sus incidentes resueltos en la operación.
+    """
+    incidents_by_creator = {}
+    for incident in incidents:
+        if incident.created_by:
+            incidents_by_creator.setdefault(incident.created_by, []).append(incident)
+
+    creators = User.objects.filter(id__in=incidents_by_creator.keys()).only('id', 'email', 'first_name', 'username')
+    resolver_name = resolver_user.get_full_name() or resolver_user.username
+
+    for creator in creators:
+        if not creator.email:
+            print(f"El creador (ID: {creator.id}) no tiene una dirección de correo electrónico configurada. No se envió notificación de resolución.")
+            continue
+
+        creator_incidents = incidents_by_creator[creator.id]
+        creator_display_name = creator.first_name or creator.username or "Usuario Creador"
+        if len(creator_incidents) == 1:
+            incident = creator_incidents[0]
+            html_email_body = generate_incident_resolved_email_html(
+                incident=incident,
+                resolver_user_name=resolver_name,
+                creator_display_name=creator_display_name,
+                image_url_if_any=incident.image_url
+            )
+            subject = f"RESOLUCIÓN: Incidente '{incident.incident_type}'"
+        else:
+            html_email_body = generate_incidents_resolved_summary_email_html(
+                incidents=creator_incidents,
+                resolver_user_name=resolver_name,
+                creator_display_name=creator_display_name
+            )
+            subject = f"RESOLUCIÓN: {len(creator_incidents)} incidentes resueltos"
+
+        queue_email_notification(html_content=html_email_body, subject=subject, recipient_email=creator.email)
+
+
+class IncidentBulk(APIView):
+
+
+    permission_classes = [permissions.AllowAny]
+
+
+    @swagger_auto_schema(
+        operation_id="api_incident_bulk",
+        operation_description="Aplica una misma acción a varios incidentes en una sola transacción: resolver ('resolve'), desactivar ('deactivate', eliminación lógica) o reactivar ('reactivate'). Se aplican las mismas reglas que en los endpoints individuales y cada ID se valida por separado: la respuesta informa el resultado de cada uno y los válidos se actualizan con un único UPDATE. Al resolver se encola un solo correo por creador con todos sus incidentes resueltos. Requiere permiso 'incident.change_incident'.",
+        security=bearer_security_definition,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['ids', 'action'],
+            properties={
+                'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER), description="IDs de los incidentes (máximo INCIDENT_BULK_MAX_IDS, 500 por defecto)."),
+                'action': openapi.Schema(type=openapi.TYPE_STRING, enum=BULK_ACTIONS, description="Acción a aplicar."),
+                'comment': openapi.Schema(type=openapi.TYPE_STRING, description="Comentario de resolución (solo para 'resolve'). Reemplaza el comentario de todos los incidentes resueltos; si no se envía, cada incidente debe tener ya un comentario.")
+            }
+        ),
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Operación procesada. Cada ID tiene su propio resultado ('ok', 'info' si no había nada que cambiar o 'error').",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'summary': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'updated': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'unchanged': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'errors': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            }
+                        ),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['ok', 'info', 'error']),
+                                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Datos inválidos (lista de IDs, acción o comentario).", schema=error_response_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.FORBIDDEN: openapi.Response(description="Permiso 'incident.change_incident' requerido.", schema=error_response_schema),
+            HTTPStatus.INTERNAL_SERVER_ERROR: openapi.Response(description="Error interno del servidor.", schema=error_response_schema)
+        },
+    )
+    @authenticate_user(required_permission='incident.change_incident')
+    @transaction.atomic
+    def post(self, request):
+        data = request.data
+        if not isinstance(data, dict):
+            return JsonResponse({"status": "error", "message": "Cuerpo de la solicitud inválido, se esperaba un objeto JSON."}, status=HTTPStatus.BAD_REQUEST)
+
+        action = data.get('action')
+        if action not in BULK_ACTIONS:
+            return JsonResponse({"status": "error", "message": f"La acción no es válida. Opciones válidas: {', '.join(BULK_ACTIONS)}."}, status=HTTPStatus.BAD_REQUEST)
+
+        try:
+            incident_ids = parse_bulk_incident_ids(data.get('ids'))
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+
+        resolution_comment = data.get('comment')
+        if resolution_comment is not None:
+            if action != BULK_ACTION_RESOLVE:
+                return JsonResponse({"status": "error", "message": "El campo 'comment' solo se permite con la acción 'resolve'."}, status=HTTPStatus.BAD_REQUEST)
+            if not isinstance(resolution_comment, str):
+                return JsonResponse({"status": "error", "message": "El comentario debe ser una cadena de texto."}, status=HTTPStatus.BAD_REQUEST)
+            resolution_comment = resolution_comment.strip() or None
+
+        # Una sola consulta, con las filas bloqueadas hasta el commit (como en los endpoints individuales).
+        incidents_by_id = Incident.objects.select_for_update().in_bulk(incident_ids)
+
+        results = []
+        incidents_to_update = []
+        for incident_id in incident_ids:
+            incident = incidents_by_id.get(incident_id)
+            if incident is None:
+                results.append({"id": incident_id, "status": "error", "message": "Incidente no encontrado."})
+                continue
+
+            skip_result = get_bulk_action_result(incident, action, resolution_comment)
+            if skip_result:
+                results.append({"id": incident_id, **skip_result})
+                continue
+
+            incidents_to_update.append(incident)
+            results.append({"id": incident_id, "status": "ok", "message": "Incidente actualizado."})
+
+        if incidents_to_update:
+            try:
+                update_values = {'modified_by': request.user.id, 'updated_at': timezone.now()}
+                if action == BULK_ACTION_RESOLVE:
+                    update_values['status'] = Incident.STATUS_RESOLVED
+                    if resolution_comment:
+                        update_values['comment'] = resolution_comment
+                else:
+                    update_values['active'] = action == BULK_ACTION_REACTIVATE
+
+                old_stat_keys = []
+                new_stat_keys = []
+                for incident in incidents_to_update:
+                    old_stat_keys.extend(get_incident_stat_keys(incident))
+                    for field_name, value in update_values.items():
+                        setattr(incident, field_name, value)
+                    new_stat_keys.extend(get_incident_stat_keys(incident))
+
+                Incident.objects.filter(id__in=[incident.id for incident in incidents_to_update]).update(**update_values)
+                record_incident_stats(old_keys=old_stat_keys, new_keys=new_stat_keys)
+
+                if action == BULK_ACTION_RESOLVE:
+                    queue_bulk_resolution_emails(incidents_to_update, request.user)
+            except Exception as e:
+                # Se responde con un error en lugar de propagar la excepción: hay que revertir a mano.
+                transaction.set_rollback(True)
+                return JsonResponse(
+                    {"status": "error", "message": f"No se pudo completar la operación masiva: {str(e)}"},
+                    status=HTTPStatus.INTERNAL_SERVER_ERROR
+                )
+
+        summary = {
+            "updated": len(incidents_to_update),
+            "unchanged": sum(1 for result in results if result["status"] == "info"),
+            "errors": sum(1 for result in results if result["status"] == "error"),
+        }
+        return JsonResponse({
+            "status": "ok",
+            "message": f"{summary['updated']} de {len(incident_ids)} incidentes actualizados.",
+            "summary": summary,
+            "results": results
+        }, status=HTTPStatus.OK)
+
+
 class EditImage(APIView):
 
 
@@ -837,9 +1484,30 @@ class EditImage(APIView):
             openapi.Parameter(
                 name='incident_image',
                 in_=openapi.IN_FORM,
-                description="Nuevo archivo de imagen (JPG, JPEG, PNG, máx 5MB).",
+                description="Nuevo archivo de imagen (JPG, JPEG, PNG, máx 5MB). Requerido si no se envía image_public_id.",
                 type=openapi.TYPE_FILE,
-                required=True
+                required=False
+            ),
+            openapi.Parameter(
+                name='image_public_id',
+                in_=openapi.IN_FORM,
+                description="Alternativa a subir el archivo: 'public_id' devuelto por Cloudinary tras subir la imagen con los parámetros de /incident/upload-signature.",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                name='image_version',
+                in_=openapi.IN_FORM,
+                description="'version' devuelta por Cloudinary (requerido junto con image_public_id).",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
+            openapi.Parameter(
+                name='image_signature',
+                in_=openapi.IN_FORM,
+                description="'signature' devuelta por Cloudinary (requerido junto con image_public_id).",
+                type=openapi.TYPE_STRING,
+                required=False
             )
         ],
         responses={
@@ -852,7 +1520,21 @@ class EditImage(APIView):
                         'message': openapi.Schema(type=openapi.TYPE_STRING, example="Imagen del incidente actualizada exitosamente."),
                         'incident_id': openapi.Schema(type=openapi.TYPE_INTEGER),
                         'new_image_filename': openapi.Schema(type=openapi.TYPE_STRING),
-                        'new_image_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI)
+                        'new_image_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI),
+                        'image_status': openapi.Schema(type=openapi.TYPE_STRING, example="lista")
+                    }
+                )
+            ),
+            HTTPStatus.ACCEPTED: openapi.Response(
+                description="Archivo recibido: se guarda en segundo plano y reemplaza a la imagen actual al terminar (consultar image_status del incidente).",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'incident_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'new_image_url': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                        'image_status': openapi.Schema(type=openapi.TYPE_STRING, example="pendiente")
                     }
                 )
             ),
@@ -884,268 +1566,432 @@ class EditImage(APIView):
                 status=HTTPStatus.FORBIDDEN
             )
 
+        upload_result, direct_upload_error = get_direct_upload_result(request, request.data)
+        if direct_upload_error:
+            return direct_upload_error
+
         new_image_file = request.FILES.get('incident_image')
-        if not new_image_file:
-            return JsonResponse({"status": "error", "message": "No se adjuntó ningún archivo de imagen (se esperaba en el campo 'incident_image')."}, status=HTTPStatus.BAD_REQUEST)
+        if not new_image_file and not upload_result:
+            return JsonResponse({"status": "error", "message": "No se adjuntó ningún archivo de imagen (se esperaba en el campo 'incident_image' o 'image_public_id')."}, status=HTTPStatus.BAD_REQUEST)
 
-        allowed_extensions = ['.jpg', '.jpeg', '.png']
-        ext = os.path.splitext(new_image_file.name)[1].lower()
-        if ext not in allowed_extensions:
-            return JsonResponse({"status": "error", "message": f"Tipo de archivo no permitido ('{ext}'). Permitidos: {', '.join(allowed_extensions)}."}, status=HTTPStatus.BAD_REQUEST)
-        
-        if new_image_file.size > 5 * 1024 * 1024:
-            return JsonResponse({"status": "error", "message": "La imagen excede el tamaño máximo permitido (5MB)."}, status=HTTPStatus.BAD_REQUEST)
+        if not upload_result:
+            allowed_extensions = ['.jpg', '.jpeg', '.png']
+            ext = os.path.splitext(new_image_file.name)[1].lower()
+            if ext not in allowed_extensions:
+                return JsonResponse({"status": "error", "message": f"Tipo de archivo no permitido ('{ext}'). Permitidos: {', '.join(allowed_extensions)}."}, status=HTTPStatus.BAD_REQUEST)
+
+            if new_image_file.size > 5 * 1024 * 1024:
+                return JsonResponse({"status": "error", "message": "La imagen excede el tamaño máximo permitido (5MB)."}, status=HTTPStatus.BAD_REQUEST)
+
+            try:
+                verify_image_file(new_image_file)
+            except InvalidImageError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
 
         old_public_id = incident.image_public_id
 
         try:
-            upload_result = cloudinary.uploader.upload(
-                new_image_file,
-                folder="incident_images"
-            )
+            if not upload_result:
+                # La imagen actual se mantiene hasta que el worker termine de subir la nueva;
+                # él mismo programa la eliminación de la anterior.
+                queue_image_upload(incident.id, new_image_file)
+                incident.image_status = Incident.IMAGE_STATUS_PENDING
+                incident.modified_by = request.user.id
+                incident.save(update_fields=['image_status', 'modified_by', 'updated_at'])
+
+                return JsonResponse({
+                    "status": "ok",
+                    "message": "La nueva imagen se está procesando y reemplazará a la actual en unos segundos.",
+                    "incident_id": incident.id,
+                    "new_image_url": None,
+                    "image_status": incident.image_status
+                }, status=HTTPStatus.ACCEPTED)
 
             incident.image_url = upload_result.get('secure_url')
             incident.image_public_id = upload_result.get('public_id')
+            incident.image_thumbnail_url = upload_result.get('thumbnail_url')
+            incident.image_medium_url = upload_result.get('medium_url')
+            incident.image_status = Incident.IMAGE_STATUS_READY
             incident.modified_by = request.user.id
-            incident.save(update_fields=['image_url', 'image_public_id', 'modified_by', 'updated_at'])
+            incident.save(update_fields=['image_url', 'image_public_id', 'image_thumbnail_url', 'image_medium_url', 'image_status', 'modified_by', 'updated_at'])
 
             if old_public_id:
-                try:
-                    cloudinary.uploader.destroy(old_public_id)
-                except Exception as e:
-                    print(f"No se pudo eliminar la imagen anterior de Cloudinary ({old_public_id}): {e}")
+                queue_image_destroy(old_public_id, incident_id=incident.id)
 
             return JsonResponse({
                 "status": "ok",
                 "message": "Imagen del incidente actualizada exitosamente.",
                 "incident_id": incident.id,
-                "new_image_url": incident.image_url
+                "new_image_url": incident.image_url,
+                "image_status": incident.image_status
             }, status=HTTPStatus.OK)
 
         except Exception as e:
             return JsonResponse({"status": "error", "message": f"Error al actualizar la imagen del incidente: {str(e)}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
-class ActiveReports(APIView):
+class UploadSignature(APIView):
 
     permission_classes = [permissions.AllowAny]
 
-    def draw_header(self, canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica-Bold', 16)
-        header_y_position = doc.pagesize[1] - 0.75 * inch
-        canvas.drawCentredString(letter[0] / 2.0, header_y_position, "Reporte de Incidentes Activos")
-        canvas.setFont('Helvetica', 9)
-        canvas.drawString(inch, 0.75 * inch, f"Página {doc.page}")
-        canvas.restoreState()
-
+    @swagger_auto_schema(
+        operation_id="api_incident_upload_signature",
+        operation_description="Entrega parámetros firmados para subir una imagen directamente a Cloudinary (POST multipart a 'upload_url' con file, api_key, timestamp, public_id, allowed_formats y signature). Luego se envía a /incident o /incident/edit-image solo image_public_id, image_version e image_signature de la respuesta de Cloudinary. La firma vence a la hora. Requiere autenticación.",
+        security=bearer_security_definition,
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Parámetros de subida firmados.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'upload_url': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI),
+                                'api_key': openapi.Schema(type=openapi.TYPE_STRING),
+                                'timestamp': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'public_id': openapi.Schema(type=openapi.TYPE_STRING),
+                                'allowed_formats': openapi.Schema(type=openapi.TYPE_STRING),
+                                'signature': openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        ),
+                    }
+                )
+            ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="El almacenamiento configurado (local) no admite subidas directas.", schema=error_response_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.INTERNAL_SERVER_ERROR: openapi.Response(description="Cloudinary no está configurado.", schema=error_response_schema),
+        },
+    )
     @authenticate_user()
-    def get(self, request):
-        base_query = Incident.objects.filter(
-            status=Incident.STATUS_ACTIVE, 
-            active=True
-        )
+    def post(self, request):
+        if not get_image_storage().supports_direct_upload:
+            return JsonResponse({"status": "error", "message": DIRECT_UPLOAD_UNAVAILABLE_MESSAGE}, status=HTTPStatus.BAD_REQUEST)
+
+        try:
+            upload_params = generate_upload_params(request.user.id)
+        except Exception as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        return JsonResponse({"status": "ok", "data": upload_params}, status=HTTPStatus.OK)
+
 
-        if request.user.is_superuser:
-            incidents_to_report = base_query.order_by('created_at')
+class IncidentImageFile(APIView):
+    """
+    Sirve las imágenes guardadas en disco (almacenamiento local y archivos antiguos).
+    Con INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX la respuesta solo lleva la cabecera
+    X-Accel-Redirect y nginx envía el archivo; si no, FileResponse lo entrega con
+    wsgi.file_wrapper (sendfile en gunicorn). Las imágenes son públicas, como en Cloudinary.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request, name):
+        try:
+            # Relativo a la carpeta de imágenes: '..' no llega a otros archivos de MEDIA_ROOT (reportes, etc.).
+            image_path = safe_join(get_local_image_storage().get_path(INCIDENT_IMAGE_FOLDER), name)
+        except SuspiciousFileOperation:
+            image_path = None
+
+        if not image_path or not os.path.isfile(image_path):
+            return JsonResponse({"status": "error", "message": "Imagen no encontrada."}, status=HTTPStatus.NOT_FOUND)
+
+        content_type = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+        accel_redirect_prefix = settings.INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX
+        if accel_redirect_prefix:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = f"{accel_redirect_prefix}{INCIDENT_IMAGE_FOLDER}/{name}"
         else:
-            incidents_to_report = base_query.filter(created_by=request.user.id).order_by('created_at')
+            response = FileResponse(open(image_path, 'rb'), content_type=content_type)
+
+        # Cada imagen nueva tiene un nombre nuevo: el navegador puede guardarla sin revalidar.
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
+def build_report_file_response(build_report, report_data, filename):
+    """
+    Genera el PDF en un archivo temporal "spooled" (en memoria hasta REPORT_SPOOL_MAX_MEMORY,
+    luego en disco) y lo envía por partes con FileResponse, indicando Content-Length.
+    """
+    report_file = tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_MEMORY)
+    try:
+        build_report(report_file, report_data)
+    except BaseException:
+        report_file.close()
+        raise
+
+    content_length = report_file.tell()
+    report_file.seek(0)
 
+    response = FileResponse(report_file, as_attachment=True, filename=filename, content_type='application/pdf')
+    response['Content-Length'] = content_length
+    return response
+
+
+def build_cached_report_response(request, report_type, incident, build_report, filename):
+    """
+    Sirve el reporte de un incidente desde la caché en disco, generándolo solo si la versión
+    actual (updated_at) todavía no está guardada. Responde con ETag y devuelve 304 si el
+    cliente ya tiene esa versión (If-None-Match).
+    """
+    version = get_report_version(incident.updated_at)
+    etag = quote_etag(f"{report_type}-{incident.id}-{version}")
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        report_file = None
+        report_path = get_cached_report_path(report_type, incident.id, version)
+        if report_path:
+            try:
+                report_file = open(report_path, 'rb')
+            except FileNotFoundError:
+                # Eliminado por la política LRU entre la consulta y la apertura.
+                report_file = None
+        if report_file is None:
+            report_path = store_report(report_type, incident.id, version, lambda output: build_report(output, incident))
+            report_file = open(report_path, 'rb')
+        response = FileResponse(report_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
+    response['ETag'] = etag
+    # El reporte depende del usuario autenticado: solo el navegador puede guardarlo y debe revalidarlo.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ActiveReports(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @authenticate_user()
+    def get(self, request):
+        incidents_to_report = get_active_report_queryset(request.user)
         if not incidents_to_report.exists():
             return JsonResponse({"status": "info", "message": "No hay incidentes activos para mostrar en el reporte."}, status=HTTPStatus.OK)
 
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1.2 * inch, rightMargin=72, leftMargin=72, bottomMargin=72)
-        styles = getSampleStyleSheet()
-
-        story = []
-        
-        for incident in incidents_to_report:
-            story.append(Paragraph(f"ID: {incident.id} - {incident.incident_type}", styles['h2']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            created_by_name = get_user_first_name_by_id(incident.created_by) or "N/A"
-            details_data = [
-                ['Fecha:', str(incident.date)],
-                ['Reportado Por:', created_by_name],
-                ['Descripción:', Paragraph(incident.description, styles['BodyText'])]
-            ]
-            
-            details_table = Table(details_data, colWidths=[1.2*inch, 5.3*inch])
-            details_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            story.append(details_table)
-            story.append(Spacer(1, 0.2 * inch))
-
-            if incident.image_url:
-                try:
-                    response = requests.get(incident.image_url, stream=True)
-                    response.raise_for_status()
-
-                    img = Image(io.BytesIO(response.content), width=3*inch, height=2.25*inch, kind='proportional')
-                    story.append(img)
-                except Exception as e:
-                    story.append(Paragraph(f"Error al cargar imagen: {e}", styles['Italic']))
-
-            story.append(Spacer(1, 0.5 * inch))
-
-        doc.build(story, onFirstPage=self.draw_header, onLaterPages=self.draw_header)
-
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_incidentes_activos.pdf"'
-        return response
+        return build_report_file_response(build_active_report_in_chunks, incidents_to_report, get_report_filename(ReportJob.TYPE_ACTIVE))
 
 
 class SpecificReport(APIView):
     permission_classes = [permissions.AllowAny]
 
-    def draw_header(self, canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica-Bold', 16)
-        header_y_position = doc.pagesize[1] - 0.75 * inch
-        canvas.drawCentredString(letter[0] / 2.0, header_y_position, "Reporte de Incidente Específico")
-        canvas.setFont('Helvetica', 9)
-        canvas.drawString(inch, 0.75 * inch, f"Página {doc.page}")
-        canvas.restoreState()
-
     @authenticate_user()
     def get(self, request, id):
         try:
-            incident = Incident.objects.get(
-                pk=id, 
-                status=Incident.STATUS_ACTIVE, 
-                active=True
-            )
+            incident = get_specific_report_incident(id)
         except Incident.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Incidente activo con el ID proporcionado no encontrado."}, status=HTTPStatus.NOT_FOUND)
 
-        if not request.user.is_superuser and incident.created_by != request.user.id:
+        if not can_generate_report(request.user, incident):
             return JsonResponse({"status": "error", "message": "No tienes permiso para generar un reporte de este incidente."}, status=HTTPStatus.FORBIDDEN)
 
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1.2 * inch, rightMargin=72, leftMargin=72, bottomMargin=72)
-        styles = getSampleStyleSheet()
-        story = []
-
-        story.append(Paragraph(f"Detalle del Incidente", styles['h1']))
-        story.append(Spacer(1, 0.2 * inch))
-
-        data = [
-            ["ID Incidente:", Paragraph(str(incident.id), styles['BodyText'])],
-            ["Tipo de Incidente:", Paragraph(incident.incident_type, styles['BodyText'])],
-            ["Fecha del Incidente:", str(incident.date)],
-            ["Estado:", incident.get_status_display()],
-            ["Descripción:", Paragraph(incident.description, styles['BodyText'])],
-            ["Reportado por:", get_user_first_name_by_id(incident.created_by)],
-            ["Fecha de Creación:", incident.created_at.strftime('%Y-%m-%d %H:%M:%S')],
-        ]
-
-        table = Table(data, colWidths=[1.5*inch, 5.5*inch])
-        table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'), ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'), ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6), ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 0.2 * inch))
-
-        if incident.image_url:
-            story.append(Paragraph("Imagen Adjunta:", styles['h2']))
-            try:
-                response = requests.get(incident.image_url, stream=True)
-                response.raise_for_status()
-                img = Image(io.BytesIO(response.content), width=4*inch, height=3*inch, kind='proportional')
-                story.append(img)
-            except Exception as e:
-                story.append(Paragraph(f"No se pudo cargar la imagen: {e}", styles['BodyText']))
-
-        doc.build(story, onFirstPage=self.draw_header, onLaterPages=self.draw_header)
-
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="reporte_incidente_{id}.pdf"'
-        return response
+        return build_cached_report_response(request, ReportJob.TYPE_SPECIFIC, incident, build_specific_report, get_report_filename(ReportJob.TYPE_SPECIFIC, id))
     
 
 class ArchivedReport(APIView):
     permission_classes = [permissions.AllowAny]
 
-    def draw_header(self, canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica-Bold', 16)
-        header_y_position = doc.pagesize[1] - 0.75 * inch
-        canvas.drawCentredString(letter[0] / 2.0, header_y_position, "Reporte de Incidente Archivado")
-        canvas.setFont('Helvetica', 9)
-        canvas.drawString(inch, 0.75 * inch, f"Página {doc.page}")
-        canvas.restoreState()
-
     @authenticate_user()
     def get(self, request, id):
         try:
-            incident = Incident.objects.get(
-                Q(status=Incident.STATUS_RESOLVED) | Q(active=False),
-                pk=id
-            )
+            incident = get_archived_report_incident(id)
         except Incident.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Incidente resuelto o inactivo con el ID proporcionado no encontrado."}, status=HTTPStatus.NOT_FOUND)
 
-        if not request.user.is_superuser and incident.created_by != request.user.id:
+        if not can_generate_report(request.user, incident):
             return JsonResponse({"status": "error", "message": "No tienes permiso para generar un reporte de este incidente."}, status=HTTPStatus.FORBIDDEN)
 
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1.2 * inch, rightMargin=72, leftMargin=72, bottomMargin=72)
-        styles = getSampleStyleSheet()
-        story = []
+        return build_cached_report_response(request, ReportJob.TYPE_ARCHIVED, incident, build_archived_report, get_report_filename(ReportJob.TYPE_ARCHIVED, id))
+
+
+report_job_object_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del trabajo de reporte."),
+        'report_type': openapi.Schema(type=openapi.TYPE_STRING, enum=[t[0] for t in ReportJob.TYPE_CHOICES]),
+        'incident_id': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True),
+        'status': openapi.Schema(type=openapi.TYPE_STRING, enum=[s[0] for s in ReportJob.STATUS_CHOICES]),
+        'status_display': openapi.Schema(type=openapi.TYPE_STRING),
+        'error': openapi.Schema(type=openapi.TYPE_STRING, nullable=True, description="Motivo del fallo, si el trabajo falló."),
+        'created_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        'finished_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, nullable=True),
+        'expires_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, nullable=True, description="Fecha a partir de la cual el PDF deja de estar disponible."),
+        'download_url': openapi.Schema(type=openapi.TYPE_STRING, nullable=True, description="Ruta de descarga, solo cuando el trabajo está completado."),
+    }
+)
 
-        story.append(Paragraph(f"Detalle del Incidente Archivado", styles['h1']))
-        story.append(Spacer(1, 0.2 * inch))
 
-        data = [
-            ["ID Incidente:", Paragraph(str(incident.id), styles['BodyText'])],
-            ["Tipo de Incidente:", Paragraph(incident.incident_type, styles['BodyText'])],
-            ["Fecha del Incidente:", str(incident.date)],
-            ["Descripción:", Paragraph(incident.description, styles['BodyText'])],
-            ["Reportado por:", get_user_first_name_by_id(incident.created_by)],
-            ["Fecha de Creación:", incident.created_at.strftime('%Y-%m-%d %H:%M:%S')],
-        ]
+def get_report_job_response_data(job):
+    data = serialize_report_job(job)
+    data["download_url"] = f"/api/v1/incident/report-jobs/{job.id}/download" if job.status == ReportJob.STATUS_COMPLETED else None
+    return data
 
-        if incident.status == Incident.STATUS_RESOLVED:
-            data.append(["Estado Final:", incident.get_status_display()])
-            data.append(["Comentario de Solución:", Paragraph(incident.comment or "N/A", styles['BodyText'])])
-            data.append(["Resuelto/Modificado por:", get_user_first_name_by_id(incident.modified_by)])
-            data.append(["Fecha de Actualización:", incident.updated_at.strftime('%Y-%m-%d %H:%M:%S')])
-        
-        if not incident.active:
-             data.append(["Visibilidad:", Paragraph("Inactivo (Oculto en listados activos)", styles['BodyText'])])
+
+def get_owned_report_job(request, id):
+    """
+    Devuelve (job, None) o (None, JsonResponse de error). Solo el solicitante o un superusuario acceden al trabajo.
+    """
+    try:
+        job = ReportJob.objects.defer('content').get(pk=id)
+    except ReportJob.DoesNotExist:
+        return None, JsonResponse({"status": "error", "message": "Trabajo de reporte no encontrado."}, status=HTTPStatus.NOT_FOUND)
+
+    if not request.user.is_superuser and job.requested_by != request.user.id:
+        return None, JsonResponse({"status": "error", "message": "No tienes permiso para acceder a este reporte."}, status=HTTPStatus.FORBIDDEN)
+
+    return job, None
 
 
-        table = Table(data, colWidths=[1.8*inch, 5.2*inch])
-        table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'), ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'), ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6), ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 0.2 * inch))
+class ReportJobC(APIView):
 
-        if incident.image_url:
-            story.append(Paragraph("Imagen Adjunta:", styles['h2']))
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser, FormParser]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_report_job_create",
+        operation_description="Encola la generación de un reporte PDF en segundo plano. El PDF lo genera el worker 'process_report_jobs'; el estado se consulta en /incident/report-jobs/{id} y el archivo se descarga en /incident/report-jobs/{id}/download. Requiere autenticación.",
+        security=bearer_security_definition,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['report_type'],
+            properties={
+                'report_type': openapi.Schema(type=openapi.TYPE_STRING, enum=[t[0] for t in ReportJob.TYPE_CHOICES], description="'active' (todos los incidentes activos), 'specific' (un incidente activo) o 'archived' (un incidente resuelto o inactivo)."),
+                'incident_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del incidente. Requerido para 'specific' y 'archived'."),
+            }
+        ),
+        responses={
+            HTTPStatus.ACCEPTED: openapi.Response(
+                description="Reporte encolado.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'data': report_job_object_schema,
+                    }
+                )
+            ),
+            HTTPStatus.OK: openapi.Response(description="No hay incidentes activos para el reporte (status 'info').", schema=error_response_schema),
+            HTTPStatus.BAD_REQUEST: openapi.Response(description="Tipo de reporte o ID de incidente inválido.", schema=error_response_schema),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.FORBIDDEN: openapi.Response(description="Sin permiso para generar el reporte de este incidente.", schema=error_response_schema),
+            HTTPStatus.NOT_FOUND: openapi.Response(description="Incidente no encontrado en el estado requerido por el tipo de reporte.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user()
+    @transaction.atomic
+    def post(self, request):
+        report_type = request.data.get('report_type')
+        if report_type not in dict(ReportJob.TYPE_CHOICES):
+            return JsonResponse({"status": "error", "message": "El campo 'report_type' debe ser 'active', 'specific' o 'archived'."}, status=HTTPStatus.BAD_REQUEST)
+
+        incident_id = None
+        if report_type == ReportJob.TYPE_ACTIVE:
+            if not get_active_report_queryset(request.user).exists():
+                return JsonResponse({"status": "info", "message": "No hay incidentes activos para mostrar en el reporte."}, status=HTTPStatus.OK)
+        else:
             try:
-                response = requests.get(incident.image_url, stream=True)
-                response.raise_for_status()
-                img = Image(io.BytesIO(response.content), width=4*inch, height=3*inch, kind='proportional')
-                story.append(img)
-            except Exception as e:
-                story.append(Paragraph(f"No se pudo cargar la imagen: {e}", styles['BodyText']))
+                incident_id = int(request.data.get('incident_id'))
+            except (TypeError, ValueError):
+                return JsonResponse({"status": "error", "message": "El campo 'incident_id' es requerido y debe ser un número entero."}, status=HTTPStatus.BAD_REQUEST)
+
+            try:
+                if report_type == ReportJob.TYPE_SPECIFIC:
+                    incident = get_specific_report_incident(incident_id)
+                else:
+                    incident = get_archived_report_incident(incident_id)
+            except Incident.DoesNotExist:
+                message = "Incidente activo con el ID proporcionado no encontrado." if report_type == ReportJob.TYPE_SPECIFIC else "Incidente resuelto o inactivo con el ID proporcionado no encontrado."
+                return JsonResponse({"status": "error", "message": message}, status=HTTPStatus.NOT_FOUND)
+
+            if not can_generate_report(request.user, incident):
+                return JsonResponse({"status": "error", "message": "No tienes permiso para generar un reporte de este incidente."}, status=HTTPStatus.FORBIDDEN)
+
+        job = ReportJob.objects.create(report_type=report_type, incident_id=incident_id, requested_by=request.user.id)
+
+        return JsonResponse({
+            "status": "ok",
+            "message": "Reporte encolado. Consulta su estado hasta que esté completado para descargarlo.",
+            "data": get_report_job_response_data(job)
+        }, status=HTTPStatus.ACCEPTED)
 
-        doc.build(story, onFirstPage=self.draw_header, onLaterPages=self.draw_header)
 
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="reporte_archivado_{id}.pdf"'
-        return response
\ No newline at end of file
+class ReportJobR(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_report_job_status",
+        operation_description="Consulta el estado de un trabajo de reporte. Solo el solicitante o un superusuario pueden consultarlo.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('id', openapi.IN_PATH, description="ID del trabajo de reporte.", required=True, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Estado del trabajo.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': report_job_object_schema,
+                    }
+                )
+            ),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.FORBIDDEN: openapi.Response(description="El trabajo pertenece a otro usuario.", schema=error_response_schema),
+            HTTPStatus.NOT_FOUND: openapi.Response(description="Trabajo de reporte no encontrado.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user()
+    def get(self, request, id):
+        job, error_response = get_owned_report_job(request, id)
+        if error_response:
+            return error_response
+
+        return JsonResponse({"status": "ok", "data": get_report_job_response_data(job)}, status=HTTPStatus.OK)
+
+
+class ReportJobDownload(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_id="api_incident_report_job_download",
+        operation_description="Descarga el PDF de un trabajo de reporte completado. Solo el solicitante o un superusuario pueden descargarlo.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('id', openapi.IN_PATH, description="ID del trabajo de reporte.", required=True, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(description="Archivo PDF del reporte."),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(description="Token no provisto o inválido.", schema=error_response_schema),
+            HTTPStatus.FORBIDDEN: openapi.Response(description="El trabajo pertenece a otro usuario.", schema=error_response_schema),
+            HTTPStatus.NOT_FOUND: openapi.Response(description="Trabajo de reporte no encontrado.", schema=error_response_schema),
+            HTTPStatus.CONFLICT: openapi.Response(description="El reporte todavía no está listo o falló.", schema=error_response_schema),
+            HTTPStatus.GONE: openapi.Response(description="El reporte expiró y su archivo fue eliminado.", schema=error_response_schema),
+        },
+    )
+    @authenticate_user()
+    def get(self, request, id):
+        job, error_response = get_owned_report_job(request, id)
+        if error_response:
+            return error_response
+
+        if job.status == ReportJob.STATUS_EXPIRED or (job.status == ReportJob.STATUS_COMPLETED and job.expires_at and job.expires_at <= timezone.now()):
+            return JsonResponse({"status": "error", "message": "El reporte expiró. Solicítalo nuevamente."}, status=HTTPStatus.GONE)
+
+        if job.status != ReportJob.STATUS_COMPLETED:
+            return JsonResponse({"status": "error", "message": f"El reporte no está disponible (estado: {job.get_status_display()})."}, status=HTTPStatus.CONFLICT)
+
+        content = ReportJob.objects.filter(pk=job.id).values_list('content', flat=True).first()
+        if not content:
+            return JsonResponse({"status": "error", "message": "El archivo del reporte ya no existe. Solicítalo nuevamente."}, status=HTTPStatus.GONE)
+
+        response = HttpResponse(bytes(content), content_type='application/pdf')
+        response['Content-Disposition'] = content_disposition_header(True, get_report_filename(job.report_type, job.incident_id))
+        return response
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.outbox import process_email_outbox
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes de la bandeja de salida (email_outbox), con reintentos y espera exponencial."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Se mantiene en ejecución procesando la cola continuamente.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Segundos de espera cuando la cola está vacía (solo con --loop).")
+        parser.add_argument('--batch-size', type=int, default=50, help="Cantidad máxima de correos por lote.")
+        parser.add_argument('--max-attempts', type=int, default=5, help="Intentos antes de marcar un correo como fallido.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            result = process_email_outbox(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+
+            if any(result.values()):
+                self.stdout.write(
+                    f"Enviados: {result['sent']} | Reintentos programados: {result['retried']} | Fallidos: {result['failed']}"
+                )
+
+            if not options['loop']:
+                break
+
+            # Si el lote vino lleno probablemente quedan más correos: no se espera.
+            if sum(result.values()) < options['batch_size']:
+                time.sleep(options['interval'])
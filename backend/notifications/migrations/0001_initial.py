@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient_email', models.EmailField(max_length=254, verbose_name='destinatario')),
+                ('subject', models.CharField(max_length=255, verbose_name='asunto')),
+                ('html_content', models.TextField(verbose_name='contenido HTML')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente de envío'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado del envío')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='próximo intento')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='fecha de envío')),
+            ],
+            options={
+                'verbose_name': 'Correo en cola',
+                'verbose_name_plural': 'Correos en cola',
+                'db_table': 'email_outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='inicio del envío en curso'),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pendiente', 'Pendiente de envío'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado del envío'),
+        ),
+    ]
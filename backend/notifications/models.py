@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+# Create your models here.
+
+class EmailOutbox(models.Model):
+
+    STATUS_PENDING = 'pendiente'
+    STATUS_SENDING = 'enviando'
+    STATUS_SENT = 'enviado'
+    STATUS_FAILED = 'fallido'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente de envío'),
+        (STATUS_SENDING, 'Enviando'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    recipient_email = models.EmailField(max_length=254, null=False, blank=False, verbose_name="destinatario")
+    subject = models.CharField(max_length=255, null=False, blank=False, verbose_name="asunto")
+    html_content = models.TextField(null=False, blank=False, verbose_name="contenido HTML")
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        null=False,
+        blank=False,
+        verbose_name="estado del envío"
+    )
+
+    attempts = models.PositiveIntegerField(default=0, verbose_name="intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="próximo intento")
+    last_error = models.TextField(null=True, blank=True, verbose_name="último error")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="inicio del envío en curso")
+    created_at = models.DateTimeField(auto_now_add=True, editable=False, verbose_name="fecha de creación")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="fecha de envío")
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient_email} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = "Correo en cola"
+        verbose_name_plural = "Correos en cola"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_pending_idx'),
+        ]
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from notifications.models import EmailOutbox
+from utilities.send_email import send_email_batch
+
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+# Un correo que sigue 'enviando' después de este tiempo quedó de un worker que murió.
+STALE_SENDING_MINUTES = 15
+
+
+def queue_email_notification(html_content: str, subject: str, recipient_email: str) -> EmailOutbox:
+    """
+    Registra un correo en la bandeja de salida en lugar de enviarlo por SMTP.
+    Se guarda dentro de la transacción actual: si la transacción se revierte, el correo desaparece.
+    El envío real lo hace el comando 'manage.py process_email_outbox'.
+    """
+    return EmailOutbox.objects.create(
+        html_content=html_content,
+        subject=subject,
+        recipient_email=recipient_email,
+    )
+
+
+def queue_email_notifications(messages: list) -> int:
+    """
+    Igual que queue_email_notification pero para muchos correos a la vez, con un solo INSERT
+    por lote. 'messages' es una lista de diccionarios con 'html_content', 'subject' y
+    'recipient_email'. Devuelve la cantidad de correos encolados.
+    """
+    emails = EmailOutbox.objects.bulk_create(
+        [
+            EmailOutbox(html_content=message['html_content'], subject=message['subject'], recipient_email=message['recipient_email'])
+            for message in messages
+        ],
+        batch_size=500
+    )
+    return len(emails)
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """
+    Espera exponencial entre reintentos: 1 min, 2 min, 4 min... con un máximo de 1 hora.
+    """
+    seconds = RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, RETRY_MAX_SECONDS))
+
+
+def requeue_stale_emails() -> int:
+    """
+    Devuelve a 'pendiente' los correos que un worker reclamó y nunca terminó de registrar
+    (por ejemplo porque el proceso murió a mitad del envío). Pueden enviarse dos veces,
+    pero no se pierden.
+    """
+    limit = timezone.now() - timedelta(minutes=STALE_SENDING_MINUTES)
+    return EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENDING, started_at__lt=limit).update(
+        status=EmailOutbox.STATUS_PENDING, started_at=None
+    )
+
+
+def claim_pending_emails(batch_size: int) -> list:
+    """
+    Marca como 'enviando' hasta 'batch_size' correos pendientes cuyo próximo intento ya
+    venció y los devuelve. Los registros se bloquean (SELECT ... FOR UPDATE, con SKIP LOCKED
+    si el motor lo soporta) solo durante esta transacción corta, para que varios workers
+    puedan trabajar en paralelo sin reclamar el mismo correo.
+    """
+    with transaction.atomic():
+        pending = EmailOutbox.objects.filter(
+            status=EmailOutbox.STATUS_PENDING,
+            next_attempt_at__lte=timezone.now()
+        ).order_by('next_attempt_at', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        elif connection.features.has_select_for_update:
+            pending = pending.select_for_update()
+
+        email_ids = list(pending.values_list('id', flat=True)[:batch_size])
+        if not email_ids:
+            return []
+        EmailOutbox.objects.filter(id__in=email_ids).update(status=EmailOutbox.STATUS_SENDING, started_at=timezone.now())
+        return list(EmailOutbox.objects.filter(id__in=email_ids).order_by('next_attempt_at', 'id'))
+
+
+def record_email_results(emails: list, errors: list, max_attempts: int) -> dict:
+    """
+    Guarda el resultado del envío de cada correo reclamado, en una transacción corta.
+    Devuelve la cantidad de correos enviados, reintentados y fallidos.
+    """
+    result = {"sent": 0, "retried": 0, "failed": 0}
+
+    with transaction.atomic():
+        for email, error in zip(emails, errors):
+            email.attempts += 1
+            email.started_at = None
+            if error:
+                email.last_error = error
+                if email.attempts >= max_attempts:
+                    email.status = EmailOutbox.STATUS_FAILED
+                    result["failed"] += 1
+                else:
+                    email.status = EmailOutbox.STATUS_PENDING
+                    email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+                    result["retried"] += 1
+            else:
+                email.status = EmailOutbox.STATUS_SENT
+                email.sent_at = timezone.now()
+                email.last_error = None
+                result["sent"] += 1
+
+            email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'started_at'])
+
+    return result
+
+
+def process_email_outbox(batch_size: int = 50, max_attempts: int = 5) -> dict:
+    """
+    Envía un lote de correos pendientes cuyo próximo intento ya venció, todos sobre
+    una misma sesión SMTP reutilizada del pool.
+    El lote se reclama en una transacción corta (estado 'enviando'), el envío SMTP se hace
+    fuera de toda transacción y sin bloqueos, y los resultados se guardan en otra
+    transacción corta. Los correos de un worker que murió se reencolan con
+    requeue_stale_emails.
+    Devuelve un diccionario con la cantidad de correos enviados, reintentados y fallidos.
+    """
+    requeue_stale_emails()
+
+    emails = claim_pending_emails(batch_size)
+    if not emails:
+        return {"sent": 0, "retried": 0, "failed": 0}
+
+    try:
+        errors = send_email_batch([
+            {'html_content': email.html_content, 'subject': email.subject, 'recipient_email': email.recipient_email}
+            for email in emails
+        ])
+    except Exception as e:
+        # Error de configuración SMTP: cuenta como intento fallido para todo el lote.
+        errors = [str(e)] * len(emails)
+
+    return record_email_results(emails, errors, max_attempts)
@@ -0,0 +1,112 @@
+import os
+import socket
+from datetime import timedelta
+from unittest import mock
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from django.test import TestCase
+from django.utils import timezone
+
+from notifications.models import EmailOutbox
+from notifications.outbox import STALE_SENDING_MINUTES, process_email_outbox, queue_email_notification
+from utilities.smtp_pool import smtp_pool
+
+
+class EmailOutboxProcessingTests(TestCase):
+
+    def queue_emails(self, count):
+        return [queue_email_notification(f"<p>{number}</p>", f"Asunto {number}", f"usuario{number}@example.com") for number in range(count)]
+
+    def test_batch_is_claimed_before_sending_and_recorded_after(self):
+        self.queue_emails(3)
+        statuses_during_send = []
+
+        def send(messages):
+            statuses_during_send.extend(EmailOutbox.objects.values_list('status', flat=True))
+            return [None, "rechazado", None]
+
+        with mock.patch('notifications.outbox.send_email_batch', side_effect=send):
+            result = process_email_outbox(batch_size=10)
+
+        self.assertEqual(statuses_during_send, [EmailOutbox.STATUS_SENDING] * 3)
+        self.assertEqual(result, {"sent": 2, "retried": 1, "failed": 0})
+        retried = EmailOutbox.objects.get(status=EmailOutbox.STATUS_PENDING)
+        self.assertEqual((retried.attempts, retried.last_error, retried.started_at), (1, "rechazado", None))
+        self.assertGreater(retried.next_attempt_at, timezone.now())
+
+    def test_claimed_emails_are_not_sent_again_until_stale(self):
+        email = self.queue_emails(1)[0]
+        EmailOutbox.objects.filter(id=email.id).update(status=EmailOutbox.STATUS_SENDING, started_at=timezone.now())
+
+        with mock.patch('notifications.outbox.send_email_batch', return_value=[None]) as send:
+            process_email_outbox()
+            self.assertFalse(send.called)
+
+            EmailOutbox.objects.filter(id=email.id).update(started_at=timezone.now() - timedelta(minutes=STALE_SENDING_MINUTES + 1))
+            result = process_email_outbox()
+
+        self.assertEqual(result["sent"], 1)
+        self.assertEqual(EmailOutbox.objects.get(id=email.id).status, EmailOutbox.STATUS_SENT)
+
+
+class RecordingSMTPHandler:
+    """
+    Handler de aiosmtpd que guarda cada mensaje recibido junto con el puerto de origen
+    de la conexión, para saber cuántas conexiones se usaron.
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer[1], envelope.rcpt_tos[0]))
+        return '250 OK'
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class EmailOutboxSMTPSessionTests(TestCase):
+
+    def setUp(self):
+        self.handler = RecordingSMTPHandler()
+        port = get_free_port()
+        controller = Controller(
+            self.handler,
+            hostname='127.0.0.1',
+            port=port,
+            authenticator=lambda server, session, envelope, mechanism, auth_data: AuthResult(success=True),
+            auth_require_tls=False
+        )
+        controller.start()
+        self.addCleanup(controller.stop)
+
+        smtp_environ = {
+            'SMTP_SERVER': '127.0.0.1',
+            'SMTP_PORT': str(port),
+            'SMTP_USER': 'worker',
+            'SMTP_PASSWORD': 'secreto',
+            'SMTP_BY': 'notificaciones@example.com',
+            'SMTP_USE_TLS': 'False',
+        }
+        patcher = mock.patch.dict(os.environ, smtp_environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        smtp_pool.close_all()
+        self.addCleanup(smtp_pool.close_all)
+
+    def test_batch_is_sent_over_a_single_connection(self):
+        recipients = [f"usuario{number}@example.com" for number in range(5)]
+        for recipient in recipients:
+            queue_email_notification("<p>Hola</p>", "Aviso", recipient)
+
+        result = process_email_outbox(batch_size=10)
+
+        self.assertEqual(result, {"sent": 5, "retried": 0, "failed": 0})
+        self.assertEqual([recipient for _, recipient in self.handler.messages], recipients)
+        self.assertEqual(len({peer_port for peer_port, _ in self.handler.messages}), 1)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 5)
@@ -0,0 +1,260 @@
+import base64
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from notifications.outbox import queue_email_notifications
+from user_control.validators import validate_password_complexity, validate_name_format
+from utilities.user_welcome_email import generate_user_welcome_email_html
+
+
+USER_IMPORT_FIELDS = ['first_name', 'last_name', 'username', 'email', 'password']
+
+IMPORT_FORMAT_CSV = 'csv'
+IMPORT_FORMAT_JSON = 'json'
+IMPORT_FORMATS = [IMPORT_FORMAT_CSV, IMPORT_FORMAT_JSON]
+
+
+class InvalidUserImportError(ValueError):
+    pass
+
+
+def get_import_password_cipher() -> Fernet:
+    """
+    Cifrado (Fernet: AES-128-CBC + HMAC) de las contraseñas de una importación mientras esperan
+    al worker. La clave se deriva de SECRET_KEY: si SECRET_KEY cambia, las importaciones
+    pendientes ya no se pueden descifrar y fallan.
+    """
+    key = salted_hmac('user_control.bulk_import', 'import-password-key', algorithm='sha256').digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def encrypt_import_password(password: str) -> str:
+    return get_import_password_cipher().encrypt(password.encode('utf-8')).decode('ascii')
+
+
+def decrypt_import_passwords(encrypted_passwords: list) -> list:
+    """
+    Lanza InvalidUserImportError si alguna contraseña no se puede descifrar.
+    """
+    cipher = get_import_password_cipher()
+    try:
+        return [cipher.decrypt(encrypted.encode('ascii')).decode('utf-8') for encrypted in encrypted_passwords]
+    except InvalidToken:
+        raise InvalidUserImportError("No se pudieron descifrar las contraseñas de la importación (¿cambió SECRET_KEY?).")
+
+
+def parse_user_import_file(content: bytes, file_format: str) -> list:
+    """
+    Lee el archivo de importación: CSV con encabezado o JSON con una lista de objetos
+    (o {"users": [...]}), ambos en UTF-8 y con los campos de USER_IMPORT_FIELDS.
+    Devuelve la lista de filas (diccionarios) sin validar.
+    Lanza InvalidUserImportError si el archivo no se puede leer.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise InvalidUserImportError(f"Formato de archivo no válido. Opciones válidas: {', '.join(IMPORT_FORMATS)}.")
+
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise InvalidUserImportError("El archivo debe estar codificado en UTF-8.")
+
+    if file_format == IMPORT_FORMAT_CSV:
+        reader = csv.DictReader(io.StringIO(text))
+        missing_columns = [field for field in USER_IMPORT_FIELDS if field not in (reader.fieldnames or [])]
+        if missing_columns:
+            raise InvalidUserImportError(f"Faltan columnas en el encabezado del CSV: {', '.join(missing_columns)}.")
+        try:
+            rows = list(reader)
+        except csv.Error as e:
+            raise InvalidUserImportError(f"El archivo CSV no es válido: {e}")
+    else:
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise InvalidUserImportError(f"El archivo JSON no es válido: {e}")
+        rows = data.get('users') if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise InvalidUserImportError("El JSON debe ser una lista de objetos (o un objeto con la lista en 'users').")
+
+    if not rows:
+        raise InvalidUserImportError("El archivo no contiene usuarios.")
+    if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+        raise InvalidUserImportError(f"Se pueden importar como máximo {settings.USER_IMPORT_MAX_ROWS} usuarios por archivo.")
+    return rows
+
+
+def validate_user_import_row(row: dict):
+    """
+    Valida una fila con las mismas reglas que UserRC.post. Devuelve (datos, errores).
+    """
+    errors = []
+    values = {}
+    for field in USER_IMPORT_FIELDS:
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f"El campo '{field}' es requerido.")
+            continue
+        values[field] = value if field == 'password' else value.strip()
+        max_length = User._meta.get_field(field).max_length
+        if field != 'password' and max_length and len(values[field]) > max_length:
+            errors.append(f"El campo '{field}' no puede tener más de {max_length} caracteres.")
+
+    if errors:
+        return values, errors
+
+    values['email'] = values['email'].lower()
+
+    for field, field_name in (('first_name', 'nombre'), ('last_name', 'apellido')):
+        name_error = validate_name_format(values[field], field_name)
+        if name_error:
+            errors.append(name_error)
+
+    try:
+        validate_email(values['email'])
+    except ValidationError:
+        errors.append("El formato del correo electrónico no es válido.")
+
+    password_error = validate_password_complexity(values['password'])
+    if password_error:
+        errors.append(password_error)
+
+    return values, errors
+
+
+def validate_user_import_rows(rows: list):
+    """
+    Valida todas las filas antes de crear nada: formato de cada campo, usuarios o correos
+    repetidos dentro del archivo y, en una sola consulta, los que ya existen.
+    Devuelve (usuarios válidos, errores); cada error es {"row", "username", "errors"} con
+    'row' numerado desde 1. La contraseña de cada usuario válido se devuelve cifrada
+    (encrypt_import_password): solo create_imported_users la descifra.
+    """
+    users = []
+    errors_by_row = {}
+    rows_by_username = {}
+    rows_by_email = {}
+
+    for row_number, row in enumerate(rows, start=1):
+        values, row_errors = validate_user_import_row(row)
+
+        if not row_errors:
+            if values['username'] in rows_by_username:
+                row_errors.append(f"El nombre de usuario '{values['username']}' está repetido en la fila {rows_by_username[values['username']]}.")
+            if values['email'] in rows_by_email:
+                row_errors.append(f"El correo electrónico '{values['email']}' está repetido en la fila {rows_by_email[values['email']]}.")
+            rows_by_username.setdefault(values['username'], row_number)
+            rows_by_email.setdefault(values['email'], row_number)
+
+        if row_errors:
+            errors_by_row[row_number] = {"row": row_number, "username": values.get('username'), "errors": row_errors}
+        else:
+            users.append({"row": row_number, **values})
+
+    if users:
+        existing = User.objects.filter(
+            Q(username__in=[user['username'] for user in users]) | Q(email__in=[user['email'] for user in users])
+        ).values_list('username', 'email')
+        existing_usernames = {username for username, _ in existing}
+        existing_emails = {email for _, email in existing}
+
+        for user in users:
+            conflict_errors = []
+            if user['username'] in existing_usernames:
+                conflict_errors.append(f"El nombre de usuario '{user['username']}' ya está en uso.")
+            if user['email'] in existing_emails:
+                conflict_errors.append(f"El correo electrónico '{user['email']}' ya está registrado.")
+            if conflict_errors:
+                errors_by_row[user['row']] = {"row": user['row'], "username": user['username'], "errors": conflict_errors}
+
+        users = [user for user in users if user['row'] not in errors_by_row]
+
+    for user in users:
+        user['password'] = encrypt_import_password(user['password'])
+
+    return users, [errors_by_row[row_number] for row_number in sorted(errors_by_row)]
+
+
+def init_password_hash_worker():
+    """
+    Inicializador de cada proceso del pool de hashing: deja Django listo (PASSWORD_HASHERS).
+    """
+    import django
+    django.setup()
+
+
+def create_password_hash_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos para calcular los hashes de contraseñas. Solo lo crean los comandos
+    (process_user_import_jobs e import_users), nunca el proceso web.
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_password_hash_worker)
+
+
+def hash_passwords(passwords: list, executor: ProcessPoolExecutor = None) -> list:
+    """
+    Hashes (PBKDF2, el hasher por defecto) de las contraseñas, en el mismo orden.
+    El hashing usa CPU a propósito (y no libera el GIL), por eso se reparte en el pool de
+    procesos 'executor'. Sin pool o con pocas contraseñas se calcula aquí mismo.
+    Si un proceso del pool muere se propaga BrokenProcessPool para que quien creó el pool lo reemplace.
+    """
+    workers = max(settings.USER_IMPORT_HASH_WORKERS, 1)
+    if executor is None or len(passwords) < workers * 2:
+        return [make_password(password) for password in passwords]
+
+    return list(executor.map(make_password, passwords, chunksize=max(len(passwords) // (workers * 4), 1)))
+
+
+def create_imported_users(users: list, send_welcome_email: bool = True, executor: ProcessPoolExecutor = None) -> int:
+    """
+    Crea los usuarios ya validados (validate_user_import_rows) con bulk_create y, si se
+    pide, encola en un solo lote los correos de bienvenida. Todo en una transacción: si un
+    usuario choca con otro creado mientras tanto (IntegrityError), no se crea ninguno.
+    Las contraseñas llegan cifradas y se descifran solo aquí; sus hashes se calculan en
+    'executor' (ver hash_passwords).
+    Devuelve la cantidad de usuarios creados.
+    Lanza InvalidUserImportError si las contraseñas no se pueden descifrar.
+    """
+    password_hashes = hash_passwords(decrypt_import_passwords([user['password'] for user in users]), executor)
+    date_joined = timezone.now()
+
+    user_objects = [
+        User(
+            username=user['username'],
+            email=user['email'],
+            first_name=user['first_name'],
+            last_name=user['last_name'],
+            password=password_hash,
+            is_staff=False,
+            is_active=True,
+            date_joined=date_joined
+        )
+        for user, password_hash in zip(users, password_hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(user_objects, batch_size=500)
+
+        if send_welcome_email:
+            queue_email_notifications([
+                {
+                    'html_content': generate_user_welcome_email_html(user.first_name, user.username),
+                    'subject': "Bienvenido: tu cuenta ha sido creada",
+                    'recipient_email': user.email
+                }
+                for user in user_objects
+            ])
+
+    return len(user_objects)
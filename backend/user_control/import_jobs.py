@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction, IntegrityError
+from django.utils import timezone
+
+from user_control.bulk_import import create_imported_users
+from user_control.models import UserImportJob
+
+
+# Un trabajo 'procesando' más antiguo que esto se considera abandonado (worker caído) y vuelve a la cola.
+STALE_JOB_MINUTES = 30
+
+
+def serialize_user_import_job(job: UserImportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "total": job.total,
+        "created": job.created,
+        "send_welcome_email": job.send_welcome_email,
+        "error": job.error,
+        "created_at": job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        "finished_at": job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None,
+    }
+
+
+def claim_user_import_jobs(limit: int) -> list:
+    """
+    Marca como 'procesando' hasta 'limit' trabajos pendientes y devuelve sus IDs.
+    Los registros se bloquean con SELECT ... FOR UPDATE (SKIP LOCKED si el motor lo
+    soporta) para que varios workers no tomen el mismo trabajo.
+    """
+    with transaction.atomic():
+        pending = UserImportJob.objects.filter(status=UserImportJob.STATUS_PENDING).order_by('created_at', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        elif connection.features.has_select_for_update:
+            pending = pending.select_for_update()
+
+        job_ids = list(pending.values_list('id', flat=True)[:limit])
+        if job_ids:
+            UserImportJob.objects.filter(id__in=job_ids).update(status=UserImportJob.STATUS_PROCESSING, started_at=timezone.now())
+
+    return job_ids
+
+
+def finish_user_import_job(job_id: int, created: int = None, error: str = None):
+    """
+    Registra el resultado y borra las filas guardadas (con las contraseñas cifradas).
+    """
+    now = timezone.now()
+    if error:
+        UserImportJob.objects.filter(pk=job_id).update(status=UserImportJob.STATUS_FAILED, users=None, error=error, finished_at=now)
+    else:
+        UserImportJob.objects.filter(pk=job_id).update(
+            status=UserImportJob.STATUS_COMPLETED, users=None, created=created, error=None, finished_at=now
+        )
+
+
+def requeue_stale_user_import_jobs() -> int:
+    """
+    Devuelve a la cola los trabajos que quedaron 'procesando' porque su worker se detuvo.
+    """
+    limit = timezone.now() - timedelta(minutes=STALE_JOB_MINUTES)
+    return UserImportJob.objects.filter(status=UserImportJob.STATUS_PROCESSING, started_at__lt=limit).update(
+        status=UserImportJob.STATUS_PENDING, started_at=None
+    )
+
+
+def expire_pending_user_import_jobs() -> int:
+    """
+    Marca como fallidos, y vacía, los trabajos que llevan más de USER_IMPORT_PENDING_MAX_HOURS
+    esperando al worker, para que las contraseñas no queden guardadas indefinidamente.
+    Devuelve la cantidad de trabajos vencidos.
+    """
+    limit = timezone.now() - timedelta(hours=settings.USER_IMPORT_PENDING_MAX_HOURS)
+    return UserImportJob.objects.filter(status=UserImportJob.STATUS_PENDING, created_at__lt=limit).update(
+        status=UserImportJob.STATUS_FAILED,
+        users=None,
+        error=f"La importación no se procesó en {settings.USER_IMPORT_PENDING_MAX_HOURS} horas y se descartó; vuelva a importar el archivo.",
+        finished_at=timezone.now(),
+    )
+
+
+def process_user_import_jobs(executor: ProcessPoolExecutor, limit: int = 1) -> dict:
+    """
+    Toma hasta 'limit' importaciones pendientes y las procesa una por una en este proceso;
+    los hashes de las contraseñas de cada una se reparten en el pool 'executor'.
+    Devuelve un diccionario con la cantidad de importaciones completadas y fallidas.
+    Si un proceso del pool muere (p. ej. por falta de memoria) la importación vuelve a la cola
+    y se relanza BrokenProcessPool, para que quien llama cree un pool nuevo.
+    """
+    result = {"completed": 0, "failed": 0}
+
+    for job_id in claim_user_import_jobs(limit):
+        job = UserImportJob.objects.get(pk=job_id)
+
+        # Los procesos hijos pueden crearse con fork: no deben heredar sockets abiertos a la base de datos.
+        connections.close_all()
+        try:
+            created = create_imported_users(job.users or [], send_welcome_email=job.send_welcome_email, executor=executor)
+        except BrokenProcessPool:
+            UserImportJob.objects.filter(pk=job_id).update(status=UserImportJob.STATUS_PENDING, started_at=None)
+            raise
+        except IntegrityError:
+            error = "Un nombre de usuario o correo del archivo fue registrado antes de que se procesara la importación. No se creó ningún usuario; vuelva a importar el archivo."
+        except Exception as e:
+            error = f"Error al crear los usuarios ({type(e).__name__}): {e}"
+        else:
+            finish_user_import_job(job_id, created=created)
+            result["completed"] += 1
+            continue
+
+        finish_user_import_job(job_id, error=error)
+        result["failed"] += 1
+
+    return result
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import IntegrityError, connections
+
+from user_control.bulk_import import (
+    IMPORT_FORMATS, parse_user_import_file, validate_user_import_rows, create_imported_users, create_password_hash_pool,
+    InvalidUserImportError,
+)
+
+
+class Command(BaseCommand):
+    help = "Crea usuarios a partir de un archivo CSV (con encabezado) o JSON con los campos first_name, last_name, username, email y password. Si alguna fila tiene errores no se crea ningún usuario."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo .csv o .json (UTF-8).")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Formato del archivo (por defecto, según la extensión).")
+        parser.add_argument('--no-welcome-email', action='store_true', help="No encolar los correos de bienvenida.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo valida el archivo, sin crear usuarios.")
+        parser.add_argument('--workers', type=int, default=settings.USER_IMPORT_HASH_WORKERS, help="Cantidad de procesos que calculan los hashes de las contraseñas (0 o 1 = sin pool).")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lower().lstrip('.')
+
+        try:
+            with open(options['path'], 'rb') as import_file:
+                rows = parse_user_import_file(import_file.read(), file_format)
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except InvalidUserImportError as e:
+            raise CommandError(str(e))
+
+        users, errors = validate_user_import_rows(rows)
+        if errors:
+            for error in errors:
+                self.stderr.write(f"Fila {error['row']} ({error['username'] or 'sin usuario'}): {' '.join(error['errors'])}")
+            raise CommandError(f"{len(errors)} de {len(rows)} filas tienen errores. No se creó ningún usuario.")
+
+        if options['dry_run']:
+            self.stdout.write(f"Validación correcta: {len(users)} usuarios listos para importar.")
+            return
+
+        executor = None
+        if options['workers'] > 1:
+            executor = create_password_hash_pool(options['workers'])
+            # Los procesos hijos pueden crearse con fork: no deben heredar sockets abiertos a la base de datos.
+            connections.close_all()
+        try:
+            created = create_imported_users(users, send_welcome_email=not options['no_welcome_email'], executor=executor)
+        except IntegrityError as e:
+            raise CommandError(f"Un nombre de usuario o correo fue registrado mientras se importaba. No se creó ningún usuario: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        self.stdout.write(f"Usuarios creados: {created}")
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from user_control.bulk_import import create_password_hash_pool
+from user_control.import_jobs import expire_pending_user_import_jobs, process_user_import_jobs, requeue_stale_user_import_jobs
+
+
+class Command(BaseCommand):
+    help = "Crea los usuarios de las importaciones masivas encoladas (user_import_job), calculando los hashes de las contraseñas en un pool de procesos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Se mantiene en ejecución procesando la cola continuamente.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía (solo con --loop).")
+        parser.add_argument('--workers', type=int, default=settings.USER_IMPORT_HASH_WORKERS, help="Cantidad de procesos que calculan los hashes de las contraseñas.")
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        executor = create_password_hash_pool(workers)
+
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_user_import_jobs()
+                expired = expire_pending_user_import_jobs()
+                if expired:
+                    self.stderr.write(f"Importaciones vencidas sin procesar: {expired}")
+
+                try:
+                    result = process_user_import_jobs(executor)
+                except BrokenProcessPool as e:
+                    self.stderr.write(f"{e} Se crea un pool nuevo.")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = create_password_hash_pool(workers)
+                    result = {"completed": 0, "failed": 0}
+
+                if any(result.values()):
+                    self.stdout.write(f"Completadas: {result['completed']} | Fallidas: {result['failed']}")
+
+                if not options['loop']:
+                    break
+
+                # Si se procesó una importación probablemente quedan más: no se espera.
+                if not any(result.values()):
+                    time.sleep(options['interval'])
+        finally:
+            executor.shutdown(wait=True)
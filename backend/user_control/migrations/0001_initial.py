@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado de la importación')),
+                ('users', models.JSONField(blank=True, null=True, verbose_name='usuarios a crear')),
+                ('total', models.IntegerField(verbose_name='usuarios en el archivo')),
+                ('created', models.IntegerField(blank=True, null=True, verbose_name='usuarios creados')),
+                ('send_welcome_email', models.BooleanField(default=True, verbose_name='enviar correo de bienvenida')),
+                ('requested_by', models.IntegerField(verbose_name='solicitado por')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de solicitud')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='inicio del procesamiento')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='fin del procesamiento')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de importación de usuarios',
+                'verbose_name_plural': 'Trabajos de importación de usuarios',
+                'db_table': 'user_import_job',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='user_import_job_status_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,54 @@
 from django.db import models
 
-# Create your models here.
+
+class UserImportJob(models.Model):
+    """
+    Importación masiva de usuarios ya validada, pendiente de crear.
+    La vista valida el archivo y encola el trabajo; el comando 'manage.py process_user_import_jobs'
+    calcula los hashes de las contraseñas en un pool de procesos y crea los usuarios.
+    'users' guarda las filas validadas (con la contraseña cifrada) solo hasta que el trabajo
+    termina: al completarse, fallar o vencer sin procesarse se vacía.
+    """
+
+    STATUS_PENDING = 'pendiente'
+    STATUS_PROCESSING = 'procesando'
+    STATUS_COMPLETED = 'completado'
+    STATUS_FAILED = 'fallido'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_PROCESSING, 'En proceso'),
+        (STATUS_COMPLETED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        null=False,
+        blank=False,
+        verbose_name="estado de la importación"
+    )
+
+    users = models.JSONField(null=True, blank=True, verbose_name="usuarios a crear")
+    total = models.IntegerField(null=False, blank=False, verbose_name="usuarios en el archivo")
+    created = models.IntegerField(null=True, blank=True, verbose_name="usuarios creados")
+    send_welcome_email = models.BooleanField(default=True, verbose_name="enviar correo de bienvenida")
+
+    requested_by = models.IntegerField(null=False, blank=False, verbose_name="solicitado por")
+    error = models.TextField(null=True, blank=True, verbose_name="error")
+    created_at = models.DateTimeField(auto_now_add=True, editable=False, verbose_name="fecha de solicitud")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="inicio del procesamiento")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="fin del procesamiento")
+
+    def __str__(self):
+        return f"Importación de usuarios #{self.id} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'user_import_job'
+        verbose_name = "Trabajo de importación de usuarios"
+        verbose_name_plural = "Trabajos de importación de usuarios"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='user_import_job_status_idx'),
+        ]
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from jose import JWTError, jwt
+
+from notifications.models import EmailOutbox
+from user_control.bulk_import import create_password_hash_pool
+from user_control.import_jobs import expire_pending_user_import_jobs, process_user_import_jobs
+from user_control.models import UserImportJob
+from utilities import user_cache
+from utilities.token_cache import clear_token_cache, decode_token, get_token_cache_stats
+from utilities.user_cache import clear_user_cache, get_cached_user
+
+
+def get_token(user_id, expires_in: int = 3600) -> str:
+    return jwt.encode({"id": user_id, "exp": int(time.time()) + expires_in}, settings.SECRET_KEY, algorithm='HS512')
+
+
+def get_auth_client(user) -> Client:
+    return Client(HTTP_AUTHORIZATION=f"Bearer {get_token(user.id)}")
+
+
+def get_import_rows(count: int, prefix: str = 'usuario') -> list:
+    return [
+        {'first_name': 'Ana', 'last_name': 'Pérez', 'username': f"{prefix}{number}", 'email': f"{prefix}{number}@example.com", 'password': 'Passw0rd!'}
+        for number in range(count)
+    ]
+
+
+class UserImportJobTests(TransactionTestCase):
+    # TransactionTestCase: el worker cierra las conexiones antes de usar el pool de procesos.
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        self.client = get_auth_client(self.admin)
+
+    def upload(self, rows):
+        import_file = SimpleUploadedFile('usuarios.json', json.dumps(rows).encode())
+        return self.client.post('/api/v1/user-control/import', {'file': import_file})
+
+    def test_import_is_queued_and_created_by_the_worker(self):
+        response = self.upload(get_import_rows(12))
+
+        self.assertEqual(response.status_code, 202, response.content)
+        job_id = response.json()['data']['id']
+        self.assertEqual(response.json()['data']['status'], UserImportJob.STATUS_PENDING)
+        self.assertFalse(User.objects.filter(username__startswith='usuario').exists())
+
+        executor = create_password_hash_pool(2)
+        try:
+            with self.settings(USER_IMPORT_HASH_WORKERS=2):
+                result = process_user_import_jobs(executor)
+        finally:
+            executor.shutdown(wait=True)
+
+        self.assertEqual(result, {"completed": 1, "failed": 0})
+        self.assertEqual(User.objects.filter(username__startswith='usuario').count(), 12)
+        self.assertTrue(User.objects.get(username='usuario3').check_password('Passw0rd!'))
+        self.assertEqual(EmailOutbox.objects.count(), 12)
+        self.assertIsNone(UserImportJob.objects.get(pk=job_id).users)
+
+        data = self.client.get(f"/api/v1/user-control/import/{job_id}").json()['data']
+        self.assertEqual((data['status'], data['created'], data['total']), (UserImportJob.STATUS_COMPLETED, 12, 12))
+
+    def test_job_fails_without_creating_users_if_a_username_was_taken(self):
+        response = self.upload(get_import_rows(3))
+        job_id = response.json()['data']['id']
+        User.objects.create_user('usuario1', 'otro@example.com', 'Passw0rd!')
+
+        result = process_user_import_jobs(executor=None)
+
+        self.assertEqual(result, {"completed": 0, "failed": 1})
+        job = UserImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, UserImportJob.STATUS_FAILED)
+        self.assertIsNone(job.users)
+        self.assertEqual(User.objects.filter(username__startswith='usuario').count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 0)
+
+    def test_queued_passwords_are_not_stored_in_plaintext(self):
+        job_id = self.upload(get_import_rows(3)).json()['data']['id']
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT users FROM user_import_job WHERE id = %s", [job_id])
+            raw_users = cursor.fetchone()[0]
+
+        self.assertIn('usuario1', raw_users)
+        self.assertNotIn('Passw0rd!', raw_users)
+
+    def test_old_pending_jobs_are_failed_and_cleared(self):
+        old_id = self.upload(get_import_rows(2, prefix='viejo')).json()['data']['id']
+        UserImportJob.objects.filter(pk=old_id).update(created_at=timezone.now() - timedelta(hours=25))
+        new_id = self.upload(get_import_rows(2, prefix='nuevo')).json()['data']['id']
+
+        with self.settings(USER_IMPORT_PENDING_MAX_HOURS=24):
+            self.assertEqual(expire_pending_user_import_jobs(), 0)
+            UserImportJob.objects.filter(pk=new_id).update(created_at=timezone.now() - timedelta(hours=25))
+            self.assertEqual(expire_pending_user_import_jobs(), 1)
+
+        for job in UserImportJob.objects.all():
+            self.assertEqual(job.status, UserImportJob.STATUS_FAILED)
+            self.assertIsNone(job.users)
+        self.assertEqual(process_user_import_jobs(executor=None), {"completed": 0, "failed": 0})
+        self.assertFalse(User.objects.exclude(pk=self.admin.pk).exists())
+
+
+@override_settings(AUTH_USER_CACHE_TTL=30)
+class UserCacheTests(TestCase):
+
+    def setUp(self):
+        clear_user_cache()
+        clear_token_cache()
+        self.addCleanup(clear_user_cache)
+        self.addCleanup(clear_token_cache)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        self.user = User.objects.create_user('lector', 'lector@example.com', 'Passw0rd!')
+
+    def test_cached_user_is_reloaded_after_the_ttl(self):
+        now = time.monotonic()
+        with mock.patch('utilities.user_cache.time.monotonic', return_value=now):
+            get_cached_user(self.user.id)
+        User.objects.filter(id=self.user.id).update(first_name='Nuevo')
+
+        with mock.patch('utilities.user_cache.time.monotonic', return_value=now + 29):
+            with self.assertNumQueries(0):
+                self.assertEqual(get_cached_user(self.user.id).first_name, '')
+        with mock.patch('utilities.user_cache.time.monotonic', return_value=now + 31):
+            self.assertEqual(get_cached_user(self.user.id).first_name, 'Nuevo')
+
+    def test_expired_entries_are_dropped(self):
+        now = time.monotonic()
+        with mock.patch('utilities.user_cache.time.monotonic', return_value=now):
+            get_cached_user(self.user.id)
+        with mock.patch('utilities.user_cache.time.monotonic', return_value=now + 31):
+            get_cached_user(self.admin.id)
+
+        self.assertEqual(list(user_cache._cached_users), [self.admin.id])
+
+    def test_deactivation_locks_the_user_out_on_commit(self):
+        user_client = get_auth_client(self.user)
+        self.assertEqual(user_client.get("/api/v1/incident").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = get_auth_client(self.admin).put(f"/api/v1/user-control/{self.user.id}", {'is_active': False}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(user_client.get("/api/v1/incident").status_code, 401)
+
+    def test_deleted_user_is_rejected_on_commit(self):
+        user_client = get_auth_client(self.user)
+        self.assertEqual(user_client.get("/api/v1/incident").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = get_auth_client(self.admin).delete(f"/api/v1/user-control/{self.user.id}")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(user_client.get("/api/v1/incident").status_code, 401)
+
+
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        clear_token_cache()
+        clear_user_cache()
+        self.addCleanup(clear_token_cache)
+        self.addCleanup(clear_user_cache)
+
+    @override_settings(JWT_CACHE_MAX_SIZE=2)
+    def test_least_recently_used_token_is_evicted(self):
+        first, second, third = get_token(1), get_token(2), get_token(3)
+        decode_token(first)
+        decode_token(second)
+        decode_token(first)
+        decode_token(third)
+
+        self.assertEqual(get_token_cache_stats()["evictions"], 1)
+        decode_token(first)
+        decode_token(second)
+        stats = get_token_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 4, 2))
+
+    def test_cached_token_is_rejected_after_exp(self):
+        user = User.objects.create_user('lector', 'lector@example.com', 'Passw0rd!')
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {get_token(user.id, expires_in=60)}")
+        self.assertEqual(client.get("/api/v1/incident").status_code, 200)
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(client.get("/api/v1/incident").status_code, 401)
+        self.assertEqual(get_token_cache_stats()["size"], 0)
+
+    def test_invalid_tokens_are_not_cached(self):
+        token = jwt.encode({"id": 1, "exp": int(time.time()) + 3600}, 'otra-clave', algorithm='HS512')
+        for _ in range(2):
+            with self.assertRaises(JWTError):
+                decode_token(token)
+
+        stats = get_token_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (0, 2, 0))
+
+    def test_stats_endpoint_is_only_for_superusers(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'Passw0rd!')
+        user = User.objects.create_user('lector', 'lector@example.com', 'Passw0rd!')
+
+        self.assertEqual(get_auth_client(user).get("/api/v1/user-control/token-cache-stats").status_code, 403)
+        admin_client = get_auth_client(admin)
+        admin_client.get("/api/v1/user-control/token-cache-stats")
+        response = admin_client.get("/api/v1/user-control/token-cache-stats")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["data"]["hits"], 1)
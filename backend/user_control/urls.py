@@ -4,5 +4,8 @@ from .views import *
 urlpatterns = [
     path('user-control', UserRC.as_view()),
     path('user-control/<int:id>', UserRUD.as_view()),
+    path('user-control/import', UserImport.as_view()),
+    path('user-control/import/<int:id>', UserImportJobR.as_view()),
     path('user-control/login', Login.as_view()),
+    path('user-control/token-cache-stats', TokenCacheStats.as_view()),
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+import re
+
+
+def validate_password_complexity(password):
+    if len(password) < 8:
+        return "La contraseña debe tener al menos 8 caracteres."
+    if not re.search(r"[A-Z]", password):
+        return "La contraseña debe contener al menos una letra mayúscula."
+    if not re.search(r"[a-z]", password):
+        return "La contraseña debe contener al menos una letra minúscula."
+    if not re.search(r"\d", password):
+        return "La contraseña debe contener al menos un número."
+    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+         return "La contraseña debe contener al menos un carácter especial."
+    return None
+
+
+def validate_name_format(field, field_name):
+    if not re.match(r"^[a-zA-ZÀ-ÿ\s'-]+$", field):
+        return f"El campo '{field_name}' contiene caracteres no válidos. Solo se permiten letras y espacios."
+    return None
@@ -8,7 +8,6 @@ from django.db.models import Q
 from django.utils import timezone
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-import re
 
 # JWT
 from jose import jwt
@@ -18,14 +17,21 @@ import time
 import os
 
 from utilities.decorators import authenticate_user
+from utilities.user_cache import invalidate_cached_user
+from utilities.token_cache import get_token_cache_stats
 from user_control.serializers import UserSerializer
+from user_control.validators import validate_password_complexity, validate_name_format
+from user_control.bulk_import import USER_IMPORT_FIELDS, parse_user_import_file, validate_user_import_rows, InvalidUserImportError
+from user_control.import_jobs import expire_pending_user_import_jobs, serialize_user_import_job
+from user_control.models import UserImportJob
 from utilities.user_put_email import generate_user_update_notification_html
-from utilities.send_email import send_email_notification
+from notifications.outbox import queue_email_notification
 
 # imports para drf-yasg
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework import permissions
+from rest_framework.parsers import MultiPartParser, FormParser
 
 
 bearer_security_definition = [{'Bearer': []}]
@@ -55,25 +61,6 @@ def validate_required_fields(data, fields):
     return None
 
 
-def validate_password_complexity(password):
-    if len(password) < 8:
-        return "La contraseña debe tener al menos 8 caracteres."
-    if not re.search(r"[A-Z]", password):
-        return "La contraseña debe contener al menos una letra mayúscula."
-    if not re.search(r"[a-z]", password):
-        return "La contraseña debe contener al menos una letra minúscula."
-    if not re.search(r"\d", password):
-        return "La contraseña debe contener al menos un número."
-    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-         return "La contraseña debe contener al menos un carácter especial."
-    return None
-
-
-def validate_name_format(field, field_name):
-    if not re.match(r"^[a-zA-ZÀ-ÿ\s'-]+$", field):
-        return f"El campo '{field_name}' contiene caracteres no válidos. Solo se permiten letras y espacios."
-    return None
-
 user_object_schema = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     properties={
@@ -253,6 +240,189 @@ class UserRC(APIView):
             }, status=HTTPStatus.INTERNAL_SERVER_ERROR)
         
 
+user_import_job_object_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del trabajo de importación."),
+        'status': openapi.Schema(type=openapi.TYPE_STRING, enum=[s[0] for s in UserImportJob.STATUS_CHOICES]),
+        'status_display': openapi.Schema(type=openapi.TYPE_STRING),
+        'total': openapi.Schema(type=openapi.TYPE_INTEGER, description="Cantidad de usuarios del archivo."),
+        'created': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True, description="Cantidad de usuarios creados, cuando el trabajo está completado."),
+        'send_welcome_email': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+        'error': openapi.Schema(type=openapi.TYPE_STRING, nullable=True, description="Motivo del fallo, si el trabajo falló (en ese caso no se creó ningún usuario)."),
+        'created_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        'finished_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, nullable=True),
+    }
+)
+
+
+class UserImport(APIView):
+    #Importación masiva de usuarios (CSV o JSON).
+
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [MultiPartParser, FormParser]
+
+
+    @swagger_auto_schema(
+        operation_id="api_user_import",
+        operation_description=f"Crea muchos usuarios a partir de un archivo CSV (con encabezado) o JSON (lista de objetos), con los campos {', '.join(USER_IMPORT_FIELDS)}. Se validan todas las filas en la solicitud, con las mismas reglas que el registro individual: si alguna fila tiene errores no se crea ningún usuario y la respuesta detalla los errores por fila. Si el archivo es válido la importación se encola y un worker en segundo plano crea los usuarios (las contraseñas se procesan en paralelo y los usuarios se insertan por lotes); su estado se consulta en user-control/import/{id}. Requiere permiso 'user.add_user'.",
+        security=bearer_security_definition,
+        consumes=['multipart/form-data'],
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description="Archivo .csv o .json en UTF-8."),
+            openapi.Parameter('send_welcome_email', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN, required=False, description="Encolar un correo de bienvenida para cada usuario creado (por defecto true)."),
+            openapi.Parameter('dry_run', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN, required=False, description="Solo validar el archivo, sin crear usuarios (por defecto false)."),
+        ],
+        responses={
+            HTTPStatus.ACCEPTED: openapi.Response(
+                description="Archivo válido: importación encolada.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'data': user_import_job_object_schema
+                    }
+                )
+            ),
+            HTTPStatus.OK: openapi.Response(
+                description="Validación sin errores con 'dry_run' (no se creó ningún usuario).",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="info"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'valid': openapi.Schema(type=openapi.TYPE_INTEGER, description="Cantidad de usuarios que se crearían.")
+                    }
+                )
+            ),
+            HTTPStatus.BAD_REQUEST: openapi.Response(
+                description="Archivo faltante o ilegible, o filas con errores (ningún usuario creado).",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'errors': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'row': openapi.Schema(type=openapi.TYPE_INTEGER, description="Número de fila (desde 1, sin contar el encabezado)."),
+                                    'username': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                                    'errors': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            HTTPStatus.FORBIDDEN: openapi.Response(
+                description="Acceso denegado. Permiso 'user.add_user' requerido.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+            HTTPStatus.INTERNAL_SERVER_ERROR: openapi.Response(
+                description="Error interno del servidor.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+        },
+    )
+    @authenticate_user(required_permission='user.add_user')
+    def post(self, request):
+        import_file = request.FILES.get('file')
+        if not import_file:
+            return JsonResponse({"status": "error", "message": "El campo 'file' (archivo .csv o .json) es requerido."}, status=HTTPStatus.BAD_REQUEST)
+        if import_file.size > 5 * 1024 * 1024: # 5MB
+            return JsonResponse({"status": "error", "message": "El archivo excede el tamaño máximo (5MB)."}, status=HTTPStatus.BAD_REQUEST)
+
+        file_format = os.path.splitext(import_file.name)[1].lower().lstrip('.')
+        send_welcome_email = str(request.data.get('send_welcome_email', 'true')).lower() != 'false'
+        dry_run = str(request.data.get('dry_run', 'false')).lower() == 'true'
+
+        try:
+            rows = parse_user_import_file(import_file.read(), file_format)
+        except InvalidUserImportError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=HTTPStatus.BAD_REQUEST)
+
+        users, errors = validate_user_import_rows(rows)
+        if errors:
+            return JsonResponse({
+                "status": "error",
+                "message": f"{len(errors)} de {len(rows)} filas tienen errores. No se creó ningún usuario.",
+                "errors": errors
+            }, status=HTTPStatus.BAD_REQUEST)
+
+        if dry_run:
+            return JsonResponse({
+                "status": "info",
+                "message": f"Validación correcta: {len(users)} usuarios listos para importar. No se creó ningún usuario.",
+                "valid": len(users)
+            }, status=HTTPStatus.OK)
+
+        try:
+            # También aquí: si el worker está detenido, las importaciones viejas no quedan guardadas indefinidamente.
+            expire_pending_user_import_jobs()
+            job = UserImportJob.objects.create(users=users, total=len(users), send_welcome_email=send_welcome_email, requested_by=request.user.id)
+        except Exception as e:
+            return JsonResponse({
+                "status": "error",
+                "message": f"No se pudo encolar la importación. Por favor, inténtelo de nuevo más tarde. {e}"
+            }, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        return JsonResponse({
+            "status": "ok",
+            "message": f"Importación de {len(users)} usuarios encolada. Consulta su estado hasta que esté completada.",
+            "data": serialize_user_import_job(job)
+        }, status=HTTPStatus.ACCEPTED)
+
+
+class UserImportJobR(APIView):
+    #Estado de una importación masiva encolada.
+
+    permission_classes = [permissions.AllowAny]
+
+
+    @swagger_auto_schema(
+        operation_id="api_user_import_job_status",
+        operation_description="Consulta el estado de una importación masiva de usuarios. Solo el solicitante o un superusuario pueden consultarla.",
+        security=bearer_security_definition,
+        manual_parameters=[
+            openapi.Parameter('id', openapi.IN_PATH, description="ID del trabajo de importación.", required=True, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Estado del trabajo.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': user_import_job_object_schema
+                    }
+                )
+            ),
+            HTTPStatus.FORBIDDEN: openapi.Response(
+                description="Permiso 'user.add_user' requerido o el trabajo pertenece a otro usuario.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+            HTTPStatus.NOT_FOUND: openapi.Response(
+                description="Trabajo de importación no encontrado.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+        },
+    )
+    @authenticate_user(required_permission='user.add_user')
+    def get(self, request, id):
+        try:
+            job = UserImportJob.objects.get(pk=id)
+        except UserImportJob.DoesNotExist:
+            return JsonResponse({"status": "error", "message": "Trabajo de importación no encontrado."}, status=HTTPStatus.NOT_FOUND)
+
+        if not request.user.is_superuser and job.requested_by != request.user.id:
+            return JsonResponse({"status": "error", "message": "No tienes permiso para consultar esta importación."}, status=HTTPStatus.FORBIDDEN)
+
+        return JsonResponse({"status": "ok", "data": serialize_user_import_job(job)}, status=HTTPStatus.OK)
+
+
 class UserRUD(APIView):
 
 
@@ -597,6 +767,7 @@ class UserRUD(APIView):
             with transaction.atomic():
                 if fields_to_update_on_model.keys() or new_plain_password_for_email:
                     user_instance.save(update_fields=list(fields_to_update_on_model.keys()) if fields_to_update_on_model else None)
+                    transaction.on_commit(lambda: invalidate_cached_user(user_instance.id))
 
                 send_notification_email_flag = bool(changes_for_email_notification)
 
@@ -611,7 +782,7 @@ class UserRUD(APIView):
                         new_password_if_any=new_plain_password_for_email
                     )
                     
-                    send_email_notification(
+                    queue_email_notification(
                         html_content=html_email_body,
                         subject=email_subject,
                         recipient_email=user_instance.email
@@ -735,8 +906,10 @@ class UserRUD(APIView):
         try:
             with transaction.atomic():
                 deleted_username = user_instance.username 
+                deleted_user_id = user_instance.id
 
                 user_instance.delete()
+                transaction.on_commit(lambda: invalidate_cached_user(deleted_user_id))
             
             return JsonResponse(
                 {"status": "ok", "message": f"Usuario '{deleted_username}' eliminado exitosamente."},
@@ -749,6 +922,54 @@ class UserRUD(APIView):
             )
 
 
+class TokenCacheStats(APIView):
+    #Contadores de la caché de tokens JWT verificados.
+
+    permission_classes = [permissions.AllowAny]
+
+
+    @swagger_auto_schema(
+        operation_id="api_token_cache_stats",
+        operation_description="Contadores de la caché de tokens JWT verificados (aciertos, fallos, desalojos, tamaño y tasa de aciertos). La caché es por proceso: los valores corresponden al proceso de gunicorn que atendió la solicitud. Solo para superusuarios.",
+        security=bearer_security_definition,
+        responses={
+            HTTPStatus.OK: openapi.Response(
+                description="Contadores de la caché.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'hits': openapi.Schema(type=openapi.TYPE_INTEGER, description="Tokens encontrados en la caché."),
+                                'misses': openapi.Schema(type=openapi.TYPE_INTEGER, description="Tokens cuya firma se tuvo que verificar."),
+                                'evictions': openapi.Schema(type=openapi.TYPE_INTEGER, description="Tokens descartados por superar JWT_CACHE_MAX_SIZE."),
+                                'size': openapi.Schema(type=openapi.TYPE_INTEGER, description="Tokens guardados actualmente."),
+                                'hit_rate': openapi.Schema(type=openapi.TYPE_NUMBER, description="hits / (hits + misses)."),
+                            }
+                        )
+                    }
+                )
+            ),
+            HTTPStatus.UNAUTHORIZED: openapi.Response(
+                description="Token no provisto o inválido.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+            HTTPStatus.FORBIDDEN: openapi.Response(
+                description="Solo los superusuarios pueden consultar los contadores.",
+                schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={'status': openapi.Schema(type=openapi.TYPE_STRING, example="error"), 'message': openapi.Schema(type=openapi.TYPE_STRING)})
+            ),
+        },
+    )
+    @authenticate_user()
+    def get(self, request):
+        if not request.user.is_superuser:
+            return JsonResponse({"status": "error", "message": "Solo los superusuarios pueden consultar los contadores de la caché."}, status=HTTPStatus.FORBIDDEN)
+
+        return JsonResponse({"status": "ok", "data": get_token_cache_stats()}, status=HTTPStatus.OK)
+
+
 class Login(APIView):
 
 
@@ -0,0 +1,81 @@
+import hmac
+import re
+import time
+import uuid
+
+import cloudinary
+import cloudinary.utils
+
+from utilities.image_storage import INCIDENT_IMAGE_FOLDER
+
+
+ALLOWED_IMAGE_FORMATS = "jpg,jpeg,png"
+
+
+class InvalidUploadError(ValueError):
+    """
+    La imagen subida directamente a Cloudinary no se puede aceptar (firma inválida,
+    public_id ajeno, etc.). El mensaje se devuelve tal cual al cliente.
+    """
+
+
+def get_cloudinary_credentials() -> dict:
+    config = cloudinary.config()
+    if not all([config.cloud_name, config.api_key, config.api_secret]):
+        raise Exception("Error de configuración: Falta la variable de entorno CLOUDINARY_URL (cloud_name, api_key y api_secret).")
+    return {'cloud_name': config.cloud_name, 'api_key': config.api_key, 'api_secret': config.api_secret}
+
+
+def get_user_public_id_prefix(user_id: int) -> str:
+    return f"{INCIDENT_IMAGE_FOLDER}/u{user_id}_"
+
+
+def generate_upload_params(user_id: int) -> dict:
+    """
+    Parámetros firmados para que el cliente suba una imagen directamente a Cloudinary.
+    El public_id lo elige el servidor e incluye el ID del usuario, así la imagen solo
+    puede asociarse después a un incidente de ese mismo usuario. Cloudinary rechaza
+    la firma pasada una hora de su 'timestamp'.
+    """
+    credentials = get_cloudinary_credentials()
+    params_to_sign = {
+        'timestamp': int(time.time()),
+        'public_id': f"{get_user_public_id_prefix(user_id)}{uuid.uuid4().hex}",
+        'allowed_formats': ALLOWED_IMAGE_FORMATS,
+    }
+    signature = cloudinary.utils.api_sign_request(params_to_sign, credentials['api_secret'])
+
+    return {
+        **params_to_sign,
+        'signature': signature,
+        'api_key': credentials['api_key'],
+        'upload_url': cloudinary.utils.cloudinary_api_url('upload', resource_type='image', cloud_name=credentials['cloud_name']),
+    }
+
+
+def verify_direct_upload(user_id: int, public_id: str, version, signature: str) -> str:
+    """
+    Verifica la respuesta de Cloudinary que el cliente reenvía después de subir la imagen:
+    'signature' debe ser la firma de Cloudinary sobre (public_id, version) y el public_id
+    debe ser uno emitido para este usuario. No hace llamadas de red.
+    Devuelve la URL segura de la imagen o lanza InvalidUploadError.
+    """
+    if not public_id or not version or not signature:
+        raise InvalidUploadError("Se requieren 'image_public_id', 'image_version' e 'image_signature' de la respuesta de Cloudinary.")
+
+    prefix = get_user_public_id_prefix(user_id)
+    if not re.fullmatch(re.escape(prefix) + r"[0-9a-f]{32}", str(public_id)):
+        raise InvalidUploadError("El 'image_public_id' no corresponde a una subida autorizada para este usuario.")
+
+    try:
+        version = int(version)
+    except (TypeError, ValueError):
+        raise InvalidUploadError("El campo 'image_version' debe ser un número entero.")
+
+    credentials = get_cloudinary_credentials()
+    expected_signature = cloudinary.utils.api_sign_request({'public_id': public_id, 'version': version}, credentials['api_secret'])
+    if not hmac.compare_digest(expected_signature, str(signature)):
+        raise InvalidUploadError("La firma de la subida no es válida.")
+
+    image_url, _ = cloudinary.utils.cloudinary_url(public_id, version=version, secure=True, resource_type='image')
+    return image_url
@@ -4,6 +4,8 @@ from http import HTTPStatus
 from jose import jwt
 from django.conf import settings
 from django.contrib.auth.models import User
+from utilities.user_cache import get_cached_user
+from utilities.token_cache import decode_token
 import time
 
 def authenticate_user(required_permission=None):
@@ -51,7 +53,7 @@ def authenticate_user(required_permission=None):
                     }, status=HTTPStatus.UNAUTHORIZED)
                 
                 token = auth_header.split(" ")[1]
-                decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS512'])
+                decoded = decode_token(token)
             except jwt.ExpiredSignatureError:
                 return JsonResponse({
                     "status": "error",
@@ -87,7 +89,13 @@ def authenticate_user(required_permission=None):
                 }, status=HTTPStatus.UNAUTHORIZED)
 
             try:
-                user = User.objects.get(id=user_id)
+                user = get_cached_user(user_id)
+
+                if not user.is_active:
+                    return JsonResponse({
+                        "status": "error",
+                        "message": "Acceso no autorizado - La cuenta del usuario está desactivada."
+                    }, status=HTTPStatus.UNAUTHORIZED)
                 
                 actual_request.user = user
 
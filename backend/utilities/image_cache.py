@@ -0,0 +1,144 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image as PILImage, UnidentifiedImageError
+
+
+def get_cache_dir() -> str:
+    cache_dir = settings.REPORT_IMAGE_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_cache_path(public_id: str) -> str:
+    """
+    Ruta del archivo en caché para un image_public_id (nombre = SHA-256 del ID).
+    """
+    digest = hashlib.sha256(public_id.encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(), f"{digest}.jpg")
+
+
+def get_cached_image(public_id: str):
+    """
+    Devuelve los bytes de la imagen en caché, o None si no existe.
+    Actualiza la fecha de modificación del archivo para la política LRU.
+    """
+    path = get_cache_path(public_id)
+    try:
+        with open(path, 'rb') as cached_file:
+            content = cached_file.read()
+        os.utime(path, None)
+        return content
+    except FileNotFoundError:
+        return None
+
+
+def get_cached_image_path(public_id: str):
+    """
+    Devuelve la ruta de la imagen en caché, o None si no existe, sin leer su contenido.
+    Actualiza la fecha de modificación del archivo para la política LRU.
+    """
+    path = get_cache_path(public_id)
+    try:
+        os.utime(path, None)
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def downscale_image(content: bytes) -> bytes:
+    """
+    Reduce la imagen a la resolución usada en los reportes (REPORT_IMAGE_MAX_PIXELS
+    en su lado mayor) y la re-codifica como JPEG.
+    Lanza UnidentifiedImageError si el contenido no es una imagen válida.
+    """
+    max_pixels = settings.REPORT_IMAGE_MAX_PIXELS
+    with PILImage.open(io.BytesIO(content)) as image:
+        image.thumbnail((max_pixels, max_pixels))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = PILImage.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=85, optimize=True)
+        return output.getvalue()
+
+
+def store_image(public_id: str, content: bytes) -> bytes:
+    """
+    Reduce y guarda la imagen en caché. Devuelve los bytes ya reducidos.
+    Si el contenido no es una imagen válida se devuelve tal cual, sin guardarlo.
+    """
+    try:
+        downscaled = downscale_image(content)
+    except (UnidentifiedImageError, OSError):
+        return content
+
+    path = get_cache_path(public_id)
+    # Escritura atómica: otro proceso nunca lee un archivo a medio escribir.
+    file_descriptor, temp_path = tempfile.mkstemp(dir=get_cache_dir(), suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temp_file:
+            temp_file.write(downscaled)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return downscaled
+
+    enforce_cache_size()
+    return downscaled
+
+
+def invalidate_cached_image(public_id: str):
+    """
+    Elimina la imagen de la caché (al reemplazar o eliminar la imagen de un incidente).
+    """
+    if not public_id:
+        return
+    try:
+        os.remove(get_cache_path(public_id))
+    except FileNotFoundError:
+        pass
+
+
+def enforce_cache_size(cache_dir: str = None, max_bytes: int = None, extension: str = '.jpg'):
+    """
+    Elimina los archivos usados hace más tiempo hasta que la caché ocupe
+    como máximo 'max_bytes' (por defecto REPORT_IMAGE_CACHE_MAX_BYTES).
+    También la usa la caché de reportes PDF con su propio directorio y límite.
+    """
+    cache_dir = cache_dir or get_cache_dir()
+    max_bytes = settings.REPORT_IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total_size = 0
+
+    with os.scandir(cache_dir) as directory:
+        for entry in directory:
+            if not entry.name.endswith(extension):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    if total_size <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+        if total_size <= max_bytes:
+            break
@@ -0,0 +1,145 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary
+import cloudinary.utils
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+from utilities.image_storage import get_image_storage
+
+
+# Lado mayor (en píxeles) de la imagen principal y de cada variante.
+IMAGE_MAX_PIXELS = 2048
+IMAGE_VARIANTS = {
+    'thumbnail': 320,
+    'medium': 1024,
+}
+
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 80
+
+
+class InvalidImageError(ValueError):
+    """
+    El archivo recibido no es una imagen que Pillow pueda abrir.
+    """
+
+
+def open_normalized_image(content: bytes):
+    """
+    Abre la imagen, aplica la rotación indicada en EXIF (las fotos de celular suelen venir
+    giradas) y la deja en RGB o RGBA. La imagen resultante ya no tiene metadatos EXIF.
+    Lanza InvalidImageError si el contenido no es una imagen válida.
+    """
+    try:
+        with PILImage.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+            image.load()
+            return image
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError) as e:
+        raise InvalidImageError(f"El archivo no es una imagen válida: {e}")
+
+
+def verify_image_file(image_file):
+    """
+    Comprobación rápida (solo lee la cabecera) de que el archivo subido es una imagen,
+    para rechazarlo en la misma solicitud aunque se procese después.
+    Lanza InvalidImageError si no lo es.
+    """
+    try:
+        with PILImage.open(image_file) as image:
+            image.verify()
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImageError(f"El archivo no es una imagen válida: {e}")
+    finally:
+        image_file.seek(0)
+
+
+def encode_image(image, max_pixels: int) -> bytes:
+    """
+    Reduce la imagen (manteniendo proporción) para que su lado mayor no supere 'max_pixels'
+    y la codifica en WebP, sin metadatos.
+    """
+    resized = image.copy()
+    resized.thumbnail((max_pixels, max_pixels), PILImage.LANCZOS)
+    output = io.BytesIO()
+    resized.save(output, format=IMAGE_FORMAT, quality=IMAGE_QUALITY, method=4)
+    return output.getvalue()
+
+
+def process_incident_image(content: bytes) -> dict:
+    """
+    Normaliza la imagen de un incidente y genera sus variantes.
+    Devuelve {'original': bytes, 'thumbnail': bytes, 'medium': bytes}.
+    """
+    image = open_normalized_image(content)
+    processed = {'original': encode_image(image, IMAGE_MAX_PIXELS)}
+    for name, max_pixels in IMAGE_VARIANTS.items():
+        processed[name] = encode_image(image, max_pixels)
+    return processed
+
+
+def get_variant_public_id(public_id: str, variant: str) -> str:
+    return f"{public_id}_{variant}"
+
+
+def upload_incident_image(content: bytes, public_id: str) -> dict:
+    """
+    Normaliza la imagen y la guarda en el almacenamiento configurado (Cloudinary o disco
+    local), primero la principal y luego sus variantes en paralelo, con el public_id de
+    la principal más el sufijo de la variante. Si ya existe una imagen con ese public_id
+    se sobrescribe, así un reintento no deja copias huérfanas.
+    Devuelve {'secure_url', 'public_id'} con '<variante>_url' para cada variante.
+    """
+    processed = process_incident_image(content)
+    storage = get_image_storage()
+    file_format = IMAGE_FORMAT.lower()
+    upload_result = {
+        'public_id': public_id,
+        'secure_url': storage.save(public_id, processed['original'], file_format),
+    }
+
+    def upload_variant(variant):
+        return variant, storage.save(get_variant_public_id(public_id, variant), processed[variant], file_format)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(IMAGE_VARIANTS), thread_name_prefix='image-variant') as executor:
+            for variant, url in executor.map(upload_variant, IMAGE_VARIANTS):
+                upload_result[f"{variant}_url"] = url
+    except Exception:
+        destroy_incident_image(public_id)
+        raise
+
+    return upload_result
+
+
+def build_transformed_variant_urls(public_id: str, version=None) -> dict:
+    """
+    Para imágenes subidas directamente a Cloudinary (que no pasan por el servidor): las
+    variantes son transformaciones de Cloudinary sobre la imagen original, con el mismo
+    tamaño máximo y un formato eficiente elegido según el cliente.
+    Devuelve {'<variante>_url': url}.
+    """
+    urls = {}
+    for variant, max_pixels in IMAGE_VARIANTS.items():
+        urls[f"{variant}_url"], _ = cloudinary.utils.cloudinary_url(
+            public_id,
+            version=version,
+            secure=True,
+            resource_type='image',
+            transformation=[{'width': max_pixels, 'height': max_pixels, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'}]
+        )
+    return urls
+
+
+def destroy_incident_image(public_id: str):
+    """
+    Elimina del almacenamiento la imagen principal y sus variantes.
+    (Para imágenes subidas directamente a Cloudinary las variantes no existen; Cloudinary responde 'not found'.)
+    """
+    storage = get_image_storage()
+    storage.delete(public_id)
+    for variant in IMAGE_VARIANTS:
+        storage.delete(get_variant_public_id(public_id, variant))
@@ -0,0 +1,192 @@
+import glob
+import io
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+from django.conf import settings
+from django.utils._os import safe_join
+
+
+INCIDENT_IMAGE_FOLDER = "incident_images"
+
+STORAGE_CLOUDINARY = 'cloudinary'
+STORAGE_LOCAL = 'local'
+
+
+class ImageStorage(ABC):
+    """
+    Dónde se guardan las imágenes de los incidentes. Las imágenes se identifican por un
+    'public_id' sin extensión (p. ej. 'incident_images/op12'), igual que en Cloudinary.
+    """
+
+    # Si el cliente puede subir la imagen directamente al almacenamiento (ver cloudinary_uploads).
+    supports_direct_upload = False
+
+    @abstractmethod
+    def save(self, public_id: str, content: bytes, file_format: str) -> str:
+        """
+        Guarda (o sobrescribe) la imagen y devuelve su URL pública.
+        """
+
+    @abstractmethod
+    def delete(self, public_id: str):
+        """
+        Elimina la imagen. No falla si no existe.
+        """
+
+    def get_local_path(self, url: str, public_id: str = None):
+        """
+        Ruta en disco de la imagen si este almacenamiento la tiene localmente (así los
+        reportes la leen sin pasar por HTTP), o None.
+        """
+        return None
+
+    @abstractmethod
+    def iter_image_pages(self, created_before: datetime):
+        """
+        Recorre por páginas los public_id de INCIDENT_IMAGE_FOLDER creados antes de 'created_before'.
+        """
+
+    def delete_many(self, public_ids: list):
+        for public_id in public_ids:
+            self.delete(public_id)
+
+
+class CloudinaryImageStorage(ImageStorage):
+    """
+    Imágenes en Cloudinary (configurado con la variable de entorno CLOUDINARY_URL).
+    """
+
+    supports_direct_upload = True
+
+    def save(self, public_id: str, content: bytes, file_format: str) -> str:
+        upload_result = cloudinary.uploader.upload(io.BytesIO(content), public_id=public_id, overwrite=True, format=file_format)
+        return upload_result.get('secure_url')
+
+    def delete(self, public_id: str):
+        cloudinary.uploader.destroy(public_id)
+
+    def iter_image_pages(self, created_before: datetime):
+        next_cursor = None
+        while True:
+            response = cloudinary.api.resources(
+                type='upload', resource_type='image', prefix=f"{INCIDENT_IMAGE_FOLDER}/",
+                max_results=500, next_cursor=next_cursor
+            )
+            yield [
+                resource['public_id'] for resource in response.get('resources', [])
+                if datetime.fromisoformat(resource['created_at'].replace('Z', '+00:00')) < created_before
+            ]
+
+            next_cursor = response.get('next_cursor')
+            if not next_cursor:
+                break
+
+    def delete_many(self, public_ids: list):
+        # delete_resources acepta hasta 100 IDs por llamada.
+        for start in range(0, len(public_ids), 100):
+            cloudinary.api.delete_resources(public_ids[start:start + 100])
+
+
+class LocalImageStorage(ImageStorage):
+    """
+    Imágenes en el disco del servidor (INCIDENT_IMAGE_LOCAL_ROOT), servidas por la vista
+    IncidentImageFile bajo MEDIA_URL. Con INCIDENT_IMAGE_ACCEL_REDIRECT_PREFIX configurado
+    el envío del archivo lo hace nginx (X-Accel-Redirect) y no el proceso de Django.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url
+
+    def get_path(self, name: str) -> str:
+        # safe_join evita que un nombre con '..' salga de la carpeta.
+        return safe_join(self.root, name)
+
+    def find_path(self, public_id: str):
+        """
+        Ruta del archivo de un public_id (el public_id no incluye la extensión), o None.
+        """
+        matches = glob.glob(f"{glob.escape(self.get_path(public_id))}.*")
+        return matches[0] if matches else None
+
+    def get_url(self, name: str) -> str:
+        return f"{self.base_url}{settings.MEDIA_URL}{name}"
+
+    def save(self, public_id: str, content: bytes, file_format: str) -> str:
+        name = f"{public_id}.{file_format}"
+        path = self.get_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Se escribe en un archivo temporal y se renombra: nunca se sirve una imagen a medio escribir.
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return self.get_url(name)
+
+    def delete(self, public_id: str):
+        path = self.find_path(public_id)
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get_local_path(self, url: str, public_id: str = None):
+        if public_id:
+            return self.find_path(public_id)
+
+        # Imágenes antiguas guardadas sin public_id: se reconocen por la URL.
+        prefix = f"{self.base_url}{settings.MEDIA_URL}"
+        if url and url.startswith(prefix):
+            path = self.get_path(url[len(prefix):])
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def iter_image_pages(self, created_before: datetime):
+        folder = self.get_path(INCIDENT_IMAGE_FOLDER)
+        if not os.path.isdir(folder):
+            return
+
+        limit = created_before.timestamp()
+        page = []
+        # Solo los archivos con nombre generado por image_operations y directamente en la
+        # carpeta: los archivos antiguos (sin public_id) y la caché de reportes no se tocan.
+        for entry in os.scandir(folder):
+            name, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension != '.tmp' and re.fullmatch(r"op\d+(_[a-z]+)?", name) and entry.stat().st_mtime < limit:
+                page.append(f"{INCIDENT_IMAGE_FOLDER}/{name}")
+                if len(page) == 500:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+
+def get_local_image_storage() -> LocalImageStorage:
+    return LocalImageStorage(settings.INCIDENT_IMAGE_LOCAL_ROOT, settings.INCIDENT_IMAGE_BASE_URL)
+
+
+def get_image_storage() -> ImageStorage:
+    """
+    Almacenamiento configurado en INCIDENT_IMAGE_STORAGE ('cloudinary' o 'local').
+    """
+    if settings.INCIDENT_IMAGE_STORAGE == STORAGE_LOCAL:
+        return get_local_image_storage()
+    if settings.INCIDENT_IMAGE_STORAGE == STORAGE_CLOUDINARY:
+        return CloudinaryImageStorage()
+    raise Exception(f"Error de configuración: INCIDENT_IMAGE_STORAGE debe ser '{STORAGE_CLOUDINARY}' o '{STORAGE_LOCAL}'.")
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(ordering: str, value, pk: int, direction: str) -> str:
+    """
+    Genera un cursor opaco (base64) a partir del valor del campo de ordenamiento
+    y del ID del último/primer registro de la página.
+    """
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    payload = {"o": ordering, "v": value, "i": pk, "d": direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, ordering: str) -> dict:
+    """
+    Decodifica un cursor generado por encode_cursor.
+    Lanza InvalidCursorError si el cursor está corrupto o pertenece a otro ordenamiento.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursorError("El cursor proporcionado no es válido.")
+
+    if not isinstance(payload, dict) or not {'o', 'v', 'i', 'd'} <= payload.keys():
+        raise InvalidCursorError("El cursor proporcionado no es válido.")
+    if payload['o'] != ordering:
+        raise InvalidCursorError("El cursor proporcionado no corresponde al ordenamiento solicitado.")
+    if payload['d'] not in (CURSOR_NEXT, CURSOR_PREVIOUS) or not isinstance(payload['i'], int):
+        raise InvalidCursorError("El cursor proporcionado no es válido.")
+    return payload
+
+
+def parse_cursor_value(queryset, field: str, value):
+    """
+    Convierte el valor guardado en el cursor al tipo del campo de ordenamiento. El cursor
+    llega del cliente: un valor que no corresponde al campo lanza InvalidCursorError (y no
+    un error de la base de datos al armar el filtro).
+    """
+    try:
+        model_field = queryset.model._meta.get_field(field)
+    except FieldDoesNotExist:
+        # Campo anotado (p. ej. 'search_rank' de la búsqueda): siempre numérico.
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidCursorError("El cursor proporcionado no es válido.")
+        return value
+
+    if value is None:
+        raise InvalidCursorError("El cursor proporcionado no es válido.")
+    try:
+        return model_field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        raise InvalidCursorError("El cursor proporcionado no es válido.")
+
+
+def paginate_by_cursor(queryset, ordering: str = '-created_at', cursor: str = None, page_size: int = 50):
+    """
+    Paginación por keyset sobre (campo de ordenamiento, id), sin OFFSET.
+
+    Args:
+        queryset: QuerySet ya filtrado (sin order_by propio).
+        ordering: Campo de ordenamiento, con prefijo '-' para orden descendente.
+        cursor: Cursor opaco devuelto en una página anterior (opcional).
+        page_size: Cantidad máxima de registros por página.
+
+    Returns:
+        Tupla (items, next_cursor, previous_cursor). Los cursores son None cuando
+        no hay más páginas en esa dirección.
+    """
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+
+    direction = CURSOR_NEXT
+    if cursor:
+        payload = decode_cursor(cursor, ordering)
+        direction = payload['d']
+        value, pk = parse_cursor_value(queryset, field, payload['v']), payload['i']
+
+        # Al retroceder se recorre el índice en sentido contrario y luego se invierte la página.
+        go_lower = descending if direction == CURSOR_NEXT else not descending
+        if go_lower:
+            queryset = queryset.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk}))
+        else:
+            queryset = queryset.filter(Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": pk}))
+
+    scan_descending = descending if direction == CURSOR_NEXT else not descending
+    prefix = '-' if scan_descending else ''
+    rows = list(queryset.order_by(f"{prefix}{field}", f"{prefix}id")[:page_size + 1])
+
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    if direction == CURSOR_PREVIOUS:
+        items.reverse()
+
+    if not items:
+        return items, None, None
+
+    first, last = items[0], items[-1]
+    if direction == CURSOR_NEXT:
+        has_next, has_previous = has_more, bool(cursor)
+    else:
+        has_next, has_previous = True, has_more
+
+    next_cursor = encode_cursor(ordering, getattr(last, field), last.id, CURSOR_NEXT) if has_next else None
+    previous_cursor = encode_cursor(ordering, getattr(first, field), first.id, CURSOR_PREVIOUS) if has_previous else None
+    return items, next_cursor, previous_cursor
+
+
+def parse_page_size(raw_value, default: int, maximum: int) -> int:
+    """
+    Convierte el parámetro 'page_size' de la URL a entero dentro de [1, maximum].
+    Lanza ValueError si el valor no es un entero positivo.
+    """
+    if raw_value is None or str(raw_value).strip() == '':
+        return default
+    page_size = int(raw_value)
+    if page_size < 1:
+        raise ValueError("page_size debe ser mayor que cero.")
+    return min(page_size, maximum)
@@ -0,0 +1,79 @@
+import glob
+import os
+import tempfile
+
+from django.conf import settings
+
+from utilities.image_cache import enforce_cache_size
+
+
+def get_report_cache_dir() -> str:
+    cache_dir = settings.REPORT_PDF_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_report_version(updated_at) -> str:
+    """
+    Versión del incidente usada en la clave de caché y en el ETag (microsegundos de updated_at).
+    """
+    return str(int(updated_at.timestamp() * 1_000_000))
+
+
+def get_report_cache_path(report_type: str, incident_id: int, version: str) -> str:
+    return os.path.join(get_report_cache_dir(), f"{report_type}_{incident_id}_{version}.pdf")
+
+
+def get_cached_report_path(report_type: str, incident_id: int, version: str):
+    """
+    Devuelve la ruta del PDF en caché, o None si no existe.
+    Actualiza la fecha de modificación del archivo para la política LRU.
+    """
+    path = get_report_cache_path(report_type, incident_id, version)
+    try:
+        os.utime(path, None)
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def store_report(report_type: str, incident_id: int, version: str, build_report) -> str:
+    """
+    Genera el PDF con build_report(archivo) directamente en el directorio de la caché y
+    lo publica con un renombrado atómico. Borra las versiones anteriores del mismo reporte.
+    Devuelve la ruta del archivo guardado.
+    """
+    cache_dir = get_report_cache_dir()
+    path = get_report_cache_path(report_type, incident_id, version)
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temp_file:
+            build_report(temp_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    for old_path in glob.glob(os.path.join(cache_dir, f"{report_type}_{incident_id}_*.pdf")):
+        if old_path != path:
+            remove_file(old_path)
+
+    enforce_cache_size(cache_dir, settings.REPORT_PDF_CACHE_MAX_BYTES, '.pdf')
+    return path
+
+
+def invalidate_cached_reports(incident_id: int):
+    """
+    Elimina todos los PDF en caché de un incidente (cualquier tipo y versión).
+    """
+    for path in glob.glob(os.path.join(get_report_cache_dir(), f"*_{incident_id}_*.pdf")):
+        remove_file(path)
+
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utilities.image_cache import get_cached_image, get_cached_image_path, store_image
+from utilities.image_storage import get_image_storage
+
+
+IMAGE_FETCH_MAX_WORKERS = 8
+IMAGE_FETCH_TIMEOUT = (5, 15)  # (conexión, lectura) en segundos
+
+_session_lock = threading.Lock()
+_session = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Sesión HTTP compartida (keep-alive) para descargar imágenes de los reportes.
+    El pool de conexiones tiene el mismo tamaño que el pool de hilos.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=IMAGE_FETCH_MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def fetch_report_image(url: str, public_id: str = None) -> bytes:
+    """
+    Obtiene una imagen para un reporte. Si se indica 'public_id' se usa primero la
+    caché en disco (imagen ya reducida); si no está, se lee del almacenamiento local o se
+    descarga con timeout, y se guarda. Lanza la excepción de requests si la descarga falla.
+    """
+    if public_id:
+        cached_content = get_cached_image(public_id)
+        if cached_content is not None:
+            return cached_content
+
+    # Con almacenamiento local la imagen se lee del disco en lugar de pedirla por HTTP al propio servidor.
+    local_path = get_image_storage().get_local_path(url, public_id)
+    if local_path:
+        with open(local_path, 'rb') as image_file:
+            content = image_file.read()
+    else:
+        response = get_http_session().get(url, timeout=IMAGE_FETCH_TIMEOUT)
+        response.raise_for_status()
+        content = response.content
+
+    if public_id:
+        return store_image(public_id, content)
+    return content
+
+
+def fetch_report_image_source(url: str, public_id: str = None):
+    """
+    Igual que fetch_report_image, pero si la imagen queda en la caché en disco devuelve
+    la ruta del archivo en lugar de sus bytes. ReportLab lee el archivo recién al dibujar
+    la página, así el contenido de las imágenes no queda retenido en memoria mientras se
+    arma el reporte. Si no se puede guardar en caché devuelve los bytes.
+    """
+    if public_id:
+        cached_path = get_cached_image_path(public_id)
+        if cached_path:
+            return cached_path
+
+    content = fetch_report_image(url, public_id)
+    if public_id:
+        return get_cached_image_path(public_id) or content
+    return content
+
+
+def fetch_report_image_sources(images) -> dict:
+    """
+    Obtiene en paralelo (pool de hilos acotado) todas las imágenes de un reporte.
+
+    Args:
+        images: Iterable de tuplas (image_url, image_public_id).
+
+    Returns:
+        Diccionario {url: ruta en caché o bytes} (ver fetch_report_image_source) y,
+        para las que fallaron, {url: excepción}, para que el reporte pueda mostrar
+        un texto en lugar de la imagen.
+    """
+    unique_images = list(dict.fromkeys((url, public_id) for url, public_id in images if url))
+    if not unique_images:
+        return {}
+
+    def fetch(image):
+        url, public_id = image
+        try:
+            return url, fetch_report_image_source(url, public_id)
+        except Exception as e:
+            return url, e
+
+    max_workers = min(IMAGE_FETCH_MAX_WORKERS, len(unique_images))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-image') as executor:
+        return dict(executor.map(fetch, unique_images))
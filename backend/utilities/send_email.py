@@ -4,9 +4,11 @@ from email.mime.text import MIMEText
 import os
 from dotenv import load_dotenv
 
+from utilities.smtp_pool import smtp_pool
+
 load_dotenv()
 
-def send_email_notification(html_content: str, subject: str, recipient_email: str):
+def get_smtp_config() -> dict:
     smtp_server_host = os.getenv("SMTP_SERVER")
     smtp_port_str = os.getenv("SMTP_PORT")
     smtp_auth_user = os.getenv("SMTP_USER")
@@ -24,34 +26,65 @@ def send_email_notification(html_content: str, subject: str, recipient_email: st
     except ValueError:
         raise Exception(f"Error de configuración: El puerto SMTP '{smtp_port_str}' no es un número válido.")
 
+    return {
+        'host': smtp_server_host,
+        'port': smtp_port,
+        'user': smtp_auth_user,
+        'password': smtp_auth_password,
+        'sender': sender_email_address,
+        # Solo para servidores SMTP locales de prueba que no soportan STARTTLS.
+        'use_tls': os.getenv("SMTP_USE_TLS", "True").lower() != "false",
+    }
+
+
+def build_email_message(html_content: str, subject: str, recipient_email: str, sender_email_address: str) -> str:
     message = MIMEMultipart('alternative')
     message['Subject'] = subject
     message['From'] = sender_email_address
     message['To'] = recipient_email
     message.attach(MIMEText(html_content, 'html', 'utf-8'))
+    return message.as_string()
+
+
+def send_email_batch(messages: list) -> list:
+    """
+    Envía varios correos reutilizando una misma sesión SMTP del pool.
+
+    Args:
+        messages: Lista de diccionarios con 'html_content', 'subject' y 'recipient_email'.
+
+    Returns:
+        Lista con un resultado por mensaje, en el mismo orden: None si se envió,
+        o el texto del error si falló. Si el servidor corta la sesión a mitad del lote
+        se reconecta una vez y continúa con los mensajes restantes.
+    """
+    config = get_smtp_config()
+    results = [None] * len(messages)
+    position = 0
+    reconnected = False
+
+    while position < len(messages):
+        try:
+            with smtp_pool.session(config) as smtp_connection:
+                while position < len(messages):
+                    message = messages[position]
+                    try:
+                        smtp_connection.sendmail(
+                            config['sender'],
+                            message['recipient_email'],
+                            build_email_message(message['html_content'], message['subject'], message['recipient_email'], config['sender'])
+                        )
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                        results[position] = f"Error al intentar enviar el correo ({type(e).__name__}): {e}"
+                    position += 1
+        except Exception as e:
+            if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)) and not reconnected:
+                reconnected = True
+                continue
+            error_text = f"Error al intentar enviar el correo ({type(e).__name__}): {e}"
+            for index in range(position, len(messages)):
+                results[index] = error_text
+            break
+
+    return results
 
-    smtp_connection = None
-    try:
-        if smtp_port == 465:
-            smtp_connection = smtplib.SMTP_SSL(smtp_server_host, smtp_port, timeout=10)
-        else:
-            smtp_connection = smtplib.SMTP(smtp_server_host, smtp_port, timeout=10)
-            smtp_connection.ehlo()
-            smtp_connection.starttls()
-            smtp_connection.ehlo()
-
-        smtp_connection.login(smtp_auth_user, smtp_auth_password)
-        smtp_connection.sendmail(sender_email_address, recipient_email, message.as_string())
-
-    except Exception as e:
-        original_error_type = type(e).__name__
-        original_error_msg = str(e)
-        raise Exception(f"Error al intentar enviar el correo ({original_error_type}): {original_error_msg}")
-    finally:
-        if smtp_connection:
-            try:
-                smtp_connection.quit()
-            except Exception:
-                # Ignorar errores al intentar cerrar la conexión,
-                # ya que el error principal ya fue lanzado.
-                pass
\ No newline at end of file
@@ -0,0 +1,110 @@
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SMTPConnectionPool:
+    """
+    Mantiene sesiones SMTP ya autenticadas (EHLO/STARTTLS/LOGIN hechos) para reutilizarlas
+    entre envíos. Las sesiones inactivas más de 'max_idle_seconds' se cierran, y antes de
+    reutilizar una sesión se verifica con NOOP que el servidor no la haya cerrado.
+    """
+
+    def __init__(self, max_size: int = 2, max_idle_seconds: float = 60, timeout: float = 10):
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def _pool_key(self, config: dict):
+        return (config['host'], config['port'], config['user'])
+
+    def _connect(self, config: dict):
+        if config['port'] == 465:
+            connection = smtplib.SMTP_SSL(config['host'], config['port'], timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(config['host'], config['port'], timeout=self.timeout)
+            connection.ehlo()
+            if config.get('use_tls', True):
+                connection.starttls()
+                connection.ehlo()
+
+        try:
+            connection.login(config['user'], config['password'])
+        except Exception:
+            self._close(connection)
+            raise
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.quit()
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, connection) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except Exception:
+            return False
+
+    def acquire(self, config: dict):
+        key = self._pool_key(config)
+        now = time.monotonic()
+
+        while True:
+            with self._lock:
+                idle_connections = self._idle.get(key, [])
+                if not idle_connections:
+                    break
+                connection, released_at = idle_connections.pop()
+
+            if now - released_at <= self.max_idle_seconds and self._is_alive(connection):
+                return connection
+            self._close(connection)
+
+        return self._connect(config)
+
+    def release(self, config: dict, connection, broken: bool = False):
+        if broken:
+            self._close(connection)
+            return
+
+        key = self._pool_key(config)
+        with self._lock:
+            idle_connections = self._idle.setdefault(key, [])
+            if len(idle_connections) < self.max_size:
+                idle_connections.append((connection, time.monotonic()))
+                return
+        self._close(connection)
+
+    @contextmanager
+    def session(self, config: dict):
+        """
+        Entrega una sesión SMTP autenticada y la devuelve al pool al terminar.
+        Si ocurre un error de conexión la sesión se descarta en lugar de reutilizarse.
+        """
+        connection = self.acquire(config)
+        broken = False
+        try:
+            yield connection
+        except (smtplib.SMTPServerDisconnected, OSError):
+            broken = True
+            raise
+        finally:
+            self.release(config, connection, broken=broken)
+
+    def close_all(self):
+        with self._lock:
+            idle = [connection for connections in self._idle.values() for connection, _ in connections]
+            self._idle.clear()
+        for connection in idle:
+            self._close(connection)
+
+
+smtp_pool = SMTPConnectionPool()
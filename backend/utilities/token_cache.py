@@ -0,0 +1,75 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from jose import jwt
+
+
+_cache_lock = threading.Lock()
+_verified_tokens = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verifica y decodifica un JWT (HS512) usando una caché LRU por proceso.
+    Las claims se guardan, indexadas por el SHA-256 del token, hasta su 'exp';
+    así la firma se verifica una sola vez por token y por proceso.
+    Lanza las mismas excepciones que jwt.decode (ExpiredSignatureError, JWTError).
+    """
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
+
+    with _cache_lock:
+        entry = _verified_tokens.get(key)
+        if entry is not None:
+            expires_at, claims = entry
+            if expires_at > now:
+                _verified_tokens.move_to_end(key)
+                _stats["hits"] += 1
+                return dict(claims)
+            del _verified_tokens[key]
+        _stats["misses"] += 1
+
+    # Fuera del lock: la verificación de firma es la parte costosa.
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS512'])
+
+    try:
+        expires_at = int(claims.get("exp", 0))
+    except (TypeError, ValueError):
+        expires_at = 0
+
+    max_size = getattr(settings, 'JWT_CACHE_MAX_SIZE', 1024)
+    if expires_at > now and max_size > 0:
+        with _cache_lock:
+            _verified_tokens[key] = (expires_at, claims)
+            _verified_tokens.move_to_end(key)
+            while len(_verified_tokens) > max_size:
+                _verified_tokens.popitem(last=False)
+                _stats["evictions"] += 1
+
+    return dict(claims)
+
+
+def get_token_cache_stats() -> dict:
+    """
+    Devuelve los contadores de la caché de tokens del proceso actual.
+    """
+    with _cache_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "evictions": _stats["evictions"],
+            "size": len(_verified_tokens),
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+def clear_token_cache():
+    with _cache_lock:
+        _verified_tokens.clear()
+        for counter in _stats:
+            _stats[counter] = 0
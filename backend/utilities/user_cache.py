@@ -0,0 +1,54 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+
+_cache_lock = threading.Lock()
+_cached_users = {}
+
+
+def get_cached_user(user_id):
+    """
+    Devuelve el usuario con sus permisos precargados, usando una caché por proceso
+    con expiración (settings.AUTH_USER_CACHE_TTL segundos).
+    Cada llamada devuelve una copia, para que una vista no modifique el objeto compartido.
+    Las entradas vencidas se eliminan al consultarlas y al guardar una nueva.
+    Lanza User.DoesNotExist si el usuario no existe.
+    """
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cached_users.get(user_id)
+        if entry is not None:
+            if entry[0] > now:
+                return copy.copy(entry[1])
+            del _cached_users[user_id]
+
+    user = User.objects.get(id=user_id)
+    if not user.is_superuser:
+        # Llena _perm_cache/_user_perm_cache/_group_perm_cache para que has_perm no consulte la BD.
+        user.get_all_permissions()
+
+    ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+    if ttl > 0:
+        with _cache_lock:
+            for expired_user_id in [cached_id for cached_id, (expires_at, _) in _cached_users.items() if expires_at <= now]:
+                del _cached_users[expired_user_id]
+            _cached_users[user_id] = (now + ttl, user)
+    return copy.copy(user)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Elimina al usuario de la caché del proceso actual. Debe llamarse al modificar o eliminar un usuario.
+    """
+    with _cache_lock:
+        _cached_users.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _cache_lock:
+        _cached_users.clear()
@@ -0,0 +1,24 @@
+def generate_user_welcome_email_html(user_first_name: str, username: str) -> str:
+    """
+    Genera el HTML del correo de bienvenida para un usuario creado por un administrador.
+    La contraseña no se incluye: la entrega el administrador por otro medio.
+    """
+    title = "¡Bienvenido! Tu Cuenta Ha Sido Creada"
+    greeting = f"Hola <strong>{user_first_name or 'usuario'}</strong>,"
+
+    html_body = f"""
+    <div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; background-color: #f4f4f4; padding: 20px; margin: 0 auto; max-width: 600px;">
+        <div style="background-color: #ffffff; padding: 25px; border-radius: 8px; box-shadow: 0 4px 8px rgba(0,0,0,0.1);">
+            <h2 style="color: #2c3e50; text-align: center; border-bottom: 2px solid #3498db; padding-bottom: 10px;">{title}</h2>
+            <p style="font-size: 16px;">{greeting}</p>
+            <p style="font-size: 16px;">Se ha creado una cuenta para ti en el sistema de reporte de incidentes. Tu nombre de usuario es: <strong>{username}</strong>.</p>
+            <p style="font-size: 16px;">Tu administrador te entregará la contraseña inicial. Te recomendamos cambiarla después de iniciar sesión por primera vez.</p>
+            <p style="font-size: 14px; color: #555; margin-top: 25px;">Atentamente,<br>El Equipo de Soporte</p>
+            <hr style="margin: 30px 0; border: 0; border-top: 1px solid #eee;">
+            <p style="font-size: 12px; color: #7f8c8d; text-align: center;">
+                Este es un mensaje automático. Por favor, no respondas directamente a este correo.
+            </p>
+        </div>
+    </div>
+    """
+    return html_body